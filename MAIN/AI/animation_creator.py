@@ -1,79 +1,153 @@
 from manim import *
+import asyncio
+import contextvars
 import tempfile
 import os
 import sys
 import subprocess
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import time
 import py_compile
 from dotenv import load_dotenv
 from langchain_core.messages import HumanMessage, SystemMessage
-from langchain_google_genai import ChatGoogleGenerativeAI
+from MAIN.AI import fix_localizer, llm_backend, metrics
+from MAIN.AI.cancellation import (
+    CancelToken,
+    DeadlineExceeded,
+    JobCancelled,
+    current_token,
+    has_time_for,
+    kill_process_group,
+    raise_if_cancelled,
+    remaining_seconds,
+    set_current_token,
+)
+from MAIN.AI.llm_clients import ainvoke_llm, get_chat_model, invoke_llm
+from MAIN.AI.model_router import FixRouter
+from MAIN.AI.rate_limiter import is_rate_limited
+from MAIN.AI.token_budget import budget_exhausted, current_usage
 
 # Load environment variables
 load_dotenv()
 
 # LLM client using LangChain with Google Generative AI
 class LLMClient:
-    def __init__(self):
-        try:
-            # Get API key from environment variables
-            google_api_key = os.getenv('GOOGLE_API_KEY')
-            if not google_api_key:
-                raise ValueError("animation GOOGLE_API_KEY not found in environment variables")
-
-            # Initialize the Google Generative AI models
-            self.llm_flash = ChatGoogleGenerativeAI(
-                google_api_key=google_api_key,
-                model="gemini-2.5-flash",
-                temperature=0.2,
-                max_tokens=None,
-                timeout=None,
-                max_retries=4
-            )
-
-            # Pro model (used on later attempts)
-            try:
-                self.llm_pro = ChatGoogleGenerativeAI(
-                    google_api_key=google_api_key,
-                    model="gemini-2.5-pro",
-                    temperature=0.2,
-                    max_tokens=None,
-                    timeout=None,
-                    max_retries=2,
-                )
-            except Exception as pro_err:
-                print(f"Warning: Failed to initialize pro LLM client: {pro_err}")
-                self.llm_pro = None
+    """
+    Stateless: model flash / pro dipinjam dari registry bersama
+    (MAIN.AI.llm_clients) setiap kali dipakai.
+    """
+
+    @property
+    def llm_flash(self):
+        return self.llm_for("gemini-2.5-flash")
 
+    @property
+    def llm_pro(self):
+        # Pro model (used on later attempts)
+        return self.llm_for("gemini-2.5-pro")
+
+    def llm_for(self, model):
+        # Pro lebih mahal per panggilan: lebih sedikit retry transport
+        return self._model(model, max_retries=2 if "pro" in model else 4)
+
+    @staticmethod
+    def _model(model, max_retries):
+        if not llm_backend.api_key():
+            print("Warning: animation GOOGLE_API_KEY not found in environment variables")
+            return None
+        try:
+            return get_chat_model(model, temperature=0.2, max_retries=max_retries)
         except Exception as e:
-            print(f"Warning: Failed to initialize LLM client: {e}")
-            print("Falling back to basic error handling")
-            self.llm_flash = None
-            self.llm_pro = None
-    
-    def fix_manim_code(self, manim_code, error_message=None, use_pro: bool = False):
+            print(f"Warning: Failed to initialize LLM client {model}: {e}")
+            return None
+
+    def fix_manim_code(self, manim_code, error_message=None, model=None, region=None):
         """
         Direct fix of Manim code using LLM
         
+        When the failure can be localized (see MAIN.AI.fix_localizer) only
+        the failing region is sent and the returned patch is applied;
+        otherwise the whole file is sent.
+
         Args:
             manim_code (str): The Manim code to fix
             error_message (str, optional): Specific error message if available
-            
-        Args:
-            use_pro (bool): If True, prefer the pro model.
+            model (str, optional): Gemini model to use (default: flash,
+                see MAIN.AI.model_router)
+            region (Region, optional): Failing region found by the caller
+                (e.g. by bisecting step methods)
 
         Returns:
             str: Fixed Manim code
         """
-        llm = self.llm_pro if use_pro and self.llm_pro is not None else self.llm_flash
+        raise_if_cancelled()
+        llm = (self.llm_for(model) if model else None) or self.llm_flash
 
         if llm is None:
             print("LLM not available, returning original code")
             return manim_code
         
         try:
-            # Create prompt for fixing the code
-            if error_message:
-                prompt = f"""Fix this Manim Python code that has the following error:
+            region = region or fix_localizer.locate(manim_code, error_message)
+            if region is not None:
+                response = invoke_llm(llm, self._targeted_messages(manim_code, error_message, region))
+                fixed_code = self._apply_targeted(manim_code, region, response)
+                if fixed_code is not None:
+                    return fixed_code
+
+            response = invoke_llm(llm, self._fix_messages(manim_code, error_message))
+            return self._clean_fixed_code(response.content)
+            
+        except Exception as e:
+            # Same object back = no fix (the fix loops check identity, see FixRouter.fixed)
+            print(f"Error fixing code with LLM{' (rate limited)' if is_rate_limited(e) else ''}: {e}")
+            return manim_code
+
+    async def afix_manim_code(self, manim_code, error_message=None, model=None, region=None):
+        """Async version of fix_manim_code (uses ainvoke)."""
+        raise_if_cancelled()
+        llm = (self.llm_for(model) if model else None) or self.llm_flash
+
+        if llm is None:
+            print("LLM not available, returning original code")
+            return manim_code
+
+        try:
+            region = region or fix_localizer.locate(manim_code, error_message)
+            if region is not None:
+                response = await ainvoke_llm(llm, self._targeted_messages(manim_code, error_message, region))
+                fixed_code = self._apply_targeted(manim_code, region, response)
+                if fixed_code is not None:
+                    return fixed_code
+
+            response = await ainvoke_llm(llm, self._fix_messages(manim_code, error_message))
+            return self._clean_fixed_code(response.content)
+
+        except Exception as e:
+            print(f"Error fixing code with LLM{' (rate limited)' if is_rate_limited(e) else ''}: {e}")
+            return manim_code
+
+    @staticmethod
+    def _targeted_messages(manim_code, error_message, region):
+        print(f"🎯 Targeted fix: {region.describe()}")
+        metrics.incr("fix.targeted")
+        return fix_localizer.fix_messages(manim_code, region, error_message)
+
+    @staticmethod
+    def _apply_targeted(manim_code, region, response):
+        fixed_code = fix_localizer.apply_patch(manim_code, region, response.content)
+        if fixed_code is None:
+            # Patch tidak bisa ditempel: jatuh kembali ke fix satu file
+            print(f"Targeted fix for {region.describe()} returned an unusable patch, sending the whole file")
+            metrics.incr("fix.targeted.rejected")
+        return fixed_code
+
+    @staticmethod
+    def _fix_messages(manim_code, error_message=None):
+        # Create prompt for fixing the code
+        if error_message:
+            prompt = f"""Fix this Manim Python code that has the following error:
 
 ERROR: {error_message}
 
@@ -81,39 +155,59 @@ MANIM CODE TO FIX:
 {manim_code}
 
 Return only the corrected Python code with proper Manim syntax."""
-            else:
-                prompt = f"""Review and fix this Manim Python code to ensure it compiles and runs correctly:
+        else:
+            prompt = f"""Review and fix this Manim Python code to ensure it compiles and runs correctly:
 
 MANIM CODE:
 {manim_code}
 
 Return only the corrected Python code with proper Manim syntax."""
-            
-            # Direct LLM call
-            messages = [
-                SystemMessage(content="You are an expert Manim code fixer. Return only corrected Python code, no explanations or markdown."),
-                HumanMessage(content=prompt)
-            ]
-            
-            response = llm.invoke(messages)
-            fixed_code = response.content.strip()
-            
-            # Clean up any markdown formatting
-            if fixed_code.startswith("```python"):
-                fixed_code = fixed_code[9:]
-            if fixed_code.startswith("```"):
-                fixed_code = fixed_code[3:]
-            if fixed_code.endswith("```"):
-                fixed_code = fixed_code[:-3]
-            
-            return fixed_code.strip()
-            
-        except Exception as e:
-            print(f"Error fixing code with LLM: {e}")
-            return manim_code
+        
+        return [
+            SystemMessage(content="You are an expert Manim code fixer. Return only corrected Python code, no explanations or markdown."),
+            HumanMessage(content=prompt)
+        ]
+
+    @staticmethod
+    def _clean_fixed_code(content):
+        fixed_code = content.strip()
+        
+        # Clean up any markdown formatting
+        if fixed_code.startswith("```python"):
+            fixed_code = fixed_code[9:]
+        if fixed_code.startswith("```"):
+            fixed_code = fixed_code[3:]
+        if fixed_code.endswith("```"):
+            fixed_code = fixed_code[:-3]
+        
+        return fixed_code.strip()
 
 llm_client = LLMClient()
 
+def _compile_error(manim_code):
+    """py_compile the code; return the error text or None if it compiles."""
+    temp_file_path = _write_temp_code(manim_code)
+    try:
+        py_compile.compile(temp_file_path, doraise=True)
+        return None
+    except py_compile.PyCompileError as e:
+        return str(e)
+    finally:
+        # Clean up temporary file
+        if os.path.exists(temp_file_path):
+            os.unlink(temp_file_path)
+
+
+def _record_compile_error(error_history, attempt, error, current_code):
+    error_history.append({
+        'attempt': attempt + 1,
+        'error': error,
+        'code_snapshot': current_code[:500] + "..." if len(current_code) > 500 else current_code
+    })
+    print(f"Attempt {attempt + 1} failed compilation: {error}")
+    print("Attempting to fix code with LLM...")
+
+
 def validate_and_fix_manim_code(manim_code, max_attempts=5):
     """
     Validates Manim code through compilation and fixes errors using LLM feedback
@@ -125,53 +219,198 @@ def validate_and_fix_manim_code(manim_code, max_attempts=5):
     Returns:
         tuple: (validated_code, success_status, error_log)
     """
-    
-    attempt = 0
     current_code = manim_code
     error_history = []
+    fix_seconds = 0.0
     
-    while attempt < max_attempts:
-        # Create temporary Python file for validationw
-        #with tempfile.NamedTemporaryFile(mode='w', suffix='.py', delete=False) as temp_file:
-        #    temp_file.write(current_code.encode('utf-8'))
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.py', delete=False, encoding='utf-8') as temp_file:
-            temp_file.write(current_code)
-            temp_file_path = temp_file.name
-        
-        try:
-            # Attempt compilation
-            py_compile.compile(temp_file_path, doraise=True)
-            
-            # If successful, clean up and return
-            if os.path.exists(temp_file_path):
-                os.unlink(temp_file_path)
+    router = FixRouter()
+
+    for attempt in range(max_attempts):
+        error = _compile_error(current_code)
+        router.outcome(error is None)
+        if error is None:
             return current_code, True, error_history
-            
-        except py_compile.PyCompileError as e:
-            # Capture compilation error
-            error_info = {
-                'attempt': attempt + 1,
-                'error': str(e),
-                'code_snapshot': current_code[:500] + "..." if len(current_code) > 500 else current_code
-            }
-            error_history.append(error_info)
-            
-            print(f"Attempt {attempt + 1} failed compilation: {e}")
-            
-            # Send to LLM for fixing
-            print("Attempting to fix code with LLM...")
-            current_code = llm_client.fix_manim_code(current_code, str(e))
-            attempt += 1
-            
-        finally:
-            # Clean up temporary file
-            if os.path.exists(temp_file_path):
-                os.unlink(temp_file_path)
+
+        _record_compile_error(error_history, attempt, error, current_code)
+        if not _room_for_another_attempt(fix_seconds):
+            break
+        fix_started = time.monotonic()
+        fixed_code = llm_client.fix_manim_code(current_code, error, model=router.choose(error))
+        fix_seconds = time.monotonic() - fix_started
+        router.fixed(fix_seconds, answered=fixed_code is not current_code)
+        current_code = fixed_code
     
     # If all attempts failed
     print(f"Failed to validate and fix code after {max_attempts} attempts.")
     return current_code, False, error_history
 
+
+async def avalidate_and_fix_manim_code(manim_code, max_attempts=5):
+    """Async version of validate_and_fix_manim_code."""
+    current_code = manim_code
+    error_history = []
+    fix_seconds = 0.0
+
+    router = FixRouter()
+
+    for attempt in range(max_attempts):
+        error = _compile_error(current_code)
+        router.outcome(error is None)
+        if error is None:
+            return current_code, True, error_history
+
+        _record_compile_error(error_history, attempt, error, current_code)
+        if not _room_for_another_attempt(fix_seconds):
+            break
+        fix_started = time.monotonic()
+        fixed_code = await llm_client.afix_manim_code(current_code, error, model=router.choose(error))
+        fix_seconds = time.monotonic() - fix_started
+        router.fixed(fix_seconds, answered=fixed_code is not current_code)
+        current_code = fixed_code
+
+    print(f"Failed to validate and fix code after {max_attempts} attempts.")
+    return current_code, False, error_history
+
+def _room_for_another_attempt(last_attempt_seconds):
+    """
+    Fix loops stop early when the stage / job deadline would not leave
+    room for one more attempt of roughly the same length, or when the
+    job has used up its token budget (JOB_TOKEN_BUDGET).
+    """
+    if budget_exhausted():
+        print(f"💸 Token budget exhausted ({current_usage().describe()}), no more fix attempts.")
+        return False
+    if has_time_for(last_attempt_seconds):
+        return True
+    print(f"⏱️ Not enough time left for another fix attempt (~{last_attempt_seconds:.0f}s needed), giving up.")
+    return False
+
+
+def _write_temp_code(manim_code):
+    """Tulis kode ke file .py sementara dan kembalikan path-nya."""
+    with tempfile.NamedTemporaryFile(mode='w', suffix='.py', delete=False, encoding='utf-8') as temp_file:
+        temp_file.write(manim_code)
+        return temp_file.name
+
+
+def _manim_cmd(temp_file_path, scene_class_name, quality, output_dir):
+    return [
+        'manim', 
+        temp_file_path,
+        scene_class_name,
+        quality,  # -ql for trial, -qm for final render
+        '--disable_caching',
+        f'--media_dir={output_dir}'
+    ]
+
+
+def _run_manim(cmd, log_prefix):
+    """
+    Run manim with real-time output.
+
+    Manim runs in its own process group (start_new_session) so that a
+    cancelled job can kill it together with its ffmpeg / latex children.
+    A watchdog kills it when the stage / job deadline runs out.
+
+    Returns:
+        tuple: (return_code, combined stdout/stderr)
+
+    Raises:
+        JobCancelled: if the job's cancel token fired before or during the render
+        DeadlineExceeded: if the render was killed by the deadline watchdog
+    """
+    token = current_token()
+    raise_if_cancelled()
+    process = subprocess.Popen(
+        cmd,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        text=True,
+        encoding='utf-8',
+        bufsize=1,
+        universal_newlines=True,
+        start_new_session=True
+    )
+    if token:
+        token.register_process(process)
+
+    time_left = remaining_seconds()
+    watchdog = None
+    if time_left is not None:
+        watchdog = threading.Timer(max(0.0, time_left), kill_process_group, [process])
+        watchdog.daemon = True
+        watchdog.start()
+
+    try:
+        # Capture output while showing progress
+        output_lines = []
+        for line in process.stdout:
+            print(f"[{log_prefix}] {line.rstrip()}")
+            output_lines.append(line)
+
+        # Wait for completion
+        return_code = process.wait()
+    finally:
+        if watchdog:
+            watchdog.cancel()
+        if token:
+            token.unregister_process(process)
+
+    # A killed render is not a code error: don't hand it to the LLM fixer
+    raise_if_cancelled()
+    return return_code, ''.join(output_lines)
+
+
+async def _arun_manim(cmd, log_prefix):
+    """Async version of _run_manim (asyncio subprocess, no thread per render)."""
+    token = current_token()
+    raise_if_cancelled()
+    process = await asyncio.create_subprocess_exec(
+        *cmd,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.STDOUT,
+        start_new_session=True,
+    )
+    if token:
+        token.register_process(process)
+
+    output_lines = []
+
+    async def _consume():
+        async for raw_line in process.stdout:
+            line = raw_line.decode('utf-8', errors='replace')
+            print(f"[{log_prefix}] {line.rstrip()}")
+            output_lines.append(line)
+        return await process.wait()
+
+    try:
+        return_code = await asyncio.wait_for(_consume(), remaining_seconds())
+    except asyncio.TimeoutError:
+        kill_process_group(process)
+        raise DeadlineExceeded(f"{log_prefix}: render melewati batas waktu")
+    except (asyncio.CancelledError, JobCancelled):
+        # Task dibatalkan: jangan tinggalkan proses manim yatim
+        kill_process_group(process)
+        raise
+    finally:
+        if token:
+            token.unregister_process(process)
+
+    raise_if_cancelled()
+    return return_code, ''.join(output_lines)
+
+
+def _trial_outcome(return_code, stdout, output_dir):
+    if return_code == 0:
+        print("Trial render successful!")
+        # Clean up trial animations after successful render
+        cleanup_trial_animations(output_dir)
+        return True, None
+    error_message = f"Trial render failed:\nReturn Code: {return_code}\nStdout: {stdout}\nStderr: "
+    print(f"Trial render failed: {error_message}")
+    return False, error_message
+
+
 def trial_render_manim(temp_file_path, scene_class_name, output_dir="trial_media"):
     """
     Perform a trial render of Manim code to check for rendering errors
@@ -189,57 +428,28 @@ def trial_render_manim(temp_file_path, scene_class_name, output_dir="trial_media
         os.makedirs(output_dir, exist_ok=True)
         
         # Trial render command with low quality for speed
-        # Trial render command with low quality for speed
-        cmd = [
-            'manim', 
-            temp_file_path,
-            scene_class_name,
-            '-ql',  # low quality for trial
-            '--disable_caching',
-            f'--media_dir={output_dir}'
-        ]
-
+        cmd = _manim_cmd(temp_file_path, scene_class_name, '-ql', output_dir)
         print(f"Running trial render: {' '.join(cmd)}")
 
-        # Run with real-time output
-        process = subprocess.Popen(
-            cmd,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.STDOUT,
-            text=True,
-            encoding='utf-8',
-            bufsize=1,
-            universal_newlines=True
-        )
+        return_code, stdout = _run_manim(cmd, "MANIM TRIAL")
+        return _trial_outcome(return_code, stdout, output_dir)
+            
+    except Exception as e:
+        error_message = f"Trial render exception: {str(e)}"
+        print(error_message)
+        return False, error_message
 
-        # Capture output while showing progress
-        output_lines = []
-        for line in process.stdout:
-            print(f"[MANIM TRIAL] {line.rstrip()}")
-            output_lines.append(line)
 
-        # Wait for completion
-        return_code = process.wait()
+async def atrial_render_manim(temp_file_path, scene_class_name, output_dir="trial_media"):
+    """Async version of trial_render_manim."""
+    try:
+        os.makedirs(output_dir, exist_ok=True)
+        cmd = _manim_cmd(temp_file_path, scene_class_name, '-ql', output_dir)
+        print(f"Running trial render: {' '.join(cmd)}")
 
-        # Create result object for compatibility
-        class Result:
-            def __init__(self, returncode, stdout):
-                self.returncode = returncode
-                self.stdout = stdout
-                self.stderr = ""
+        return_code, stdout = await _arun_manim(cmd, "MANIM TRIAL")
+        return _trial_outcome(return_code, stdout, output_dir)
 
-        result = Result(return_code, ''.join(output_lines))
-        
-        if result.returncode == 0:
-            print("Trial render successful!")
-            # Clean up trial animations after successful render
-            cleanup_trial_animations(output_dir)
-            return True, None
-        else:
-            error_message = f"Trial render failed:\nReturn Code: {result.returncode}\nStdout: {result.stdout}\nStderr: {result.stderr}"
-            print(f"Trial render failed: {error_message}")
-            return False, error_message
-            
     except Exception as e:
         error_message = f"Trial render exception: {str(e)}"
         print(error_message)
@@ -260,75 +470,61 @@ def cleanup_trial_animations(trial_output_dir):
     except Exception as e:
         print(f"Warning: Failed to clean up trial animations from {trial_output_dir}: {e}")
 
-def create_animation_from_code(manim_code, output_dir="media/videos", max_render_attempts=10):
+def render_test_manim_code(manim_code, max_render_attempts=10, trial_dir="trial_media"):
     """
-    Enhanced animation creator with pre-validation and trial rendering.
-    Create animation from generated Manim code.
-    
+    Compile-validate the code, then trial render (-ql) with LLM fixes until
+    it renders.
+
     Args:
-        manim_code (str): Complete Manim Python code
-        output_dir (str): Directory to save the rendered video
+        manim_code (str): Generated Manim code
         max_render_attempts (int): Maximum attempts for render fixes
-        
+        trial_dir (str): Media dir for the trial renders
+
     Returns:
-        str: Path to the generated video file, or None if failed
+        str: Render-tested code, or None if it could not be fixed
     """
-    if not manim_code:
-        print("No Manim code provided")
-        return None
-
     # Pre-validate the code
     validated_code, is_valid, error_log = validate_and_fix_manim_code(manim_code)
-    
-    if not is_valid:
-        print("Failed to generate valid Manim code after maximum attempts.")
-        print("Error history:")
-        for err_info in error_log:
-            print(f"  Attempt {err_info['attempt']}: {err_info['error']}")
-        return None
-    
-    # Extract scene class name from validated code
-    scene_class_name = extract_scene_class_name(validated_code)
+    scene_class_name = _scene_for_validated_code(validated_code, is_valid, error_log)
     if not scene_class_name:
-        print("Could not find scene class in the validated code.")
         return None
     
     # Trial rendering loop
     render_attempt = 0
     current_code = validated_code
+    router = FixRouter()
     
     while render_attempt < max_render_attempts:
+        attempt_started = time.monotonic()
         # Create temporary file with current code
-        #with tempfile.NamedTemporaryFile(mode='w', suffix='.py', delete=False) as temp_file:
-        #    temp_file.write(current_code)
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.py', delete=False, encoding='utf-8') as temp_file:
-            temp_file.write(current_code)
-            temp_file_path = temp_file.name
+        temp_file_path = _write_temp_code(current_code)
         
         try:
             # Perform trial render
-            trial_success, trial_error = trial_render_manim(temp_file_path, scene_class_name)
+            trial_success, trial_error = trial_render_manim(temp_file_path, scene_class_name, trial_dir)
+            router.outcome(trial_success)
             
             if trial_success:
                 print("Trial render successful! Proceeding with final render...")
-                break
+                return current_code
             else:
                 print(f"Trial render attempt {render_attempt + 1} failed.")
 
+                if not _room_for_another_attempt(time.monotonic() - attempt_started):
+                    return None
                 if render_attempt < max_render_attempts - 1:
-                    attempt_number = render_attempt + 1  # 1-based for human-readable attempts
-                    # Attempts 1–3: flash, attempts 4–5: pro
-                    use_pro_model = attempt_number >= 4
-                    print(
-                        f"Attempting to fix rendering errors with LLM "
-                        f"using model: {'gemini-2.5-pro' if use_pro_model else 'gemini-2.5-flash'}..."
-                    )
+                    region = _render_fix_region(current_code, trial_error, scene_class_name, trial_dir)
+                    model = _render_fix_model(router, trial_error)
                     # Send to LLM for fixing rendering issues
-                    current_code = llm_client.fix_manim_code(
+                    fix_started = time.monotonic()
+                    fixed_code = llm_client.fix_manim_code(
                         current_code,
                         trial_error,
-                        use_pro=use_pro_model,
+                        model=model,
+                        region=region,
                     )
+                    router.fixed(time.monotonic() - fix_started, answered=fixed_code is not current_code)
+                    current_code = fixed_code
                     render_attempt += 1
                 else:
                     print(f"Failed to fix rendering errors after {max_render_attempts} attempts.")
@@ -338,103 +534,322 @@ def create_animation_from_code(manim_code, output_dir="media/videos", max_render
             # Clean up temporary file
             if os.path.exists(temp_file_path):
                 os.unlink(temp_file_path)
+    return None
+
+
+async def arender_test_manim_code(manim_code, max_render_attempts=10, trial_dir="trial_media"):
+    """Async version of render_test_manim_code."""
+    validated_code, is_valid, error_log = await avalidate_and_fix_manim_code(manim_code)
+    scene_class_name = _scene_for_validated_code(validated_code, is_valid, error_log)
+    if not scene_class_name:
+        return None
+
+    current_code = validated_code
+    router = FixRouter()
+    for render_attempt in range(max_render_attempts):
+        attempt_started = time.monotonic()
+        temp_file_path = _write_temp_code(current_code)
+        try:
+            trial_success, trial_error = await atrial_render_manim(temp_file_path, scene_class_name, trial_dir)
+        finally:
+            if os.path.exists(temp_file_path):
+                os.unlink(temp_file_path)
+        router.outcome(trial_success)
+
+        if trial_success:
+            print("Trial render successful! Proceeding with final render...")
+            return current_code
+
+        print(f"Trial render attempt {render_attempt + 1} failed.")
+        if render_attempt == max_render_attempts - 1:
+            print(f"Failed to fix rendering errors after {max_render_attempts} attempts.")
+            return None
+        if not _room_for_another_attempt(time.monotonic() - attempt_started):
+            return None
+
+        region = await _arender_fix_region(current_code, trial_error, scene_class_name, trial_dir)
+        model = _render_fix_model(router, trial_error)
+        fix_started = time.monotonic()
+        fixed_code = await llm_client.afix_manim_code(current_code, trial_error, model=model, region=region)
+        router.fixed(time.monotonic() - fix_started, answered=fixed_code is not current_code)
+        current_code = fixed_code
+    return None
+
+
+def _candidate_tokens(count):
+    parent = current_token()
+    return [parent.child() if parent else CancelToken() for _ in range(count)]
+
+
+def _candidate_trial_dir(work_dir, index):
+    return os.path.join(work_dir, f"trial_media_{index}")
+
+
+def _render_test_candidate(token, manim_code, max_render_attempts, trial_dir):
+    # Thread pool: token kandidat jadi token aktif thread ini
+    set_current_token(token)
+    return render_test_manim_code(manim_code, max_render_attempts, trial_dir)
+
+
+def race_render_tests(candidates, work_dir, max_render_attempts=10):
+    """
+    Trial-render several code candidates concurrently. The first candidate
+    that passes wins; the others are cancelled (manim killed, no more LLM
+    fixes).
+
+    Args:
+        candidates (list): Manim code strings
+        work_dir (str): Each candidate gets its own trial_media_<i> inside
+        max_render_attempts (int): Per-candidate fix attempts
+
+    Returns:
+        tuple: (candidate index, render-tested code), or None if none passed
+    """
+    tokens = _candidate_tokens(len(candidates))
+    pool = ThreadPoolExecutor(max_workers=len(candidates), thread_name_prefix="manim-candidate")
+    futures = {
+        # copy_context: candidates keep the job's domain / cache mode contextvars
+        pool.submit(
+            contextvars.copy_context().run,
+            _render_test_candidate, token, code, max_render_attempts, _candidate_trial_dir(work_dir, index)
+        ): index
+        for index, (code, token) in enumerate(zip(candidates, tokens))
+    }
+    try:
+        for future in as_completed(futures):
+            index = futures[future]
+            try:
+                result = future.result()
+            except (JobCancelled, DeadlineExceeded):
+                continue
+            except Exception as e:
+                print(f"Candidate {index + 1} crashed: {e}")
+                continue
+            if result:
+                print(f"🏁 Candidate {index + 1}/{len(candidates)} passed trial render first")
+                return index, result
+            print(f"Candidate {index + 1}/{len(candidates)} could not be fixed")
+        raise_if_cancelled()
+        return None
+    finally:
+        for token in tokens:
+            token.cancel()
+        # Don't wait for the losers: they stop at their next cancellation check
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+async def arace_render_tests(candidates, work_dir, max_render_attempts=10):
+    """Async version of race_render_tests (one task per candidate)."""
+    tokens = _candidate_tokens(len(candidates))
+
+    async def _candidate(token, code, trial_dir):
+        # Each task runs in its own copy of the context
+        set_current_token(token)
+        return await arender_test_manim_code(code, max_render_attempts, trial_dir)
+
+    tasks = {
+        asyncio.ensure_future(_candidate(token, code, _candidate_trial_dir(work_dir, index))): index
+        for index, (code, token) in enumerate(zip(candidates, tokens))
+    }
+    pending = set(tasks)
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                index = tasks[task]
+                if task.cancelled():
+                    continue
+                try:
+                    result = task.result()
+                except (JobCancelled, DeadlineExceeded):
+                    continue
+                except Exception as e:
+                    print(f"Candidate {index + 1} crashed: {e}")
+                    continue
+                if result:
+                    print(f"🏁 Candidate {index + 1}/{len(candidates)} passed trial render first")
+                    return index, result
+                print(f"Candidate {index + 1}/{len(candidates)} could not be fixed")
+        raise_if_cancelled()
+        return None
+    finally:
+        for token in tokens:
+            token.cancel()
+        for task in tasks:
+            task.cancel()
+        # _arun_manim kills its process group on CancelledError
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def render_final_video(manim_code, output_dir):
+    """
+    Final render (-qm) of render-tested code.
+
+    Returns:
+        str: Path to the generated video file, or None if failed
+    """
+    scene_class_name = extract_scene_class_name(manim_code)
+    if not scene_class_name:
+        print("Could not find scene class in the code.")
+        return None
+    return _final_render(manim_code, scene_class_name, output_dir)
+
+
+async def arender_final_video(manim_code, output_dir):
+    """Async version of render_final_video."""
+    scene_class_name = extract_scene_class_name(manim_code)
+    if not scene_class_name:
+        print("Could not find scene class in the code.")
+        return None
+    return await _afinal_render(manim_code, scene_class_name, output_dir)
+
+
+def _scene_for_validated_code(validated_code, is_valid, error_log):
+    if not is_valid:
+        print("Failed to generate valid Manim code after maximum attempts.")
+        print("Error history:")
+        for err_info in error_log:
+            print(f"  Attempt {err_info['attempt']}: {err_info['error']}")
+        return None
     
-    # If we reach here, trial render was successful
+    # Extract scene class name from validated code
+    scene_class_name = extract_scene_class_name(validated_code)
+    if not scene_class_name:
+        print("Could not find scene class in the validated code.")
+        return None
+    return scene_class_name
+
+
+def _render_fix_region(current_code, trial_error, scene_class_name, trial_dir):
+    """
+    Failing region for a render fix: from the traceback / error text, or
+    else by bisecting the step methods with trial renders of code where
+    only the first k steps run. None = send the whole file.
+    """
+    region = fix_localizer.locate(current_code, trial_error)
+    if region is not None or not fix_localizer.FIX_TARGETED:
+        return region
+
+    def fails(code):
+        temp_file_path = _write_temp_code(code)
+        try:
+            return not trial_render_manim(temp_file_path, scene_class_name, trial_dir)[0]
+        finally:
+            _remove_temp_code(temp_file_path)
+            raise_if_cancelled()
+
+    print("Render error is not tied to one step, bisecting step methods...")
+    return fix_localizer.bisect_steps(current_code, fails)
+
+
+async def _arender_fix_region(current_code, trial_error, scene_class_name, trial_dir):
+    """Async version of _render_fix_region."""
+    region = fix_localizer.locate(current_code, trial_error)
+    if region is not None or not fix_localizer.FIX_TARGETED:
+        return region
+
+    async def fails(code):
+        temp_file_path = _write_temp_code(code)
+        try:
+            return not (await atrial_render_manim(temp_file_path, scene_class_name, trial_dir))[0]
+        finally:
+            _remove_temp_code(temp_file_path)
+            raise_if_cancelled()
+
+    print("Render error is not tied to one step, bisecting step methods...")
+    return await fix_localizer.abisect_steps(current_code, fails)
+
+
+def _render_fix_model(router, trial_error):
+    # Default: flash for the first 3 fixes, then pro (unless the job is past
+    # JOB_PRO_TOKEN_BUDGET); MAIN.AI.model_router adapts this to observed outcomes
+    model = router.choose(trial_error)
+    print(f"Attempting to fix rendering errors with LLM using model: {model}...")
+    return model
+
+
+def _final_render(current_code, scene_class_name, output_dir):
+    """Render final (-qm) untuk kode yang sudah lolos trial render."""
     # Proceed with final rendering using validated and render-tested code
-    #with tempfile.NamedTemporaryFile(mode='w', suffix='.py', delete=False) as temp_file:
-    #    temp_file.write(current_code)
-    with tempfile.NamedTemporaryFile(mode='w', suffix='.py', delete=False, encoding='utf-8') as temp_file:
-        temp_file.write(current_code)
-        temp_file_path = temp_file.name
+    temp_file_path = _write_temp_code(current_code)
     
     try:
         # Ensure output directory exists
         os.makedirs(output_dir, exist_ok=True)
 
         # Run final Manim rendering
-        # Run final Manim rendering
-        cmd = [
-            'manim', 
-            temp_file_path,
-            scene_class_name,
-            '-qm',  # medium quality for final render
-            '--disable_caching',
-            f'--media_dir={output_dir}' 
-        ]
-
+        cmd = _manim_cmd(temp_file_path, scene_class_name, '-qm', output_dir)
         print(f"Running final render: {' '.join(cmd)}")
 
-        # Run with real-time output
-        process = subprocess.Popen(
-            cmd,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.STDOUT,
-            text=True,
-            encoding='utf-8',
-            bufsize=1,
-            universal_newlines=True
-        )
+        return_code, stdout = _run_manim(cmd, "MANIM FINAL")
+        return _final_outcome(return_code, stdout, output_dir, scene_class_name, temp_file_path, current_code)
+            
+    except Exception as e:
+        print(f"An unexpected error occurred during final animation creation: {e}")
+        print("Code at time of exception:")
+        print(current_code)
+        return None
+    finally:
+        _remove_temp_code(temp_file_path)
 
-        # Capture output while showing progress
-        output_lines = []
-        for line in process.stdout:
-            print(f"[MANIM FINAL] {line.rstrip()}")
-            output_lines.append(line)
 
-        # Wait for completion
-        return_code = process.wait()
+async def _afinal_render(current_code, scene_class_name, output_dir):
+    """Async version of _final_render."""
+    temp_file_path = _write_temp_code(current_code)
+    try:
+        os.makedirs(output_dir, exist_ok=True)
+        cmd = _manim_cmd(temp_file_path, scene_class_name, '-qm', output_dir)
+        print(f"Running final render: {' '.join(cmd)}")
 
-        # Create result object for compatibility
-        class Result:
-            def __init__(self, returncode, stdout):
-                self.returncode = returncode
-                self.stdout = stdout
-                self.stderr = ""
+        return_code, stdout = await _arun_manim(cmd, "MANIM FINAL")
+        return _final_outcome(return_code, stdout, output_dir, scene_class_name, temp_file_path, current_code)
 
-        result = Result(return_code, ''.join(output_lines))
-        
-        if result.returncode == 0:
-            # Find the generated video
-            video_path = find_generated_video(output_dir, scene_class_name, os.path.basename(temp_file_path).replace('.py',''))
-            if video_path:
-                print(f"Animation created successfully: {video_path}")
-                return video_path
-            else:
-                print(f"Final rendering succeeded but the video file was not found in {output_dir} for scene {scene_class_name}.")
-                print(f"Manim stdout: {result.stdout}")
-                print(f"Manim stderr: {result.stderr}")
-                return None        
-        else:
-            print(f"Final rendering failed unexpectedly after successful trial render.")
-            print(f"Return Code: {result.returncode}")
-            print(f"Stdout: {result.stdout}")
-            print(f"Stderr: {result.stderr}")
-            
-            # Log the code that failed final rendering
-            print("\n" + "="*60)
-            print("🚨 FINAL MANIM RENDERING FAILED AFTER SUCCESSFUL TRIAL")
-            print("="*60)
-            print("Code that failed final rendering:")
-            print("─" * 40)
-            lines = current_code.split('\n')
-            for i, line in enumerate(lines, 1):
-                print(f"{i:3}: {line}")
-            print("─" * 40)
-            print("="*60)
-            return None
-            
     except Exception as e:
         print(f"An unexpected error occurred during final animation creation: {e}")
         print("Code at time of exception:")
         print(current_code)
         return None
     finally:
-        # Clean up temporary file
-        if os.path.exists(temp_file_path):
-            try:
-                os.unlink(temp_file_path)
-            except OSError as e:
-                print(f"Error deleting temporary file {temp_file_path}: {e}")
+        _remove_temp_code(temp_file_path)
+
+
+def _remove_temp_code(temp_file_path):
+    # Clean up temporary file
+    if os.path.exists(temp_file_path):
+        try:
+            os.unlink(temp_file_path)
+        except OSError as e:
+            print(f"Error deleting temporary file {temp_file_path}: {e}")
+
+
+def _final_outcome(return_code, stdout, output_dir, scene_class_name, temp_file_path, current_code):
+    if return_code == 0:
+        # Find the generated video
+        video_path = find_generated_video(output_dir, scene_class_name, os.path.basename(temp_file_path).replace('.py',''))
+        if video_path:
+            print(f"Animation created successfully: {video_path}")
+            return video_path
+        else:
+            print(f"Final rendering succeeded but the video file was not found in {output_dir} for scene {scene_class_name}.")
+            print(f"Manim stdout: {stdout}")
+            return None        
+    else:
+        print(f"Final rendering failed unexpectedly after successful trial render.")
+        print(f"Return Code: {return_code}")
+        print(f"Stdout: {stdout}")
+        
+        # Log the code that failed final rendering
+        print("\n" + "="*60)
+        print("🚨 FINAL MANIM RENDERING FAILED AFTER SUCCESSFUL TRIAL")
+        print("="*60)
+        print("Code that failed final rendering:")
+        print("─" * 40)
+        lines = current_code.split('\n')
+        for i, line in enumerate(lines, 1):
+            print(f"{i:3}: {line}")
+        print("─" * 40)
+        print("="*60)
+        return None
 
 def extract_scene_class_name(manim_code):
     """
@@ -492,4 +907,4 @@ def create_animation(script):
             self.wait(2)
 
     # This would need to be rendered separately
-    print("Legacy create_animation called. Use create_animation_from_code for full functionality.")
+    print("Legacy create_animation called. Use the staged pipeline (MAIN.AI.pipeline, render_final_video) for full functionality.")
@@ -2,7 +2,7 @@
 Simple LEARNVIDAI function - Generate educational videos with a single function call
 """
 
-import boto3
+import asyncio
 import os
 from dotenv import load_dotenv
 from pathlib import Path
@@ -26,395 +26,352 @@ for env_path in possible_envs:
 else:
     print("⚠️ No .env file found in AI/, MAIN/, or project root")
     
-import json
-from pathlib import Path
 from datetime import datetime
 from typing import Dict, Tuple, Optional
 
-
-from MAIN.AI.script_generator import ScienceVideoGenerator
-from MAIN.AI.manim_code_generator import ManIMCodeGenerator
-from MAIN.AI.animation_creator import create_animation_from_code
+from MAIN.AI.video_cache import get_video_cache
+from MAIN.AI.cancellation import CancelToken, JobCancelled
+from MAIN.AI.checkpoints import StageCheckpoint
+from MAIN.AI.pipeline import PipelineContext, PipelineInterrupted, VideoPipeline
+from MAIN.AI.progress import AsyncProgressBus, ProgressBus
+from MAIN.AI.token_budget import TokenUsage
 
 
 env_path = Path(__file__).resolve().parent / ".env"
 load_dotenv(dotenv_path=env_path)
 
 
-def _get_video_storage_dir() -> Path:
-    """
-    Ambil folder penyimpanan video lokal dari env.
-    Default: MAIN/videos relatif dari root project (FP).
-    """
-    base_dir = Path(__file__).resolve().parent  # .../FP/MAIN/AI
-    project_root = base_dir.parent.parent      # .../FP
-
-    env_value = os.getenv("VIDEO_FOLDER", "MAIN/videos")
-    video_dir = Path(env_value)
-
-    if not video_dir.is_absolute():
-        video_dir = (project_root / video_dir).resolve()
-
-    video_dir.mkdir(parents=True, exist_ok=True)
-    return video_dir
-
-
-def _move_video_to_storage(temp_video_path: str, final_name: str):
-    """
-    Upload ke Cloudflare R2 dan return public URL.
-    """
-    temp_video = Path(temp_video_path)
-
-    if not temp_video.exists():
-        raise FileNotFoundError("Video tidak ditemukan")
-
-    r2 = boto3.client(
-        "s3",
-        endpoint_url=os.getenv("R2_ENDPOINT"),
-        aws_access_key_id=os.getenv("R2_ACCESS_KEY_ID"),
-        aws_secret_access_key=os.getenv("R2_SECRET_ACCESS_KEY"),
-        region_name="auto",
-    )
-
-    bucket = os.getenv("R2_BUCKET_NAME")
-    public_base = os.getenv("R2_BUCKET_PUBLIC_URL")
-
-    # Upload file ke R2
-    r2.upload_file(
-        Filename=str(temp_video),
-        Bucket=bucket,
-        Key=final_name,
-        ExtraArgs={"ContentType": "video/mp4"}
-    )
-
-    # Setelah upload, hapus file lokal
-    temp_video.unlink()
-
-    public_url = f"{public_base}/{final_name}"
-    return public_url
-
 def generate_educational_video(
     topic: str,
     complexity: str = "high-school",
     domain: str = "auto-detect",
     output_dir: str = "../MAIN/output",
     message_id: Optional[int] = None,
+    use_cache: bool = True,
+    checkpoint_key: Optional[str] = None,
 ) -> Tuple[str, Dict]:
-    import shutil
-    from time import sleep
-
-    BASE_DIR = Path(__file__).resolve().parent
-    output_root = (BASE_DIR.parent / "MAIN" / "output").resolve()
-    output_root.mkdir(parents=True, exist_ok=True)
+    """
+    Generate satu video secara blocking (CLI / batch).
 
-    # === Buat subfolder unik untuk topik ini ===
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    safe_topic = "".join(c if c.isalnum() else "_" for c in topic)[:25]
-    unique_output = output_root / f"{timestamp}_{safe_topic}"
-    unique_output.mkdir(parents=True, exist_ok=True)
+    checkpoint_key opsional: bila diberikan, hasil tiap tahap disimpan
+    sehingga run yang terputus melanjutkan dari tahap terakhir
+    (dipakai oleh MAIN.AI.batch).
+    """
+    # === Cache: topik yang sama sudah pernah dibuat? ===
+    if use_cache:
+        cached_url = get_video_cache().get(topic, complexity, domain)
+        if cached_url:
+            return cached_url, {
+                "topic": topic,
+                "complexity": complexity,
+                "domain": domain,
+                "timestamp": datetime.now().strftime("%Y%m%d_%H%M%S"),
+                "video_path": None,
+                "video_url": cached_url,
+                "cached": True,
+                "educational_breakdown": {},
+                "manim_structure": {},
+                "generation_metadata": {},
+            }
 
     print(f"\n{'='*60}")
     print(f"🎓 LEARNVIDAI - Educational Video Generator")
     print(f"{'='*60}")
     print(f"Topic: {topic}")
-    print(f"Output folder: {unique_output}")
     print(f"{'='*60}\n")
 
-    # === Step 1: Generate educational content ===
-    api_key = os.getenv("GOOGLE_API_KEY")
-    if not api_key:
-        raise ValueError("GOOGLE_API_KEY environment variable not set")
-
-    video_generator = ScienceVideoGenerator(google_api_key=api_key)
-    prompt = f"Create an educational animation about {topic} for {complexity} level ({domain})."
-    video_plan = video_generator.generate_complete_video_plan(prompt)
-    if not video_plan or "error" in video_plan:
-        raise Exception("Failed to generate educational content")
-    print("✅ Educational content generated.")
-
-    # === Step 2: Generate Manim code ===
-    manim_generator = ManIMCodeGenerator(google_api_key=api_key)
-    manim_code = manim_generator.generate_3b1b_manim_code(video_plan)
-    print("✅ Animation code generated.")
-
-    # === Step 3: Render video ke folder unik ===
-    print("\n🎬 Rendering animation...")
-    video_path = create_animation_from_code(manim_code, output_dir=str(unique_output))
-    if not video_path or not os.path.exists(video_path):
-        raise Exception("Failed to create animation")
-
-    prefix = f"{message_id}_" if message_id is not None else ""
-    new_video_name = f"{prefix}{timestamp}_{safe_topic}.mp4"
-    new_video_path = unique_output / new_video_name
-    os.rename(video_path, new_video_path)
-    video_path = str(new_video_path)
-
-    # === Pindahkan ke storage lokal dan buat URL publik ===
-    print("\n💾 Menyimpan video ke storage lokal...")
-    # stored_path, public_url = _move_video_to_storage(video_path, final_name=new_video_name)
-    public_url = _move_video_to_storage(video_path, final_name=new_video_name)
-
-    # 🧹 Hapus folder spesifik topik ini saja (folder sementara)
-    shutil.rmtree(unique_output, ignore_errors=True)
-    print(f"🧼 Deleted temp folder: {unique_output}")
+    ctx = PipelineContext(
+        topic=topic,
+        complexity=complexity,
+        domain=domain,
+        message_id=message_id,
+        use_cache=use_cache,
+        checkpoint=StageCheckpoint(checkpoint_key) if checkpoint_key else None,
+        publish=lambda event: print(event.get("message", "")),
+    )
+    VideoPipeline().run(ctx)
 
+    video_plan = ctx.video_plan or {}
     ai_response = {
         "topic": topic,
         "complexity": complexity,
         "domain": domain,
-        "timestamp": timestamp,
+        "timestamp": ctx.timestamp,
         "video_path": None,   # absolute path di server (opsional)
-        "video_url": public_url,     # URL publik untuk diakses frontend
+        "video_url": ctx.video_url,     # URL publik untuk diakses frontend
         "educational_breakdown": video_plan.get("educational_breakdown", {}),
         "manim_structure": video_plan.get("manim_structure", {}),
         "generation_metadata": video_plan.get("generation_metadata", {}),
+        "stage_timings": ctx.timings,
+        "token_usage": ctx.token_usage.summary() if ctx.token_usage else None,
     }
 
     # Kembalikan URL publik sebagai nilai pertama
     # supaya kalau dipakai langsung untuk disimpan di DB,
     # yang tersimpan adalah path seperti: /learnvid-ai/static/videos/xxx.mp4
-    return public_url, ai_response
+    return ctx.video_url, ai_response
+
+
+def _update_progress_message(progress_msg_id: Optional[int], text: str, video_url: Optional[str] = None) -> None:
+    """Update pesan progress di DB (hanya jika progress_msg_id diberikan)."""
+    if not progress_msg_id:
+        return
+    try:
+        from sqlmodel import Session
+        from MAIN.database import Message, engine
+
+        with Session(engine) as session:
+            msg = session.get(Message, progress_msg_id)
+            if msg:
+                msg.content = text
+                if video_url:
+                    msg.video_url = video_url
+                session.add(msg)
+                session.commit()
+    except Exception as e:
+        print(f"[DB ERROR] {e}")
+
+
+def _update_progress_message_soon(progress_msg_id: Optional[int], text: str) -> None:
+    """Versi non-blocking untuk event loop: update DB dijalankan di thread pool."""
+    if progress_msg_id:
+        asyncio.get_running_loop().run_in_executor(None, _update_progress_message, progress_msg_id, text)
+
+
+def _cached_result(topic: str, cached_url: str, progress_msg_id: Optional[int]) -> dict:
+    return {
+        "status": "completed",
+        "message": f"✅ Video tentang '{topic}' berhasil dibuat!",
+        "video_url": cached_url,
+        "message_id": progress_msg_id,
+        "cached": True,
+    }
+
+
+def _completed_event(ctx: PipelineContext, progress_msg_id: Optional[int]) -> dict:
+    return {
+        "status": "completed",
+        "message": f"✅ Video tentang '{ctx.topic}' berhasil dibuat!",
+        "video_url": ctx.video_url,
+        "message_id": progress_msg_id,  # 🟢 Include the ID
+        "stage_timings": ctx.timings,
+        "stage_retries": ctx.retries,
+        "token_usage": ctx.token_usage.summary() if ctx.token_usage else None,
+    }
+
+
+def _pipeline_context(
+    publish,
+    update_message,
+    topic: str,
+    message_id: Optional[int],
+    progress_msg_id: Optional[int],
+    complexity: str,
+    domain: str,
+    use_cache: bool,
+    checkpoint_key: Optional[str],
+    after_stage=None,
+    cancel_token: Optional[CancelToken] = None,
+    token_usage: Optional[TokenUsage] = None,
+    job_attempt: int = 1,
+) -> PipelineContext:
+    """PipelineContext yang event tahapnya juga mengupdate pesan progress di DB."""
+    def _publish(event: dict) -> None:
+        publish(event)
+        if event.get("stage"):
+            update_message(progress_msg_id, event.get("message") or "")
+
+    return PipelineContext(
+        topic=topic,
+        complexity=complexity,
+        domain=domain,
+        message_id=message_id,
+        use_cache=use_cache,
+        checkpoint=StageCheckpoint(checkpoint_key) if checkpoint_key else None,
+        publish=_publish,
+        after_stage=after_stage,
+        cancel_token=cancel_token,
+        token_usage=token_usage,
+        job_attempt=job_attempt,
+    )
+
+
+def _cancelled_event() -> dict:
+    return {"status": "cancelled", "message": "⛔ Pembuatan video dibatalkan."}
 
 
 def generate_video_for_topic_with_progress(
     topic: str, 
     message_id: Optional[int] = None,
     progress_msg_id: Optional[int] = None,  # 🟢 New parameter
-    chat_id: Optional[int] = None  # 🟢 New parameter
+    chat_id: Optional[int] = None,  # 🟢 New parameter
+    complexity: str = "high-school",
+    domain: str = "auto-detect",
+    use_cache: bool = True,
+    checkpoint_key: Optional[str] = None,
+    after_stage=None,
+    cancel_token: Optional[CancelToken] = None,
+    token_usage: Optional[TokenUsage] = None,
+    job_attempt: int = 1,
 ):
     """
-    Modified version that yields progress updates AND keeps connection alive
+    Modified version that yields progress updates AND keeps connection alive.
+
+    VideoPipeline berjalan di satu thread latar dan mengirim event lewat
+    ProgressBus: event langsung diteruskan begitu dipublish, dan heartbeat
+    (string komentar SSE) dikirim hanya saat tidak ada event selama
+    PROGRESS_HEARTBEAT_SECONDS.
+
+    Jika topik (setelah normalisasi) + complexity/domain sudah ada di
+    video cache, langsung yield 'completed' dengan URL yang sudah ada.
+
+    Jika checkpoint_key diberikan, hasil tiap tahap disimpan lewat
+    StageCheckpoint. Pemanggilan ulang dengan key yang sama melanjutkan
+    dari tahap terakhir yang berhasil.
+
+    after_stage(stage_name, ctx) dipanggil setelah setiap tahap; ia boleh
+    melempar PipelineInterrupted untuk menghentikan pipeline (event-nya
+    diteruskan ke konsumen, checkpoint tetap disimpan).
+
+    cancel_token (CancelToken) membatalkan pipeline secara kooperatif:
+    proses manim yang sedang berjalan dibunuh, tahap berikutnya tidak
+    dimulai, dan event 'cancelled' dikirim.
+
+    token_usage (TokenUsage) opsional: akumulator token job; worker
+    mengisinya dari hitungan attempt sebelumnya (JOB_TOKEN_BUDGET).
+
+    job_attempt: attempt job di antrian (1 = pertama). Attempt ulang
+    meminta jawaban LLM baru alih-alih memakai cache yang baru gagal.
     """
-    import shutil
-    import time
-    import concurrent.futures
-    import random
-    import string
-    from pathlib import Path
-    
     print(f"[DEBUG] Starting video generation for topic: '{topic}'")
-    
-    BASE_DIR = Path(__file__).resolve().parent
-    output_root = (BASE_DIR.parent / "MAIN" / "output").resolve()
-    output_root.mkdir(parents=True, exist_ok=True)
 
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    safe_topic = "".join(c if c.isalnum() else "_" for c in topic)[:25]
-    unique_output = output_root / f"{timestamp}_{safe_topic}"
-    unique_output.mkdir(parents=True, exist_ok=True)
+    if use_cache:
+        cached_url = get_video_cache().get(topic, complexity, domain)
+        if cached_url:
+            yield _cached_result(topic, cached_url, progress_msg_id)
+            return
 
-    print(f"[DEBUG] Output folder: {unique_output}")
+    yield from ProgressBus().run(
+        _run_video_pipeline,
+        topic,
+        message_id=message_id,
+        progress_msg_id=progress_msg_id if chat_id else None,
+        complexity=complexity,
+        domain=domain,
+        use_cache=use_cache,
+        checkpoint_key=checkpoint_key,
+        after_stage=after_stage,
+        cancel_token=cancel_token,
+        token_usage=token_usage,
+        job_attempt=job_attempt,
+    )
 
+
+def _run_video_pipeline(publish, topic: str, progress_msg_id: Optional[int] = None, **kwargs) -> None:
+    """Jalankan VideoPipeline di thread pemanggil dan publish() hasil akhirnya."""
+    ctx = _pipeline_context(publish, _update_progress_message, topic, progress_msg_id=progress_msg_id, **kwargs)
     try:
-        # === Step 1: Generate educational content ===
-        yield {"status": "generating_content", "message": "📝 Membuat konten edukatif..."}
-        
-        # 🟢 Update DB
-        if progress_msg_id and chat_id:
-            try:
-                with Session(engine) as session:
-                    msg = session.get(Message, progress_msg_id)
-                    if msg:
-                        msg.content = "📝 Membuat konten edukatif..."
-                        session.add(msg)
-                        session.commit()
-            except Exception as e:
-                print(f"[DB ERROR] {e}")
-        
-        print("[DEBUG] Step 1: Starting educational content generation")
-        
-        api_key = os.getenv("GOOGLE_API_KEY")
-        if not api_key:
-            raise ValueError("GOOGLE_API_KEY environment variable not set")
-            
-        video_generator = ScienceVideoGenerator(google_api_key=api_key)
-        prompt = f"Create an educational animation about {topic}"
-        
-        with concurrent.futures.ThreadPoolExecutor(max_workers=1) as executor:
-            future = executor.submit(video_generator.generate_complete_video_plan, prompt)
-            
-            heartbeat_count = 0
-            while not future.done():
-                time.sleep(1)
-                heartbeat_count += 1
-                padding = ''.join(random.choices(string.ascii_letters, k=400))
-                yield f": heartbeat-content-{heartbeat_count}-{padding}\n\n"
-            
-            video_plan = future.result()
-        
-        if not video_plan or "error" in video_plan:
-            error_msg = f"Failed to generate educational content: {video_plan.get('error', 'Unknown error')}"
-            raise Exception(error_msg)
-        
-        print("[DEBUG] Step 1 completed")
-        
-        # === Step 2: Generate Manim code ===
-        yield {"status": "generating_code", "message": "💻 Membuat kode animasi..."}
-        
-        # 🟢 Update DB
-        if progress_msg_id and chat_id:
-            try:
-                with Session(engine) as session:
-                    msg = session.get(Message, progress_msg_id)
-                    if msg:
-                        msg.content = "💻 Membuat kode animasi..."
-                        session.add(msg)
-                        session.commit()
-            except Exception as e:
-                print(f"[DB ERROR] {e}")
-        
-        print("[DEBUG] Step 2: Starting Manim code generation")
-        
-        manim_generator = ManIMCodeGenerator(google_api_key=api_key)
-        
-        with concurrent.futures.ThreadPoolExecutor(max_workers=1) as executor:
-            future = executor.submit(manim_generator.generate_3b1b_manim_code, video_plan)
-            
-            heartbeat_count = 0
-            while not future.done():
-                time.sleep(1)
-                heartbeat_count += 1
-                padding = ''.join(random.choices(string.ascii_letters, k=400))
-                yield f": heartbeat-code-{heartbeat_count}-{padding}\n\n"
-            
-            manim_code = future.result()
-        
-        if not manim_code or len(manim_code.strip()) < 100:
-            raise Exception("Generated Manim code is too short or empty")
-        
-        print(f"[DEBUG] Step 2 completed ({len(manim_code)} chars)")
-        
-        # === Step 3: Render video ===
-        yield {"status": "rendering", "message": "🎬 Merender video (mohon tunggu)..."}
-        
-        # 🟢 Update DB
-        if progress_msg_id and chat_id:
-            try:
-                with Session(engine) as session:
-                    msg = session.get(Message, progress_msg_id)
-                    if msg:
-                        msg.content = "🎬 Merender video (mohon tunggu)..."
-                        session.add(msg)
-                        session.commit()
-            except Exception as e:
-                print(f"[DB ERROR] {e}")
-        
-        print("[DEBUG] Step 3: Starting video rendering with Heartbeat")
-        
-        video_path = None
-        
-        with concurrent.futures.ThreadPoolExecutor(max_workers=1) as executor:
-            future = executor.submit(create_animation_from_code, manim_code, output_dir=str(unique_output))
-            
-            start_render_time = time.time()
-            heartbeat_count = 0
-            while not future.done():
-                time.sleep(1)
-                heartbeat_count += 1
-                padding = ''.join(random.choices(string.ascii_letters, k=400))
-                yield f": heartbeat-render-{heartbeat_count}-{padding}\n\n"
-                
-                if time.time() - start_render_time > 300: 
-                    print("[DEBUG] Render timeout break")
-                    break
-
-            try:
-                video_path = future.result()
-            except Exception as render_err:
-                raise Exception(f"Render failed: {str(render_err)}")
-        
-        if not video_path or not os.path.exists(video_path):
-            raise Exception("Failed to create animation (File not found).")
-
-        file_size = os.path.getsize(video_path)
-        print(f"[DEBUG] Rendered file size: {file_size} bytes")
-        if file_size == 0:
-            print(f"[DEBUG ERROR] ⚠️ Video file is empty!")
-
-        prefix = f"{message_id}_" if message_id is not None else ""
-        new_video_name = f"{prefix}{timestamp}_{safe_topic}.mp4"
-        new_video_path = unique_output / new_video_name
-
-        print(f"[DEBUG] Renaming video to: {new_video_path}")
-        os.rename(video_path, new_video_path)
-        video_path = str(new_video_path) 
-
-        print("[DEBUG] Step 3 completed")
-
-        # === Step 4: Move to local storage ===
-        yield {"status": "saving", "message": "💾 Menyimpan video ke server..."}
-        
-        # 🟢 Update DB
-        if progress_msg_id and chat_id:
-            try:
-                with Session(engine) as session:
-                    msg = session.get(Message, progress_msg_id)
-                    if msg:
-                        msg.content = "💾 Menyimpan video ke server..."
-                        session.add(msg)
-                        session.commit()
-            except Exception as e:
-                print(f"[DB ERROR] {e}")
-        
-        print("[DEBUG] Step 4: Moving video to local storage")
-
-        try:
-            public_url = _move_video_to_storage(video_path, final_name=new_video_name)
-            shutil.rmtree(unique_output, ignore_errors=True)
-
-        except Exception as storage_error:
-            yield {"status": "error", "message": f"❌ {str(storage_error)}"}
+        VideoPipeline().run(ctx)
+    except PipelineInterrupted as interrupted:
+        publish(interrupted.event)
+        return
+    except JobCancelled:
+        print(f"[PIPELINE] Cancelled: '{topic}'")
+        publish(_cancelled_event())
+        return
+    except Exception as e:
+        import traceback
+        print(f"[DEBUG EXCEPTION] {traceback.format_exc()}")
+        error_message = f"❌ Error: {str(e)}"
+        # 🟢 Update the same message with error
+        _update_progress_message(progress_msg_id, error_message)
+        publish({"status": "error", "message": error_message})
+        return
+
+    # 🟢 FINAL: Update the SAME message with video URL
+    completed = _completed_event(ctx, progress_msg_id)
+    _update_progress_message(progress_msg_id, completed["message"], video_url=ctx.video_url)
+    publish(completed)
+
+
+async def agenerate_video_for_topic_with_progress(
+    topic: str,
+    message_id: Optional[int] = None,
+    progress_msg_id: Optional[int] = None,
+    complexity: str = "high-school",
+    domain: str = "auto-detect",
+    use_cache: bool = True,
+    checkpoint_key: Optional[str] = None,
+    after_stage=None,
+    cancel_token: Optional[CancelToken] = None,
+    token_usage: Optional[TokenUsage] = None,
+    job_attempt: int = 1,
+):
+    """
+    Versi asyncio dari generate_video_for_topic_with_progress.
+
+    Gemini dipanggil lewat ainvoke, manim lewat asyncio subprocess, dan
+    upload R2 di asyncio.to_thread, jadi satu event loop bisa menjalankan
+    banyak job sekaligus tanpa satu thread per job. Event dan heartbeat
+    sama persis dengan versi sinkron. Menghentikan iterasi lebih awal
+    membatalkan task pipeline (panggilan ainvoke / subprocess ikut batal).
+    """
+    print(f"[DEBUG] Starting async video generation for topic: '{topic}'")
+
+    if use_cache:
+        cached_url = await asyncio.to_thread(get_video_cache().get, topic, complexity, domain)
+        if cached_url:
+            yield _cached_result(topic, cached_url, progress_msg_id)
             return
 
-        # 🟢 FINAL: Update the SAME message with video URL
-        final_message = f"✅ Video tentang '{topic}' berhasil dibuat!"
-        
-        if progress_msg_id and chat_id:
-            try:
-                with Session(engine) as session:
-                    msg = session.get(Message, progress_msg_id)
-                    if msg:
-                        msg.content = final_message
-                        msg.video_url = public_url  # 🟢 Add video URL
-                        session.add(msg)
-                        session.commit()
-            except Exception as e:
-                print(f"[DB ERROR] {e}")
-
-        # 🟢 Send completion with message_id so frontend knows it's the same message
-        yield {
-            "status": "completed",
-            "message": final_message,
-            "video_url": public_url,
-            "message_id": progress_msg_id  # 🟢 Include the ID
-        }
-            
+    bus = AsyncProgressBus().run(
+        _arun_video_pipeline,
+        topic,
+        message_id=message_id,
+        progress_msg_id=progress_msg_id,
+        complexity=complexity,
+        domain=domain,
+        use_cache=use_cache,
+        checkpoint_key=checkpoint_key,
+        after_stage=after_stage,
+        cancel_token=cancel_token,
+        token_usage=token_usage,
+        job_attempt=job_attempt,
+    )
+    events = bus.__aiter__()
+    try:
+        async for event in events:
+            yield event
+    finally:
+        # Konsumen menutup stream lebih awal -> task pipeline ikut dibatalkan
+        await events.aclose()
+
+
+async def _arun_video_pipeline(publish, topic: str, progress_msg_id: Optional[int] = None, **kwargs) -> None:
+    """Versi async dari _run_video_pipeline."""
+    ctx = _pipeline_context(publish, _update_progress_message_soon, topic, progress_msg_id=progress_msg_id, **kwargs)
+    try:
+        await VideoPipeline().arun(ctx)
+    except PipelineInterrupted as interrupted:
+        publish(interrupted.event)
+        return
+    except JobCancelled:
+        print(f"[PIPELINE] Cancelled: '{topic}'")
+        publish(_cancelled_event())
+        return
     except Exception as e:
         import traceback
         print(f"[DEBUG EXCEPTION] {traceback.format_exc()}")
-        
         error_message = f"❌ Error: {str(e)}"
-        
-        # 🟢 Update the same message with error
-        if progress_msg_id and chat_id:
-            try:
-                with Session(engine) as session:
-                    msg = session.get(Message, progress_msg_id)
-                    if msg:
-                        msg.content = error_message
-                        session.add(msg)
-                        session.commit()
-            except Exception as db_err:
-                print(f"[DB ERROR] {db_err}")
-        
-        yield {"status": "error", "message": error_message}
-        
-        try:
-            if unique_output.exists():
-                shutil.rmtree(unique_output, ignore_errors=True)
-        except:
-            pass
-        
+        await asyncio.to_thread(_update_progress_message, progress_msg_id, error_message)
+        publish({"status": "error", "message": error_message})
+        return
+
+    completed = _completed_event(ctx, progress_msg_id)
+    await asyncio.to_thread(_update_progress_message, progress_msg_id, completed["message"], ctx.video_url)
+    publish(completed)
+
+
 import sys
 # Example usage
 if __name__ == "__main__":
@@ -422,6 +379,7 @@ if __name__ == "__main__":
     if len(sys.argv) < 2:
         print("Usage: python3 run.py <topic> [complexity] [domain] [output_dir]")
         print("Example: python3 run.py 'Photosynthesis' high-school biology")
+        print("Batch mode: python -m MAIN.AI.batch topics.txt [--workers N]")
         sys.exit(1)
 
     topic = sys.argv[1]
@@ -0,0 +1,274 @@
+"""
+Batch pre-generation: isi video cache dengan banyak topik sekaligus
+(mis. kurikulum satu semester) supaya request di jam kelas jadi cache hit.
+
+    python -m MAIN.AI.batch topics.txt
+    python -m MAIN.AI.batch curriculum.csv --workers 4 --topics-per-minute 6
+
+Input:
+    .txt -> satu topik per baris (baris kosong / diawali # diabaikan)
+    .csv -> kolom topic, opsional complexity dan domain
+
+Setiap topik yang selesai ditulis ke manifest JSONL (default:
+<input>.manifest.jsonl). Menjalankan ulang perintah yang sama
+melanjutkan batch: topik yang sudah 'ok' / 'cached' di manifest dilewati,
+dan topik yang terputus di tengah melanjutkan dari checkpoint-nya.
+"""
+
+import argparse
+import csv
+import json
+import multiprocessing
+import os
+import queue
+import re
+import sys
+import time
+from collections import deque
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# Gemini rate limit: batasi berapa topik baru yang dimulai per menit
+BATCH_TOPICS_PER_MINUTE = float(os.getenv("BATCH_TOPICS_PER_MINUTE", "4"))
+BATCH_MAX_RATE_LIMIT_RETRIES = int(os.getenv("BATCH_MAX_RATE_LIMIT_RETRIES", "5"))
+_RATE_LIMIT_PATTERN = re.compile(r"429|resource.?exhausted|quota|rate.?limit", re.IGNORECASE)
+
+DONE_STATUSES = {"ok", "cached"}
+
+
+def read_topics(path: str, complexity: str = "high-school", domain: str = "auto-detect") -> List[Dict]:
+    """Baca daftar topik (.txt / .csv) tanpa duplikat."""
+    from MAIN.AI.video_cache import video_cache_key
+
+    rows = []
+    with open(path, encoding="utf-8", newline="") as f:
+        if path.lower().endswith(".csv"):
+            for row in csv.DictReader(f):
+                rows.append({
+                    "topic": (row.get("topic") or "").strip(),
+                    "complexity": (row.get("complexity") or "").strip() or complexity,
+                    "domain": (row.get("domain") or "").strip() or domain,
+                })
+        else:
+            for line in f:
+                line = line.strip()
+                if line and not line.startswith("#"):
+                    rows.append({"topic": line, "complexity": complexity, "domain": domain})
+
+    tasks, seen = [], set()
+    for row in rows:
+        if not row["topic"]:
+            continue
+        # Topik tanpa key cache (hanya kata pengisi) tetap dikerjakan, dikunci teks aslinya
+        key = video_cache_key(row["topic"], row["complexity"], row["domain"]) or f"raw:{row['topic'].lower()}"
+        if key in seen:
+            continue
+        seen.add(key)
+        tasks.append({**row, "key": key, "attempts": 0})
+    return tasks
+
+
+def read_manifest(path: Path) -> Dict[str, Dict]:
+    """Record terakhir per key dari manifest (baris rusak karena crash diabaikan)."""
+    records = {}
+    if not path.exists():
+        return records
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if record.get("key"):
+                records[record["key"]] = record
+    return records
+
+
+def append_manifest(path: Path, record: Dict) -> None:
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def is_rate_limited(error: Optional[str]) -> bool:
+    return bool(error and _RATE_LIMIT_PATTERN.search(error))
+
+
+def _record(task: Dict, status: str, video_url: Optional[str] = None,
+            error: Optional[str] = None, seconds: float = 0.0, tokens: Optional[int] = None) -> Dict:
+    return {
+        "key": task["key"],
+        "topic": task["topic"],
+        "complexity": task["complexity"],
+        "domain": task["domain"],
+        "status": status,
+        "video_url": video_url,
+        "error": error,
+        "seconds": round(seconds, 1),
+        "tokens": tokens,
+        "attempts": task["attempts"] + 1,
+        "finished_at": datetime.now().isoformat(timespec="seconds"),
+    }
+
+
+def generate_one(task: Dict) -> Dict:
+    """Dijalankan di proses pool: render satu topik, kembalikan record manifest."""
+    from MAIN.AI.app import generate_educational_video
+
+    started = time.monotonic()
+    try:
+        video_url, response = generate_educational_video(
+            task["topic"],
+            task["complexity"],
+            task["domain"],
+            use_cache=True,
+            # Checkpoint per topik: batch yang diputus melanjutkan dari tahap terakhir
+            checkpoint_key=f"batch-{task['key']}",
+        )
+    except Exception as e:
+        return _record(task, "failed", error=str(e), seconds=time.monotonic() - started)
+    status = "cached" if response.get("cached") else "ok"
+    tokens = (response.get("token_usage") or {}).get("total_tokens")
+    return _record(task, status, video_url=video_url, seconds=time.monotonic() - started, tokens=tokens)
+
+
+def run_batch(
+    tasks: List[Dict],
+    manifest_path: Path,
+    workers: int,
+    topics_per_minute: float = BATCH_TOPICS_PER_MINUTE,
+    retry_failed: bool = True,
+) -> Dict[str, int]:
+    """
+    Jalankan tasks di process pool dan tulis hasilnya ke manifest.
+
+    Returns:
+        dict: jumlah topik per status
+    """
+    from MAIN.AI.video_cache import get_video_cache
+
+    done = read_manifest(manifest_path)
+    counts = {"ok": 0, "cached": 0, "failed": 0, "skipped": 0}
+    pending = deque()
+    cache = get_video_cache()
+
+    for task in tasks:
+        previous = done.get(task["key"])
+        if previous and (previous["status"] in DONE_STATUSES or not retry_failed):
+            counts["skipped"] += 1
+            continue
+        if cache.get(task["topic"], task["complexity"], task["domain"]):
+            append_manifest(manifest_path, _record(task, "cached"))
+            counts["cached"] += 1
+            continue
+        pending.append(task)
+
+    total = len(pending)
+    print(f"[BATCH] {total} topic(s) to render, {counts['skipped']} already done, "
+          f"{counts['cached']} already cached; {workers} worker(s), {topics_per_minute:g} topic(s)/min")
+    if not pending:
+        return counts
+
+    start_interval = 60.0 / topics_per_minute if topics_per_minute > 0 else 0.0
+    results: "queue.Queue" = queue.Queue()
+    in_flight: Dict[str, Dict] = {}
+    next_start = pause_until = 0.0
+    finished = 0
+
+    ctx = multiprocessing.get_context("spawn")
+    pool = ctx.Pool(processes=workers, maxtasksperchild=1)
+    try:
+        while pending or in_flight:
+            now = time.monotonic()
+            while pending and len(in_flight) < workers and now >= max(next_start, pause_until):
+                task = pending.popleft()
+                in_flight[task["key"]] = task
+                pool.apply_async(
+                    generate_one,
+                    (task,),
+                    callback=results.put,
+                    error_callback=lambda e, task=task: results.put(_record(task, "failed", error=str(e))),
+                )
+                print(f"[BATCH] ▶ {task['topic']} ({task['complexity']}, {task['domain']})")
+                next_start = now + start_interval
+
+            try:
+                record = results.get(timeout=1.0)
+            except queue.Empty:
+                continue
+
+            task = in_flight.pop(record["key"])
+            if (
+                record["status"] == "failed"
+                and is_rate_limited(record["error"])
+                and task["attempts"] < BATCH_MAX_RATE_LIMIT_RETRIES
+            ):
+                # Kena rate limit Gemini: tunda SEMUA topik baru, lalu coba lagi
+                backoff = min(600.0, 30.0 * 2 ** task["attempts"])
+                task["attempts"] += 1
+                pause_until = time.monotonic() + backoff
+                pending.appendleft(task)
+                print(f"[BATCH] ⏳ Rate limited on '{task['topic']}', pausing new topics for {backoff:.0f}s")
+                continue
+
+            append_manifest(manifest_path, record)
+            counts[record["status"]] += 1
+            finished += 1
+            icon = "✅" if record["status"] in DONE_STATUSES else "❌"
+            print(f"[BATCH] {icon} [{finished}/{total}] {record['topic']} -> "
+                  f"{record['video_url'] or record['error']} ({record['seconds']}s)")
+    except KeyboardInterrupt:
+        print("\n[BATCH] Interrupted; run the same command again to resume.")
+        pool.terminate()
+        raise
+    else:
+        pool.close()
+    finally:
+        pool.join()
+
+    return counts
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="LEARNVIDAI batch video pre-generation")
+    parser.add_argument("input", help="Daftar topik (.txt satu per baris, atau .csv dengan kolom topic[,complexity,domain])")
+    parser.add_argument("--complexity", default="high-school", help="Default complexity untuk baris tanpa kolom complexity")
+    parser.add_argument("--domain", default="auto-detect", help="Default domain untuk baris tanpa kolom domain")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=int(os.getenv("BATCH_WORKERS", str(os.cpu_count() or 1))),
+        help="Jumlah proses render (default: BATCH_WORKERS atau jumlah core)",
+    )
+    parser.add_argument(
+        "--topics-per-minute",
+        type=float,
+        default=BATCH_TOPICS_PER_MINUTE,
+        help="Batas topik baru yang dimulai per menit (rate limit Gemini, 0 = tanpa batas)",
+    )
+    parser.add_argument("--manifest", help="Path manifest JSONL (default: <input>.manifest.jsonl)")
+    parser.add_argument("--skip-failed", action="store_true", help="Jangan ulangi topik yang gagal di run sebelumnya")
+    args = parser.parse_args(argv)
+
+    tasks = read_topics(args.input, args.complexity, args.domain)
+    manifest_path = Path(args.manifest or f"{args.input}.manifest.jsonl")
+    try:
+        counts = run_batch(
+            tasks,
+            manifest_path,
+            workers=max(1, args.workers),
+            topics_per_minute=args.topics_per_minute,
+            retry_failed=not args.skip_failed,
+        )
+    except KeyboardInterrupt:
+        return 130
+
+    print(f"\n📊 Batch done: {counts['ok']} rendered, {counts['cached']} cached, "
+          f"{counts['failed']} failed, {counts['skipped']} skipped (manifest: {manifest_path})")
+    return 1 if counts["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
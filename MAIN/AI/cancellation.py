@@ -0,0 +1,191 @@
+"""
+Pembatalan kooperatif dan deadline untuk pipeline generate video.
+
+Worker membuat satu CancelToken per job. Token dipasang sebagai
+"token aktif" (contextvar) selama pipeline berjalan, sehingga kode jauh
+di dalam (mis. _run_manim) bisa mendaftarkan subprocess manim dan
+memeriksa pembatalan tanpa parameter tambahan di setiap fungsi.
+
+JobCancelled turunan BaseException (seperti asyncio.CancelledError) supaya
+tidak tertelan oleh blok `except Exception` di dalam pipeline, yang
+misalnya akan menganggap render yang dibunuh sebagai error biasa lalu
+meminta perbaikan ke LLM.
+
+Deadline: token juga membawa batas waktu job (JOB_DEADLINE_SECONDS) dan
+batas waktu tahap yang sedang berjalan (STAGE_DEADLINE_<TAHAP>_SECONDS).
+Sisa waktunya dipakai sebagai timeout request LLM (llm_timeout), batas
+wall-clock proses manim, dan untuk memutuskan apakah masih ada waktu
+untuk satu putaran perbaikan lagi (has_time_for).
+"""
+
+import contextvars
+import os
+import signal
+import threading
+import time
+from typing import Optional
+
+# Batas total satu attempt job dan batas per tahap (detik)
+JOB_DEADLINE_SECONDS = float(os.getenv("JOB_DEADLINE_SECONDS", "1500"))
+_DEFAULT_STAGE_DEADLINES = {
+    "plan": 180,
+    "code": 240,
+    "validate": 600,
+    "render": 600,
+    "store": 120,
+}
+# Timeout satu request Gemini bila tidak ada deadline yang lebih ketat
+LLM_REQUEST_TIMEOUT_SECONDS = float(os.getenv("LLM_REQUEST_TIMEOUT_SECONDS", "120"))
+
+
+def stage_deadline_seconds(stage_name: str) -> Optional[float]:
+    """Batas waktu tahap dari env STAGE_DEADLINE_<TAHAP>_SECONDS (0 = tanpa batas)."""
+    default = _DEFAULT_STAGE_DEADLINES.get(stage_name, 0)
+    seconds = float(os.getenv(f"STAGE_DEADLINE_{stage_name.upper()}_SECONDS", str(default)))
+    return seconds if seconds > 0 else None
+
+
+class JobCancelled(BaseException):
+    """Job dibatalkan (client SSE terputus atau pembatalan manual)."""
+
+
+class DeadlineExceeded(BaseException):
+    """Batas waktu tahap / job habis. Pipeline mengubahnya menjadi StageError."""
+
+
+class CancelToken:
+    def __init__(self, parent: Optional["CancelToken"] = None):
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._processes = []
+        self._children = []
+        self._parent = parent
+        self._job_deadline = None
+        self._stage_deadline = None
+        self.stage = None
+        # TokenUsage job (MAIN.AI.token_budget); token turunan menambah ke milik induknya
+        self.usage = parent.usage if parent else None
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set() or bool(self._parent and self._parent.cancelled)
+
+    def child(self) -> "CancelToken":
+        """
+        Token turunan (mis. satu kandidat kode): bisa dibatalkan sendiri tanpa
+        membatalkan job, tetapi ikut batal / kehabisan waktu bersama induknya.
+        """
+        child = CancelToken(parent=self)
+        with self._lock:
+            self._children.append(child)
+        if self.cancelled:
+            child.cancel()
+        return child
+
+    def start_job(self, seconds: Optional[float]) -> None:
+        self._job_deadline = time.monotonic() + seconds if seconds else None
+
+    def start_stage(self, stage_name: str, seconds: Optional[float]) -> None:
+        self.stage = stage_name
+        self._stage_deadline = time.monotonic() + seconds if seconds else None
+
+    def remaining(self) -> Optional[float]:
+        """Sisa detik sampai deadline terdekat (tahap atau job), None jika tanpa batas."""
+        deadlines = [d for d in (self._job_deadline, self._stage_deadline) if d is not None]
+        remaining = min(deadlines) - time.monotonic() if deadlines else None
+        parent_remaining = self._parent.remaining() if self._parent else None
+        if remaining is None or parent_remaining is None:
+            return remaining if parent_remaining is None else parent_remaining
+        return min(remaining, parent_remaining)
+
+    def cancel(self) -> None:
+        """Tandai batal dan bunuh semua process group manim yang terdaftar."""
+        self._event.set()
+        with self._lock:
+            processes, self._processes = self._processes, []
+            children = list(self._children)
+        for process in processes:
+            kill_process_group(process)
+        for child in children:
+            child.cancel()
+
+    def raise_if_cancelled(self) -> None:
+        if self._parent:
+            self._parent.raise_if_cancelled()
+        if self.cancelled:
+            raise JobCancelled()
+        remaining = self.remaining()
+        if remaining is not None and remaining <= 0:
+            if self._job_deadline is not None and self._job_deadline <= time.monotonic():
+                raise DeadlineExceeded("Batas waktu job habis")
+            raise DeadlineExceeded(f"Batas waktu tahap '{self.stage}' habis")
+
+    def register_process(self, process) -> None:
+        """Daftarkan subprocess (dijalankan dengan start_new_session=True)."""
+        with self._lock:
+            self._processes.append(process)
+        if self.cancelled:
+            kill_process_group(process)
+
+    def unregister_process(self, process) -> None:
+        with self._lock:
+            if process in self._processes:
+                self._processes.remove(process)
+
+
+_current_token: contextvars.ContextVar = contextvars.ContextVar("cancel_token", default=None)
+
+
+def set_current_token(token: Optional[CancelToken]):
+    return _current_token.set(token)
+
+
+def current_token() -> Optional[CancelToken]:
+    return _current_token.get()
+
+
+def raise_if_cancelled() -> None:
+    token = current_token()
+    if token:
+        token.raise_if_cancelled()
+
+
+def current_stage() -> Optional[str]:
+    """Tahap pipeline yang sedang berjalan (token turunan memakai tahap induknya)."""
+    token = current_token()
+    while token is not None and token.stage is None:
+        token = token._parent
+    return token.stage if token else None
+
+
+def remaining_seconds() -> Optional[float]:
+    token = current_token()
+    return token.remaining() if token else None
+
+
+def llm_timeout(default: float = LLM_REQUEST_TIMEOUT_SECONDS) -> float:
+    """
+    Timeout untuk satu request LLM: default, dipotong oleh sisa deadline.
+    Dipanggil tepat sebelum request, jadi job yang sudah dibatalkan /
+    kehabisan waktu tidak memulai panggilan LLM baru.
+    """
+    raise_if_cancelled()
+    remaining = remaining_seconds()
+    return default if remaining is None else max(1.0, min(default, remaining))
+
+
+def has_time_for(seconds: float) -> bool:
+    """Masih cukup waktu untuk pekerjaan yang diperkirakan makan `seconds` detik?"""
+    remaining = remaining_seconds()
+    return remaining is None or remaining >= seconds
+
+
+def kill_process_group(process) -> None:
+    """SIGKILL ke seluruh process group (manim + ffmpeg / latex turunannya)."""
+    if process.returncode is not None:
+        return
+    try:
+        os.killpg(os.getpgid(process.pid), signal.SIGKILL)
+        print(f"[CANCEL] Killed process group of pid {process.pid}")
+    except (ProcessLookupError, PermissionError, OSError):
+        pass
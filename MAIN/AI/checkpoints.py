@@ -0,0 +1,116 @@
+"""
+Checkpoint per job untuk pipeline generate video.
+
+Setiap tahap yang selesai menyimpan hasilnya di
+LEARNVIDAI_STATE_DIR/checkpoints/<key>/ :
+
+    plan.json            -> video plan (stage 1 + 2)
+    manim_code.py        -> kode hasil ManIMCodeGenerator
+    validated_code.py    -> kode yang sudah lolos compile + trial render
+    video.mp4            -> hasil render final
+
+Jika job diulang (retry / worker crash), pipeline melanjutkan dari tahap
+terakhir yang berhasil alih-alih memanggil Gemini dan merender ulang.
+"""
+
+import json
+import os
+import re
+import shutil
+import time
+from typing import Optional
+
+from MAIN.AI.local_store import get_state_dir
+
+CHECKPOINT_TTL_SECONDS = int(os.getenv("CHECKPOINT_TTL_HOURS", "24")) * 3600
+
+
+class StageCheckpoint:
+    def __init__(self, key: str):
+        safe_key = re.sub(r"[^\w\-]", "_", str(key))
+        self.dir = get_state_dir() / "checkpoints" / safe_key
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self._expire_if_stale()
+
+    def _expire_if_stale(self) -> None:
+        files = [p for p in self.dir.iterdir() if p.is_file()]
+        if files and time.time() - max(p.stat().st_mtime for p in files) > CHECKPOINT_TTL_SECONDS:
+            print(f"[CHECKPOINT] Expired checkpoint discarded: {self.dir}")
+            self.clear()
+            self.dir.mkdir(parents=True, exist_ok=True)
+
+    def _write(self, name: str, content: str) -> None:
+        # Tulis ke file sementara lalu rename supaya tidak ada checkpoint setengah jadi
+        tmp_path = self.dir / f".{name}.tmp"
+        tmp_path.write_text(content, encoding="utf-8")
+        os.replace(tmp_path, self.dir / name)
+
+    def _read(self, name: str) -> Optional[str]:
+        path = self.dir / name
+        return path.read_text(encoding="utf-8") if path.exists() else None
+
+    # === Stage 1: video plan ===
+    def save_plan(self, video_plan: dict) -> None:
+        self._write("plan.json", json.dumps(video_plan, ensure_ascii=False))
+
+    def load_plan(self) -> Optional[dict]:
+        content = self._read("plan.json")
+        try:
+            return json.loads(content) if content else None
+        except json.JSONDecodeError:
+            return None
+
+    # === Stage 2: kode Manim ===
+    def save_code(self, manim_code: str) -> None:
+        self._write("manim_code.py", manim_code)
+
+    def load_code(self) -> Optional[str]:
+        return self._read("manim_code.py")
+
+    def save_validated_code(self, manim_code: str) -> None:
+        self._write("validated_code.py", manim_code)
+
+    def load_validated_code(self) -> Optional[str]:
+        return self._read("validated_code.py")
+
+    # === Stage 3: video hasil render ===
+    def save_video(self, video_path: str) -> str:
+        """Pindahkan video ke folder checkpoint dan kembalikan path barunya."""
+        target = self.dir / "video.mp4"
+        shutil.move(str(video_path), str(target))
+        return str(target)
+
+    def load_video(self) -> Optional[str]:
+        path = self.dir / "video.mp4"
+        return str(path) if path.exists() and path.stat().st_size > 0 else None
+
+    def completed_stage(self) -> Optional[str]:
+        """Nama tahap terakhir yang tersimpan (untuk log / progress)."""
+        if self.load_video():
+            return "render"
+        if self.load_validated_code():
+            return "validate"
+        if self.load_code():
+            return "code"
+        if self.load_plan():
+            return "plan"
+        return None
+
+    def clear(self) -> None:
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+
+def purge_expired_checkpoints() -> int:
+    """Hapus folder checkpoint yang tidak disentuh lebih lama dari TTL."""
+    root = get_state_dir() / "checkpoints"
+    if not root.exists():
+        return 0
+    removed = 0
+    cutoff = time.time() - CHECKPOINT_TTL_SECONDS
+    for path in root.iterdir():
+        if path.is_dir() and path.stat().st_mtime < cutoff:
+            shutil.rmtree(path, ignore_errors=True)
+            removed += 1
+    if removed:
+        print(f"[CHECKPOINT] Purged {removed} expired checkpoint(s)")
+    return removed
@@ -0,0 +1,359 @@
+"""
+Perbaikan kode Manim yang terarah: hanya bagian yang gagal dikirim ke LLM.
+
+Sebelumnya setiap percobaan fix mengirim seluruh scene (ratusan baris)
+ditambah seluruh stdout manim, dan menerima seluruh file kembali. Di sini
+kegagalan dilokalisasi lebih dulu:
+
+1. traceback   -> baris terdalam di file scene (format traceback Python
+                  biasa / py_compile maupun traceback rich milik manim),
+                  lalu method yang membungkus baris itu. Frame di method
+                  langkah (step_*) diutamakan dibanding helper template.
+2. simbol      -> traceback tidak menunjuk ke file scene: nama / string
+                  dari pesan error (NameError, LaTeX, ...) dicari di
+                  method; dipakai bila hanya satu method yang memuatnya.
+3. bisect      -> masih ambigu: render loop menjalankan trial render
+                  dengan sebagian pemanggilan langkah di construct()
+                  dimatikan (prefix), sampai langkah pertama yang gagal
+                  ketemu (bisect_steps / abisect_steps).
+
+Yang dikirim ke model hanya region tsb, header file (import + signature
+class + daftar method yang tersedia), dan ekor pesan error. Balasannya
+berupa pengganti region, lalu ditempel kembali (apply_patch). Patch yang
+tidak bisa di-parse dibuang, dan pemanggil jatuh kembali ke fix satu file.
+
+FIX_TARGETED=0 mematikan semuanya (selalu fix satu file).
+"""
+
+import ast
+import os
+import re
+import textwrap
+from dataclasses import dataclass
+from typing import Callable, List, Optional, Tuple
+
+from langchain_core.messages import HumanMessage, SystemMessage
+
+from MAIN.AI import metrics
+
+FIX_TARGETED = os.getenv("FIX_TARGETED", "1") != "0"
+# Baris di sekitar error yang berada di luar method (import, kode top-level)
+FIX_CONTEXT_LINES = int(os.getenv("FIX_CONTEXT_LINES", "3"))
+# Ekor pesan error yang ikut dikirim
+FIX_ERROR_LINES = int(os.getenv("FIX_ERROR_LINES", "30"))
+# Maksimum trial render untuk bisect (3 = sampai 8 langkah)
+FIX_BISECT_MAX_PROBES = int(os.getenv("FIX_BISECT_MAX_PROBES", "3"))
+
+TARGETED_SYSTEM_PROMPT = (
+    "You are an expert Manim code fixer. You get one region of a larger Manim file. "
+    "Return only the corrected replacement for that region in a ```python block, "
+    "no explanations."
+)
+
+# Frame traceback: Python biasa / py_compile, dan traceback rich dari manim
+_FRAME_PATTERNS = [
+    re.compile(r'File "(?P<path>[^"]+\.py)", line (?P<line>\d+)(?:, in (?P<func>\w+))?'),
+    re.compile(r"(?P<path>[^\s│\"']+\.py):(?P<line>\d+) in (?P<func>[\w<>]+)"),
+]
+_LIBRARY_PATH = re.compile(r"site-packages|dist-packages|[/\\]lib[/\\]python|[/\\]manim[/\\]")
+_DEF_LINE = re.compile(r"^(?P<indent>[ \t]*)(?:async\s+)?def\s+(?P<name>\w+)\s*\(")
+_STEP_CALL = re.compile(r"^(?P<indent>[ \t]+)self\.(?P<name>\w+)\(\)\s*(?:#.*)?$")
+_BOX_CHARS = re.compile(r"[│╭╮╰╯─❱]+")
+# Nama / string yang disebut pesan error
+_ERROR_SYMBOLS = [
+    re.compile(r"name '(\w+)' is not defined"),
+    re.compile(r"has no attribute '(\w+)'"),
+    re.compile(r"unexpected keyword argument '(\w+)'"),
+    re.compile(r"(\w+)\(\) (?:got|missing|takes)"),
+]
+
+# Helper kerangka deterministik dari step_codegen: bukan tempat bug, dan
+# pemanggilannya di construct() bukan langkah
+_TEMPLATE_HELPERS = {
+    "clean_transition", "clear_and_transition", "_fit", "intro_scene", "outro_scene",
+    "graph_scene", "update_graph_footer", "explanation_scene",
+}
+
+
+@dataclass
+class Region:
+    """Potongan baris [start, end) (0-based) yang dikirim dan diganti."""
+    start: int
+    end: int
+    name: Optional[str]
+    indent: str
+    reason: str
+
+    def describe(self) -> str:
+        what = f"{self.name}()" if self.name else "top-level code"
+        return f"{what}, lines {self.start + 1}-{self.end} ({self.reason})"
+
+
+def _lines(code: str) -> List[str]:
+    return code.split("\n")
+
+
+def _indent_of(line: str) -> int:
+    return len(line) - len(line.lstrip())
+
+
+def methods(code: str) -> List[Region]:
+    """
+    Semua def di file, berdasarkan indentasi (tetap jalan untuk kode
+    yang belum bisa di-parse, mis. saat compile error).
+    """
+    lines = _lines(code)
+    found = []
+    for index, line in enumerate(lines):
+        match = _DEF_LINE.match(line)
+        if not match:
+            continue
+        start = index
+        # Decorator ikut menjadi bagian region
+        while start > 0 and lines[start - 1].strip().startswith("@"):
+            start -= 1
+        depth = len(match.group("indent"))
+        end = index + 1
+        last_body = index + 1
+        while end < len(lines):
+            stripped = lines[end].strip()
+            if stripped and not stripped.startswith("#"):
+                if _indent_of(lines[end]) <= depth:
+                    break
+                last_body = end + 1
+            end += 1
+        found.append(Region(start, last_body, match.group("name"), match.group("indent"), "method"))
+    return found
+
+
+def _enclosing(code: str, line_index: int) -> Optional[Region]:
+    # Def terdalam yang memuat baris itu (method lebih dalam = indentasi lebih besar)
+    inside = [m for m in methods(code) if m.start <= line_index < m.end]
+    return max(inside, key=lambda m: len(m.indent)) if inside else None
+
+
+def error_frames(error_text: str, line_count: int) -> List[Tuple[int, Optional[str]]]:
+    """(indeks baris 0-based, nama fungsi) frame di file scene, terluar dulu."""
+    frames = []
+    for text_line in (error_text or "").splitlines():
+        for pattern in _FRAME_PATTERNS:
+            match = pattern.search(text_line)
+            if not match or _LIBRARY_PATH.search(match.group("path")):
+                continue
+            line = int(match.group("line"))
+            if 1 <= line <= line_count:
+                frames.append((line - 1, match.group("func")))
+            break
+    return frames
+
+
+def _window(code: str, line_index: int, reason: str) -> Region:
+    lines = _lines(code)
+    start = max(0, line_index - FIX_CONTEXT_LINES)
+    end = min(len(lines), line_index + FIX_CONTEXT_LINES + 1)
+    return Region(start, end, None, "", reason)
+
+
+def _from_traceback(code: str, error_text: str) -> Optional[Region]:
+    frames = error_frames(error_text, len(_lines(code)))
+    if not frames:
+        return None
+    regions = [_enclosing(code, line_index) or _window(code, line_index, "traceback")
+               for line_index, _ in frames]
+    # Error di helper template berarti argumen salah dari pemanggilnya
+    regions = [r for r in regions if r.name not in _TEMPLATE_HELPERS]
+    if not regions or regions[-1].name == "construct":
+        # construct() memanggil semua langkah: tidak menunjuk ke satu langkah
+        return None
+    region = regions[-1]
+    region.reason = "traceback"
+    return region
+
+
+def _from_symbols(code: str, error_text: str) -> Optional[Region]:
+    symbols = set()
+    for pattern in _ERROR_SYMBOLS:
+        symbols.update(pattern.findall(error_text or ""))
+    # String LaTeX / teks yang ditolak, mis. "LaTeX compilation error ... \frac{a}{"
+    symbols.update(s for s in re.findall(r"'([^'\n]{6,})'", error_text or "") if "\\" in s)
+    if not symbols:
+        return None
+    lines = _lines(code)
+    matches = []
+    for method in methods(code):
+        if method.name == "construct" or method.name in _TEMPLATE_HELPERS:
+            continue
+        body = "\n".join(lines[method.start:method.end])
+        if any(symbol in body for symbol in symbols):
+            matches.append(method)
+    if len(matches) != 1:
+        return None
+    matches[0].reason = "error symbol"
+    return matches[0]
+
+
+def locate(code: str, error_text: Optional[str]) -> Optional[Region]:
+    """Region yang gagal, atau None bila ambigu (lihat bisect_steps)."""
+    if not FIX_TARGETED or not code or not error_text:
+        return None
+    return _from_traceback(code, error_text) or _from_symbols(code, error_text)
+
+
+# === bisect ===
+
+def step_calls(code: str) -> List[Tuple[int, str]]:
+    """(indeks baris, nama method) pemanggilan langkah di dalam construct()."""
+    construct = next((m for m in methods(code) if m.name == "construct"), None)
+    if construct is None:
+        return []
+    defined = {m.name for m in methods(code)}
+    calls = []
+    for index in range(construct.start, construct.end):
+        match = _STEP_CALL.match(_lines(code)[index])
+        if match and match.group("name") in defined and match.group("name") not in _TEMPLATE_HELPERS:
+            calls.append((index, match.group("name")))
+    return calls
+
+
+def keep_steps(code: str, calls: List[Tuple[int, str]], keep: int) -> str:
+    """Kode dengan hanya `keep` pemanggilan langkah pertama yang aktif."""
+    lines = _lines(code)
+    for index, _ in calls[keep:]:
+        lines[index] = _STEP_CALL.sub(r"\g<indent>pass", lines[index])
+    return "\n".join(lines)
+
+
+def _bisect_region(code: str, calls, first_failing: int, probes: int) -> Region:
+    name = calls[first_failing][1]
+    region = next(m for m in methods(code) if m.name == name)
+    region.reason = f"bisect, {probes} probe(s)"
+    metrics.incr("fix.bisect")
+    return region
+
+
+def bisect_steps(code: str, fails: Callable[[str], bool]) -> Optional[Region]:
+    """
+    Cari langkah pertama yang membuat render gagal. fails(kode) = trial
+    render varian kode gagal. Prefix dipakai (langkah 1..k aktif) supaya
+    state dari langkah sebelumnya tetap ada. None bila tidak ketemu.
+    """
+    calls = step_calls(code)
+    if len(calls) < 2:
+        return None
+    # Invarian: prefix lo langkah lolos, prefix hi langkah gagal
+    lo, hi, probes = 0, len(calls), 0
+    while hi - lo > 1 and probes < FIX_BISECT_MAX_PROBES:
+        mid = (lo + hi) // 2
+        probes += 1
+        if fails(keep_steps(code, calls, mid)):
+            hi = mid
+        else:
+            lo = mid
+    if hi - lo > 1:
+        return None
+    return _bisect_region(code, calls, lo, probes)
+
+
+async def abisect_steps(code: str, fails) -> Optional[Region]:
+    """Async version of bisect_steps (fails = coroutine function)."""
+    calls = step_calls(code)
+    if len(calls) < 2:
+        return None
+    lo, hi, probes = 0, len(calls), 0
+    while hi - lo > 1 and probes < FIX_BISECT_MAX_PROBES:
+        mid = (lo + hi) // 2
+        probes += 1
+        if await fails(keep_steps(code, calls, mid)):
+            hi = mid
+        else:
+            lo = mid
+    if hi - lo > 1:
+        return None
+    return _bisect_region(code, calls, lo, probes)
+
+
+# === prompt & patch ===
+
+def condense_error(error_text: str) -> str:
+    """Ekor pesan error tanpa bingkai traceback rich dan baris progress render."""
+    kept = []
+    for line in (error_text or "").splitlines():
+        line = _BOX_CHARS.sub(" ", line).rstrip()
+        if not line.strip() or line.lstrip().startswith(("Animation ", "File ready at")):
+            continue
+        kept.append(line)
+    return "\n".join(kept[-FIX_ERROR_LINES:])
+
+
+def _outline(code: str, region: Region) -> str:
+    """Header file (sampai class pertama) + daftar method lain."""
+    lines = _lines(code)
+    header = []
+    for line in lines:
+        header.append(line)
+        if line.startswith("class "):
+            break
+    # Signature saja (baris def), body tidak dikirim
+    others = [next(line for line in lines[m.start:m.end] if _DEF_LINE.match(line))
+              for m in methods(code) if m.name != region.name]
+    return "\n".join(header + others)
+
+
+def fix_messages(code: str, region: Region, error_text: str):
+    lines = _lines(code)
+    snippet = "\n".join(lines[region.start:region.end])
+    if region.name:
+        target = f"the method `{region.name}`"
+        rules = (f"Return the complete corrected `def {region.name}(...)` method (same name and "
+                 "signature, same indentation). Do not add other methods, classes or imports.")
+    else:
+        target = f"lines {region.start + 1}-{region.end}"
+        rules = "Return only the corrected replacement for these lines."
+    prompt = f"""Fix {target} of this Manim Python file.
+
+ERROR:
+{condense_error(error_text)}
+
+FILE OUTLINE (for reference, do not return it):
+{_outline(code, region)}
+
+REGION TO FIX ({target}, lines {region.start + 1}-{region.end}):
+{snippet}
+
+{rules}"""
+    return [SystemMessage(content=TARGETED_SYSTEM_PROMPT), HumanMessage(content=prompt)]
+
+
+def _reply_code(content: str) -> str:
+    blocks = re.findall(r"```(?:python)?\n(.*?)```", content or "", re.DOTALL)
+    return (blocks[0] if blocks else content or "").strip("\n")
+
+
+def _parses(code: str) -> bool:
+    try:
+        ast.parse(code)
+        return True
+    except SyntaxError:
+        return False
+
+
+def apply_patch(code: str, region: Region, content: str) -> Optional[str]:
+    """
+    Tempel balasan model ke region. Bila kode awal bisa di-parse (render
+    error), hasilnya juga harus bisa. None = patch tidak bisa dipakai.
+    """
+    patch = textwrap.dedent(_reply_code(content)).rstrip()
+    if not patch.strip():
+        return None
+    if region.name:
+        # Harus tepat method yang diminta, dan bisa di-parse sendiri
+        first = next((line for line in patch.split("\n") if not line.startswith("@")), "")
+        match = _DEF_LINE.match(first)
+        if not match or match.group("indent") or match.group("name") != region.name or not _parses(patch):
+            return None
+    patch = textwrap.indent(patch, region.indent)
+    lines = _lines(code)
+    patched = "\n".join(lines[:region.start] + patch.split("\n") + lines[region.end:])
+    if _parses(code) and not _parses(patched):
+        return None
+    return patched
@@ -0,0 +1,110 @@
+"""
+Parser JSON inkremental untuk respons LLM yang di-stream.
+
+StreamingArrayParser membaca potongan teks satu per satu. Begitu sebuah
+elemen objek di array `"<key>": [...]` selesai ditulis, elemen itu
+langsung dikembalikan, tanpa menunggu seluruh JSON selesai. Stage 1
+memakainya untuk `educational_steps`: setiap langkah bisa diproses
+(progress ke user, draft kode per langkah) selagi model masih menulis
+langkah berikutnya.
+
+Parser hanya melacak struktur (string, escape, kedalaman { / [), jadi
+pagar ```json, teks pembuka, atau JSON yang terpotong tidak membuatnya
+gagal. Elemen yang tidak bisa di-parse dilewati. Parsing akhir tetap
+dilakukan atas teks lengkap oleh pemanggil.
+"""
+
+import json
+import re
+from typing import Any, Dict, List, Optional
+
+
+class StreamingArrayParser:
+    def __init__(self, key: str):
+        self.key = key
+        self.text = ""
+        self._pos = 0
+        self._stack: List[str] = []
+        self._in_string = False
+        self._escape = False
+        self._string_start = 0
+        self._last_string: Optional[str] = None
+        self._pending_key: Optional[str] = None
+        # Kedalaman stack tepat di dalam array target (-1 = array sudah ditutup)
+        self._array_depth: Optional[int] = None
+        self._item_start: Optional[int] = None
+        self.items: List[Dict[str, Any]] = []
+
+    def feed(self, chunk: str) -> List[Dict[str, Any]]:
+        """Tambahkan potongan teks; kembalikan elemen yang baru selesai."""
+        self.text += chunk
+        completed = []
+        text = self.text
+        for i in range(self._pos, len(text)):
+            char = text[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                    self._last_string = text[self._string_start:i]
+                continue
+
+            if char == '"':
+                self._in_string = True
+                self._string_start = i + 1
+            elif char == ":":
+                if self._stack and self._stack[-1] == "{":
+                    self._pending_key = self._last_string
+            elif char == ",":
+                self._pending_key = None
+            elif char in "{[":
+                if self._array_depth is not None and len(self._stack) == self._array_depth and char == "{":
+                    self._item_start = i
+                self._stack.append(char)
+                if char == "[" and self._array_depth is None and self._pending_key == self.key:
+                    self._array_depth = len(self._stack)
+                self._pending_key = None
+            elif char in "}]":
+                if self._stack:
+                    self._stack.pop()
+                if char == "]" and self._array_depth is not None and len(self._stack) < self._array_depth:
+                    # Array target selesai; array lain dengan kedalaman sama tidak ikut dibaca
+                    self._array_depth = -1
+                if (
+                    char == "}"
+                    and self._item_start is not None
+                    and self._array_depth is not None
+                    and len(self._stack) == self._array_depth
+                ):
+                    item = self._load(text[self._item_start:i + 1])
+                    self._item_start = None
+                    if item is not None:
+                        self.items.append(item)
+                        completed.append(item)
+        self._pos = len(text)
+        return completed
+
+    def string_field(self, name: str) -> Optional[str]:
+        """Nilai string `"name": "..."` pertama yang sudah lengkap di teks sejauh ini."""
+        match = re.search(r'"{}"\s*:\s*"((?:[^"\\]|\\.)*)"'.format(re.escape(name)), self.text)
+        if not match:
+            return None
+        try:
+            return json.loads('"{}"'.format(match.group(1)))
+        except json.JSONDecodeError:
+            return match.group(1)
+
+    @staticmethod
+    def _load(fragment: str) -> Optional[Dict[str, Any]]:
+        try:
+            item = json.loads(fragment)
+        except json.JSONDecodeError:
+            # Koma di akhir objek: kesalahan LLM yang paling umum
+            try:
+                item = json.loads(re.sub(r",\s*([}\]])", r"\1", fragment))
+            except json.JSONDecodeError:
+                return None
+        return item if isinstance(item, dict) else None
@@ -0,0 +1,301 @@
+"""
+Backend LLM yang bisa merekam dan memutar ulang (record / replay).
+
+Semua request Gemini lewat llm_clients (invoke_llm / stream_llm dan
+versi async-nya). Itu mencakup ConversationChainLite.predict di kedua
+generator, LLMClient.fix_manim_code, dan chat_with_gemini. Modul ini
+dipasang di titik yang sama.
+
+Mode (LLM_BACKEND):
+    live    -> request ke Gemini seperti biasa (default)
+    record  -> request ke Gemini, setiap pasangan request/respons juga
+               disimpan ke corpus
+    replay  -> tanpa jaringan dan tanpa API key: respons diambil dari
+               corpus, dengan latensi simulasi. Request yang tidak ada di
+               corpus -> ReplayMiss.
+
+Selama record / replay, cache respons LLM dilewati. Dengan begitu setiap
+panggilan benar-benar terekam, dan replay tidak bergantung pada isi
+cache. Replay juga tidak melewati rate limiter maupun cache prefix
+provider.
+
+Corpus (LLM_CORPUS_DIR, default <state>/llm_corpus) berisi satu file
+JSON per request. Key-nya hash dari model, temperature, pesan, dan skema
+output. Sebelum di-hash, bagian pesan yang berubah tiap run dinormalisasi:
+path file sementara, timestamp folder kerja, dan alamat memori. Jika
+request yang sama muncul beberapa kali, respons diputar sesuai urutan
+rekamannya; setelah habis, respons terakhir dipakai lagi.
+
+Latensi replay (LLM_REPLAY_LATENCY):
+    recorded -> lama respons saat direkam x LLM_REPLAY_LATENCY_SCALE (default)
+    <detik>  -> latensi tetap per request (0 = secepatnya)
+
+CLI:
+    python -m MAIN.AI.llm_backend   # ringkasan isi corpus
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from typing import List, Optional
+
+from langchain_core.messages import AIMessage, AIMessageChunk
+
+from MAIN.AI import metrics
+from MAIN.AI.cancellation import raise_if_cancelled
+from MAIN.AI.local_store import get_state_dir
+
+LLM_BACKEND_LIVE = "live"
+LLM_BACKEND_RECORD = "record"
+LLM_BACKEND_REPLAY = "replay"
+
+LLM_BACKEND = os.getenv("LLM_BACKEND", LLM_BACKEND_LIVE).strip().lower()
+LLM_REPLAY_LATENCY = os.getenv("LLM_REPLAY_LATENCY", "recorded").strip().lower()
+LLM_REPLAY_LATENCY_SCALE = float(os.getenv("LLM_REPLAY_LATENCY_SCALE", "1.0"))
+# Ukuran potongan teks saat stream diputar ulang
+LLM_REPLAY_CHUNK_CHARS = int(os.getenv("LLM_REPLAY_CHUNK_CHARS", "200"))
+# API key pengganti agar client bisa dibuat tanpa GOOGLE_API_KEY saat replay
+REPLAY_API_KEY = "replay"
+
+_VOLATILE_PATTERNS = [
+    (re.compile(r"tmp[a-z0-9_]{6,}"), "tmpXXXX"),
+    (re.compile(r"\d{8}_\d{6}"), "YYYYMMDD_HHMMSS"),
+    (re.compile(r"0x[0-9a-f]{6,}"), "0xADDR"),
+]
+
+
+class ReplayMiss(Exception):
+    """Request tidak ada di corpus replay."""
+
+
+def recording() -> bool:
+    return LLM_BACKEND == LLM_BACKEND_RECORD
+
+
+def replaying() -> bool:
+    return LLM_BACKEND == LLM_BACKEND_REPLAY
+
+
+def active() -> bool:
+    """Record / replay aktif (cache respons dilewati)."""
+    return recording() or replaying()
+
+
+def api_key() -> Optional[str]:
+    """GOOGLE_API_KEY, atau kunci pengganti saat replay (request tidak pernah dikirim)."""
+    return os.getenv("GOOGLE_API_KEY") or (REPLAY_API_KEY if replaying() else None)
+
+
+def corpus_dir() -> Path:
+    env_value = os.getenv("LLM_CORPUS_DIR")
+    path = Path(env_value) if env_value else get_state_dir() / "llm_corpus"
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def _normalize(text: str) -> str:
+    for pattern, replacement in _VOLATILE_PATTERNS:
+        text = pattern.sub(replacement, text)
+    return text
+
+
+def _message_payload(messages) -> List[List[str]]:
+    if isinstance(messages, str):
+        return [["human", messages]]
+    return [
+        [getattr(m, "type", type(m).__name__), m.content if isinstance(m.content, str) else json.dumps(m.content)]
+        for m in messages
+    ]
+
+
+def request_key(llm, messages, response_schema=None) -> str:
+    payload = {
+        "model": getattr(llm, "model", None),
+        "temperature": getattr(llm, "temperature", None),
+        "messages": [[kind, _normalize(content)] for kind, content in _message_payload(messages)],
+        "response_schema": response_schema,
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+class Corpus:
+    """File JSON per request: {"model", "messages", "responses": [{content, usage_metadata, seconds, ...}]}."""
+
+    def __init__(self, root: Optional[Path] = None):
+        self.root = root or corpus_dir()
+        self._lock = threading.Lock()
+        # Berapa kali setiap key sudah diputar di proses ini
+        self._played = Counter()
+
+    def _path(self, key: str) -> Path:
+        return self.root / key[:2] / f"{key}.json"
+
+    def _load(self, key: str) -> Optional[dict]:
+        try:
+            return json.loads(self._path(key).read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return None
+
+    def append(self, key: str, llm, messages, response: dict) -> None:
+        path = self._path(key)
+        with self._lock:
+            entry = self._load(key) or {
+                "model": getattr(llm, "model", None),
+                "messages": _message_payload(messages),
+                "responses": [],
+            }
+            entry["responses"].append(response)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_suffix(f".{os.getpid()}.tmp")
+            tmp.write_text(json.dumps(entry, ensure_ascii=False, indent=1), encoding="utf-8")
+            os.replace(tmp, path)
+
+    def next_response(self, key: str) -> Optional[dict]:
+        entry = self._load(key)
+        if not entry or not entry["responses"]:
+            return None
+        with self._lock:
+            index = min(self._played[key], len(entry["responses"]) - 1)
+            self._played[key] += 1
+        return entry["responses"][index]
+
+    def stats(self) -> dict:
+        models = Counter()
+        requests = responses = 0
+        for path in self.root.glob("*/*.json"):
+            entry = json.loads(path.read_text(encoding="utf-8"))
+            requests += 1
+            responses += len(entry["responses"])
+            models[entry.get("model") or "unknown"] += len(entry["responses"])
+        return {"dir": str(self.root), "requests": requests, "responses": responses, "models": dict(models)}
+
+
+_corpus: Optional[Corpus] = None
+_corpus_lock = threading.Lock()
+
+
+def get_corpus() -> Corpus:
+    global _corpus
+    with _corpus_lock:
+        if _corpus is None:
+            _corpus = Corpus()
+        return _corpus
+
+
+# === record ===
+
+def record(llm, messages, response_schema, content, usage_metadata, seconds: float,
+           first_chunk_seconds: Optional[float] = None) -> None:
+    """Simpan satu pasangan request/respons (tidak melakukan apa-apa di luar mode record)."""
+    if not recording() or not isinstance(content, str):
+        return
+    key = request_key(llm, messages, response_schema)
+    response = {
+        "content": content,
+        "usage_metadata": dict(usage_metadata) if usage_metadata else None,
+        "seconds": round(seconds, 3),
+        "recorded_at": time.time(),
+    }
+    if first_chunk_seconds is not None:
+        response["first_chunk_seconds"] = round(first_chunk_seconds, 3)
+    try:
+        get_corpus().append(key, llm, messages, response)
+        metrics.incr("llm.record.saved")
+    except Exception as e:
+        print(f"[LLM RECORD] Failed to save {key[:12]}: {e}")
+
+
+# === replay ===
+
+def _lookup(llm, messages, response_schema) -> dict:
+    key = request_key(llm, messages, response_schema)
+    response = get_corpus().next_response(key)
+    if response is None:
+        metrics.incr("llm.replay.miss")
+        raise ReplayMiss(f"No recorded response for {getattr(llm, 'model', '')} request {key[:12]}")
+    metrics.incr("llm.replay.hit")
+    return response
+
+
+def _latency(response: dict) -> float:
+    if LLM_REPLAY_LATENCY == "recorded":
+        return float(response.get("seconds") or 0.0) * LLM_REPLAY_LATENCY_SCALE
+    return float(LLM_REPLAY_LATENCY)
+
+
+def _sleep_slices(seconds: float):
+    """Potongan tidur (maks 1 detik) supaya pembatalan / deadline tetap terasa."""
+    deadline = time.monotonic() + seconds
+    while True:
+        raise_if_cancelled()
+        left = deadline - time.monotonic()
+        if left <= 0:
+            return
+        yield min(left, 1.0)
+
+
+def _message(response: dict) -> AIMessage:
+    return AIMessage(content=response["content"], usage_metadata=response.get("usage_metadata"))
+
+
+def _chunks(response: dict) -> List[AIMessageChunk]:
+    content = response["content"]
+    size = max(LLM_REPLAY_CHUNK_CHARS, 1)
+    parts = [content[i:i + size] for i in range(0, len(content), size)] or [""]
+    chunks = [AIMessageChunk(content=part) for part in parts]
+    # Usage dikirim di potongan terakhir, seperti Gemini
+    if response.get("usage_metadata"):
+        chunks[-1] = AIMessageChunk(content=parts[-1], usage_metadata=response["usage_metadata"])
+    return chunks
+
+
+def _chunk_delays(response: dict, count: int) -> List[float]:
+    """Jeda sebelum tiap potongan: first_chunk_seconds dulu, sisanya dibagi rata."""
+    total = _latency(response)
+    recorded_total = float(response.get("seconds") or 0.0)
+    first = response.get("first_chunk_seconds")
+    first = total * (float(first) / recorded_total) if first is not None and recorded_total else total / max(count, 1)
+    rest = max(total - first, 0.0) / max(count - 1, 1)
+    return [first] + [rest] * (count - 1)
+
+
+def replay(llm, messages, response_schema=None) -> AIMessage:
+    response = _lookup(llm, messages, response_schema)
+    for seconds in _sleep_slices(_latency(response)):
+        time.sleep(seconds)
+    return _message(response)
+
+
+async def areplay(llm, messages, response_schema=None) -> AIMessage:
+    response = _lookup(llm, messages, response_schema)
+    for seconds in _sleep_slices(_latency(response)):
+        await asyncio.sleep(seconds)
+    return _message(response)
+
+
+def replay_stream(llm, messages, response_schema=None):
+    response = _lookup(llm, messages, response_schema)
+    chunks = _chunks(response)
+    for chunk, delay in zip(chunks, _chunk_delays(response, len(chunks))):
+        for seconds in _sleep_slices(delay):
+            time.sleep(seconds)
+        yield chunk
+
+
+async def areplay_stream(llm, messages, response_schema=None):
+    response = _lookup(llm, messages, response_schema)
+    chunks = _chunks(response)
+    for chunk, delay in zip(chunks, _chunk_delays(response, len(chunks))):
+        for seconds in _sleep_slices(delay):
+            await asyncio.sleep(seconds)
+        yield chunk
+
+
+if __name__ == "__main__":
+    print(json.dumps({"backend": LLM_BACKEND, **get_corpus().stats()}, indent=2))
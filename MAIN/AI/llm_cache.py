@@ -0,0 +1,220 @@
+"""
+Cache respons LLM di disk. Key-nya model + parameter generate + hash prompt.
+
+Prompt yang identik dengan prompt beberapa menit lalu, misalnya saat
+retry atau topik yang diulang, langsung mendapat jawaban yang sama
+tanpa memanggil Gemini. Store-nya SQLite lewat local_store, jadi aman
+dipakai bersama oleh gunicorn workers dan render workers di satu host.
+Ukurannya dibatasi oleh TTL, jumlah entri dan total byte; entri yang
+paling lama tidak dipakai dibuang lebih dulu (LRU).
+
+Mode per panggilan, lewat invoke_llm(..., cache=...) atau
+`with llm_cache_mode(...)`:
+    use     -> baca dari cache, simpan jawaban baru (default)
+    refresh -> selalu panggil LLM, timpa entri lama
+    bypass  -> tidak membaca maupun menyimpan
+
+CLI:
+    python -m MAIN.AI.llm_cache stats
+    python -m MAIN.AI.llm_cache evict
+    python -m MAIN.AI.llm_cache clear
+"""
+
+import contextvars
+import hashlib
+import json
+import os
+import time
+from contextlib import contextmanager
+from typing import Optional
+
+from MAIN.AI import metrics
+from MAIN.AI.local_store import connect
+
+# Naikkan jika format key / isi yang disimpan berubah
+LLM_CACHE_VERSION = 1
+
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "1").lower() not in ("0", "false", "no")
+LLM_CACHE_TTL_SECONDS = int(os.getenv("LLM_CACHE_TTL_HOURS", "72")) * 3600
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "20000"))
+LLM_CACHE_MAX_BYTES = int(os.getenv("LLM_CACHE_MAX_MB", "200")) * 1024 * 1024
+
+LLM_CACHE_USE = "use"
+LLM_CACHE_REFRESH = "refresh"
+LLM_CACHE_BYPASS = "bypass"
+
+_cache_mode: contextvars.ContextVar = contextvars.ContextVar("llm_cache_mode", default=LLM_CACHE_USE)
+
+
+@contextmanager
+def llm_cache_mode(mode: str):
+    """Set mode cache untuk semua panggilan LLM di dalam blok (ikut ke to_thread / task)."""
+    token = _cache_mode.set(mode)
+    try:
+        yield
+    finally:
+        _cache_mode.reset(token)
+
+
+def current_cache_mode() -> str:
+    return _cache_mode.get() if LLM_CACHE_ENABLED else LLM_CACHE_BYPASS
+
+
+def _message_payload(messages):
+    if isinstance(messages, str):
+        return messages
+    return [[getattr(m, "type", type(m).__name__), getattr(m, "content", str(m))] for m in messages]
+
+
+def llm_cache_key(llm, messages, response_schema=None) -> str:
+    payload = {
+        "model": getattr(llm, "model", None),
+        "temperature": getattr(llm, "temperature", None),
+        "max_output_tokens": getattr(llm, "max_output_tokens", None),
+        "top_p": getattr(llm, "top_p", None),
+        "top_k": getattr(llm, "top_k", None),
+        "messages": _message_payload(messages),
+        "version": LLM_CACHE_VERSION,
+    }
+    if response_schema is not None:
+        # Hanya jika dipakai, supaya key panggilan tanpa skema tidak berubah
+        payload["response_schema"] = response_schema
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    """Mapping key -> teks respons, dengan TTL dan eviksi LRU (entri + byte)."""
+
+    def __init__(
+        self,
+        ttl_seconds: int = LLM_CACHE_TTL_SECONDS,
+        max_entries: int = LLM_CACHE_MAX_ENTRIES,
+        max_bytes: int = LLM_CACHE_MAX_BYTES,
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+
+    def _conn(self):
+        conn = connect("llm_cache")
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS llm_cache (
+                cache_key TEXT PRIMARY KEY,
+                model TEXT,
+                response TEXT NOT NULL,
+                size_bytes INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                last_hit_at REAL NOT NULL,
+                hit_count INTEGER NOT NULL DEFAULT 0
+            )
+            """
+        )
+        return conn
+
+    def get(self, key: str) -> Optional[str]:
+        """Teks respons untuk key (None jika tidak ada / kedaluwarsa)."""
+        now = time.time()
+        try:
+            conn = self._conn()
+            row = conn.execute(
+                "SELECT response, size_bytes, created_at FROM llm_cache WHERE cache_key = ?", (key,)
+            ).fetchone()
+            if row and now - row["created_at"] <= self.ttl_seconds:
+                conn.execute(
+                    "UPDATE llm_cache SET last_hit_at = ?, hit_count = hit_count + 1 WHERE cache_key = ?",
+                    (now, key),
+                )
+                metrics.incr("llm_cache.hit")
+                metrics.incr("llm_cache.bytes_saved", row["size_bytes"])
+                return row["response"]
+            if row:
+                conn.execute("DELETE FROM llm_cache WHERE cache_key = ?", (key,))
+                metrics.incr("llm_cache.expired")
+        except Exception as e:
+            print(f"[LLM CACHE] lookup failed: {e}")
+        metrics.incr("llm_cache.miss")
+        return None
+
+    def put(self, key: str, response: str, model: Optional[str] = None) -> None:
+        if not response:
+            return
+        now = time.time()
+        try:
+            self._conn().execute(
+                """
+                INSERT OR REPLACE INTO llm_cache
+                    (cache_key, model, response, size_bytes, created_at, last_hit_at, hit_count)
+                VALUES (?, ?, ?, ?, ?, ?, 0)
+                """,
+                (key, model, response, len(response.encode("utf-8")), now, now),
+            )
+            metrics.incr("llm_cache.store")
+            self.evict()
+        except Exception as e:
+            print(f"[LLM CACHE] store failed: {e}")
+
+    def evict(self) -> int:
+        """Buang entri kedaluwarsa, lalu entri paling lama tidak dipakai di atas batas entri / byte."""
+        conn = self._conn()
+        removed = conn.execute(
+            "DELETE FROM llm_cache WHERE created_at < ?", (time.time() - self.ttl_seconds,)
+        ).rowcount
+        removed += conn.execute(
+            """
+            DELETE FROM llm_cache WHERE cache_key IN (
+                SELECT cache_key FROM (
+                    SELECT cache_key,
+                           ROW_NUMBER() OVER (ORDER BY last_hit_at DESC) AS position,
+                           SUM(size_bytes) OVER (ORDER BY last_hit_at DESC) AS running_bytes
+                    FROM llm_cache
+                ) WHERE position > ? OR running_bytes > ?
+            )
+            """,
+            (self.max_entries, self.max_bytes),
+        ).rowcount
+        if removed:
+            metrics.incr("llm_cache.evicted", removed)
+        return removed
+
+    def clear(self) -> int:
+        return self._conn().execute("DELETE FROM llm_cache").rowcount
+
+    def stats(self) -> dict:
+        conn = self._conn()
+        row = conn.execute("SELECT COUNT(*) AS entries, COALESCE(SUM(size_bytes), 0) AS size FROM llm_cache").fetchone()
+        counters = metrics.snapshot()["counters"]
+        hits = counters.get("llm_cache.hit", 0)
+        misses = counters.get("llm_cache.miss", 0)
+        return {
+            "enabled": LLM_CACHE_ENABLED,
+            "entries": row["entries"],
+            "size_bytes": row["size"],
+            "hits": hits,
+            "misses": misses,
+            "hit_ratio": (hits / (hits + misses)) if (hits + misses) else 0.0,
+            "bytes_saved": counters.get("llm_cache.bytes_saved", 0),
+        }
+
+
+_llm_cache: Optional[LLMCache] = None
+
+
+def get_llm_cache() -> LLMCache:
+    global _llm_cache
+    if _llm_cache is None:
+        _llm_cache = LLMCache()
+    return _llm_cache
+
+
+if __name__ == "__main__":
+    import sys
+
+    cache = get_llm_cache()
+    command = sys.argv[1] if len(sys.argv) > 1 else "stats"
+    if command == "evict":
+        print(f"Evicted {cache.evict()} entr(y/ies)")
+    elif command == "clear":
+        print(f"Removed {cache.clear()} entr(y/ies)")
+    else:
+        print(json.dumps(cache.stats(), indent=2))
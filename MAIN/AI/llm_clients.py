@@ -0,0 +1,312 @@
+"""
+Registry client Gemini yang dipakai bersama dalam satu proses.
+
+Sebelumnya setiap request video membuat ScienceVideoGenerator dan
+ManIMCodeGenerator baru, dan setiap pesan chat membuat model baru.
+Akibatnya setiap request membuka channel gRPC sendiri, termasuk handshake
+TLS-nya. Sekarang generator hanya meminjam client dari registry ini.
+Registry menyimpan satu client per (api key, model, temperature,
+max_retries).
+
+Channel gRPC sinkron aman dipakai dari banyak thread. Client async
+(grpc_asyncio) terikat ke event loop tempat ia dibuat. Karena itu,
+pemanggilan dari dalam event loop mendapat instance per loop. Instance
+itu dilepas otomatis ketika loop-nya hilang.
+
+Semua request LLM lewat invoke_llm / ainvoke_llm. Fungsi ini memasang
+timeout dari sisa deadline job (llm_timeout), memeriksa pembatalan
+sebelum request dikirim, memakai cache respons di disk (llm_cache), dan
+mencatat pemakaian token ke job yang sedang berjalan (token_budget).
+Request yang benar-benar dikirim antre lewat rate_limiter (RPM / TPM
+bersama antar proses, backoff bersama saat 429).
+Prompt dengan prefix statis besar (PromptPrefix) bisa memakai cache
+prefix di sisi provider (prompt_cache).
+stream_llm / astream_llm adalah versi streaming-nya (chat, stage 1).
+Dengan LLM_BACKEND=record / replay, setiap request/respons direkam ke
+corpus lokal atau diputar ulang dari sana (llm_backend).
+"""
+
+import asyncio
+import threading
+import time
+import weakref
+from typing import Dict, Optional, Tuple
+
+from langchain_core.messages import AIMessage
+from langchain_core.messages.ai import add_usage
+from langchain_google_genai import ChatGoogleGenerativeAI
+
+from MAIN.AI import llm_backend, metrics, prompt_cache, rate_limiter, token_budget
+from MAIN.AI.cancellation import LLM_REQUEST_TIMEOUT_SECONDS, llm_timeout
+from MAIN.AI.llm_cache import (
+    LLM_CACHE_BYPASS,
+    LLM_CACHE_ENABLED,
+    LLM_CACHE_REFRESH,
+    current_cache_mode,
+    get_llm_cache,
+    llm_cache_key,
+)
+
+_ClientKey = Tuple[Optional[str], str, float, int]
+
+_lock = threading.Lock()
+_sync_clients: Dict[_ClientKey, ChatGoogleGenerativeAI] = {}
+_loop_clients: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+
+
+def _running_loop() -> Optional[asyncio.AbstractEventLoop]:
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+
+
+def get_chat_model(
+    model: str,
+    temperature: float = 0.5,
+    max_retries: int = 2,
+    google_api_key: Optional[str] = None,
+) -> ChatGoogleGenerativeAI:
+    """
+    Client bersama untuk konfigurasi ini (dibuat sekali per proses / event loop).
+
+    google_api_key None = pakai GOOGLE_API_KEY dari environment.
+    """
+    api_key = google_api_key or llm_backend.api_key()
+    key = (api_key, model, float(temperature), max_retries)
+    loop = _running_loop()
+
+    with _lock:
+        clients = _sync_clients if loop is None else _loop_clients.setdefault(loop, {})
+        client = clients.get(key)
+        if client is None:
+            client = ChatGoogleGenerativeAI(
+                model=model,
+                google_api_key=api_key,
+                temperature=temperature,
+                max_output_tokens=None,
+                timeout=LLM_REQUEST_TIMEOUT_SECONDS,
+                max_retries=max_retries,
+            )
+            clients[key] = client
+            created = True
+        else:
+            created = False
+
+    if created:
+        print(f"[LLM] Created shared client {model} (temperature={temperature})")
+        metrics.incr("llm.clients_created")
+    return client
+
+
+def clear_clients() -> None:
+    """Lupakan semua client (mis. setelah GOOGLE_API_KEY dirotasi)."""
+    with _lock:
+        _sync_clients.clear()
+        _loop_clients.clear()
+
+
+def _cache_lookup(llm, messages, cache: Optional[str], response_schema: Optional[dict] = None):
+    """(key, respons dari cache). key None = cache tidak dipakai untuk panggilan ini."""
+    mode = cache or current_cache_mode()
+    if not LLM_CACHE_ENABLED or mode == LLM_CACHE_BYPASS or llm_backend.active():
+        return None, None
+    key = llm_cache_key(llm, messages, response_schema)
+    if mode == LLM_CACHE_REFRESH:
+        return key, None
+    text = get_llm_cache().get(key)
+    if text is not None:
+        print(f"[LLM CACHE] HIT {getattr(llm, 'model', '')} ({len(text)} chars)")
+        return key, AIMessage(content=text)
+    return key, None
+
+
+def _cache_store(llm, key: Optional[str], response) -> None:
+    content = getattr(response, "content", None)
+    # Respons multi-part (list) tidak disimpan
+    if key and isinstance(content, str):
+        get_llm_cache().put(key, content, getattr(llm, "model", None))
+
+
+def _schema_kwargs(response_schema: Optional[dict]) -> dict:
+    """Output JSON terstruktur (lihat plan_schema)."""
+    if response_schema is None:
+        return {}
+    return {"response_mime_type": "application/json", "response_schema": response_schema}
+
+
+def _after_wait(timeout: float) -> float:
+    # Antrean rate limit memakan sisa deadline job
+    return min(timeout, llm_timeout())
+
+
+def _invoke(llm, messages, timeout: float, **extra):
+    return rate_limiter.call(
+        llm, messages, lambda **kwargs: llm.invoke(messages, timeout=_after_wait(timeout), **extra, **kwargs)
+    )
+
+
+async def _ainvoke(llm, messages, timeout: float, **extra):
+    return await rate_limiter.acall(
+        llm, messages, lambda **kwargs: llm.ainvoke(messages, timeout=_after_wait(timeout), **extra, **kwargs)
+    )
+
+
+def invoke_llm(
+    llm,
+    messages,
+    cache: Optional[str] = None,
+    prefix: Optional[prompt_cache.PromptPrefix] = None,
+    response_schema: Optional[dict] = None,
+):
+    """
+    llm.invoke dengan timeout dari deadline job yang sedang berjalan.
+
+    cache: "use" / "refresh" / "bypass" (default: mode aktif, lihat llm_cache).
+    prefix: prefix statis di depan `messages` (dikirim inline atau lewat cache provider).
+    response_schema: JSON schema output (respons berupa JSON sesuai skema).
+    """
+    timeout = llm_timeout()
+    full = prompt_cache.inline_messages(prefix, messages) if prefix else messages
+    if llm_backend.replaying():
+        response = llm_backend.replay(llm, full, response_schema)
+        token_budget.record(llm, response.usage_metadata)
+        return response
+    key, cached = _cache_lookup(llm, full, cache, response_schema)
+    if cached is not None:
+        return cached
+    schema = _schema_kwargs(response_schema)
+    started = time.monotonic()
+    if prefix is None:
+        response = _invoke(llm, full, timeout, **schema)
+    else:
+        send, cached_content = prompt_cache.resolve(llm, prefix, messages)
+        try:
+            extra = {"cached_content": cached_content} if cached_content else {}
+            response = _invoke(llm, send, timeout, **extra, **schema)
+        except Exception as e:
+            if cached_content is None or not prompt_cache.is_cache_error(e):
+                raise
+            # Cache provider hilang / kedaluwarsa lebih awal: kirim inline sekali ini
+            print(f"[PROMPT CACHE] {cached_content} rejected ({e}); retrying inline")
+            prompt_cache.invalidate(llm, prefix)
+            response = _invoke(llm, full, timeout, **schema)
+    usage = getattr(response, "usage_metadata", None)
+    token_budget.record(llm, usage)
+    _cache_store(llm, key, response)
+    llm_backend.record(llm, full, response_schema, response.content, usage, time.monotonic() - started)
+    return response
+
+
+async def ainvoke_llm(
+    llm,
+    messages,
+    cache: Optional[str] = None,
+    prefix: Optional[prompt_cache.PromptPrefix] = None,
+    response_schema: Optional[dict] = None,
+):
+    """Versi async dari invoke_llm (lookup / simpan cache di thread pool)."""
+    timeout = llm_timeout()
+    full = prompt_cache.inline_messages(prefix, messages) if prefix else messages
+    if llm_backend.replaying():
+        response = await llm_backend.areplay(llm, full, response_schema)
+        token_budget.record(llm, response.usage_metadata)
+        return response
+    key, cached = await asyncio.to_thread(_cache_lookup, llm, full, cache, response_schema)
+    if cached is not None:
+        return cached
+    schema = _schema_kwargs(response_schema)
+    started = time.monotonic()
+    if prefix is None:
+        response = await _ainvoke(llm, full, timeout, **schema)
+    else:
+        send, cached_content = await prompt_cache.aresolve(llm, prefix, messages)
+        try:
+            extra = {"cached_content": cached_content} if cached_content else {}
+            response = await _ainvoke(llm, send, timeout, **extra, **schema)
+        except Exception as e:
+            if cached_content is None or not prompt_cache.is_cache_error(e):
+                raise
+            print(f"[PROMPT CACHE] {cached_content} rejected ({e}); retrying inline")
+            await asyncio.to_thread(prompt_cache.invalidate, llm, prefix)
+            response = await _ainvoke(llm, full, timeout, **schema)
+    usage = getattr(response, "usage_metadata", None)
+    token_budget.record(llm, usage)
+    await asyncio.to_thread(_cache_store, llm, key, response)
+    if llm_backend.recording():
+        await asyncio.to_thread(
+            llm_backend.record, llm, full, response_schema, response.content, usage, time.monotonic() - started
+        )
+    return response
+
+
+def stream_llm(llm, messages, cache: Optional[str] = None, response_schema: Optional[dict] = None):
+    """
+    Stream teks respons potong demi potong (llm.stream). Cache hit
+    dikirim sebagai satu potongan; respons lengkap disimpan ke cache.
+    """
+    timeout = llm_timeout()
+    key, cached = _cache_lookup(llm, messages, cache, response_schema)
+    schema = _schema_kwargs(response_schema)
+    if cached is not None:
+        yield cached.content
+        return
+    parts = []
+    usage = None
+    first_chunk = None
+    started = time.monotonic()
+    if llm_backend.replaying():
+        chunks = llm_backend.replay_stream(llm, messages, response_schema)
+    else:
+        chunks = rate_limiter.stream(
+            llm, messages, lambda **kwargs: llm.stream(messages, timeout=_after_wait(timeout), **schema, **kwargs)
+        )
+    for chunk in chunks:
+        if chunk.usage_metadata:
+            usage = add_usage(usage, chunk.usage_metadata)
+        text = chunk.text
+        if text:
+            if first_chunk is None:
+                first_chunk = time.monotonic() - started
+            parts.append(text)
+            yield text
+    token_budget.record(llm, usage)
+    _cache_store(llm, key, AIMessage(content="".join(parts)))
+    llm_backend.record(llm, messages, response_schema, "".join(parts), usage,
+                       time.monotonic() - started, first_chunk)
+
+
+async def astream_llm(llm, messages, cache: Optional[str] = None, response_schema: Optional[dict] = None):
+    """Versi async dari stream_llm (llm.astream)."""
+    timeout = llm_timeout()
+    key, cached = await asyncio.to_thread(_cache_lookup, llm, messages, cache, response_schema)
+    schema = _schema_kwargs(response_schema)
+    if cached is not None:
+        yield cached.content
+        return
+    parts = []
+    usage = None
+    first_chunk = None
+    started = time.monotonic()
+    if llm_backend.replaying():
+        chunks = llm_backend.areplay_stream(llm, messages, response_schema)
+    else:
+        chunks = rate_limiter.astream(
+            llm, messages, lambda **kwargs: llm.astream(messages, timeout=_after_wait(timeout), **schema, **kwargs)
+        )
+    async for chunk in chunks:
+        if chunk.usage_metadata:
+            usage = add_usage(usage, chunk.usage_metadata)
+        text = chunk.text
+        if text:
+            if first_chunk is None:
+                first_chunk = time.monotonic() - started
+            parts.append(text)
+            yield text
+    token_budget.record(llm, usage)
+    await asyncio.to_thread(_cache_store, llm, key, AIMessage(content="".join(parts)))
+    if llm_backend.recording():
+        await asyncio.to_thread(
+            llm_backend.record, llm, messages, response_schema, "".join(parts), usage,
+            time.monotonic() - started, first_chunk,
+        )
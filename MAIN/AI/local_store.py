@@ -0,0 +1,44 @@
+"""
+Penyimpanan state lokal (SQLite) yang dipakai bersama oleh semua proses
+di satu host: gunicorn workers, render workers, dan CLI.
+
+Setiap store adalah satu file .sqlite3 di LEARNVIDAI_STATE_DIR
+(default: MAIN/AI/state). Mode WAL + busy timeout membuat banyak
+proses bisa membaca/menulis bersamaan dengan aman.
+"""
+
+import os
+import sqlite3
+import threading
+from pathlib import Path
+
+_local = threading.local()
+
+
+def get_state_dir() -> Path:
+    env_value = os.getenv("LEARNVIDAI_STATE_DIR")
+    state_dir = Path(env_value) if env_value else Path(__file__).resolve().parent / "state"
+    state_dir.mkdir(parents=True, exist_ok=True)
+    return state_dir
+
+
+def connect(name: str) -> sqlite3.Connection:
+    """
+    Ambil koneksi SQLite untuk store `name` (satu koneksi per thread).
+
+    Koneksi berjalan dalam autocommit; gunakan `BEGIN IMMEDIATE` untuk
+    operasi read-modify-write yang harus atomik antar proses.
+    """
+    connections = getattr(_local, "connections", None)
+    if connections is None:
+        connections = _local.connections = {}
+
+    path = str(get_state_dir() / f"{name}.sqlite3")
+    conn = connections.get(path)
+    if conn is None:
+        conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        connections[path] = conn
+    return conn
@@ -0,0 +1,97 @@
+"""
+Metrik sederhana yang dibagi antar proses (counter, gauge, timer).
+
+Disimpan di store lokal "metrics" sehingga angka dari gunicorn workers
+dan render workers terkumpul di satu tempat. Kegagalan menulis metrik
+tidak pernah menggagalkan pipeline.
+"""
+
+import time
+from typing import Dict
+
+from MAIN.AI.local_store import connect
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS metrics (
+    name TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    count INTEGER NOT NULL DEFAULT 0,
+    total REAL NOT NULL DEFAULT 0,
+    max_value REAL,
+    updated_at REAL NOT NULL
+)
+"""
+
+
+def _conn():
+    conn = connect("metrics")
+    conn.execute(_SCHEMA)
+    return conn
+
+
+def incr(name: str, amount: float = 1) -> None:
+    """Tambah counter `name` sebesar `amount`."""
+    try:
+        _conn().execute(
+            """
+            INSERT INTO metrics (name, kind, count, total, updated_at) VALUES (?, 'counter', 1, ?, ?)
+            ON CONFLICT(name) DO UPDATE SET count = count + 1, total = total + excluded.total,
+                updated_at = excluded.updated_at
+            """,
+            (name, amount, time.time()),
+        )
+    except Exception as e:
+        print(f"[METRICS] incr {name} failed: {e}")
+
+
+def set_gauge(name: str, value: float) -> None:
+    """Set nilai terakhir gauge `name`."""
+    try:
+        _conn().execute(
+            """
+            INSERT INTO metrics (name, kind, count, total, updated_at) VALUES (?, 'gauge', 1, ?, ?)
+            ON CONFLICT(name) DO UPDATE SET count = count + 1, total = excluded.total,
+                updated_at = excluded.updated_at
+            """,
+            (name, value, time.time()),
+        )
+    except Exception as e:
+        print(f"[METRICS] gauge {name} failed: {e}")
+
+
+def observe(name: str, value: float) -> None:
+    """Catat satu observasi (mis. durasi dalam detik) untuk timer `name`."""
+    try:
+        _conn().execute(
+            """
+            INSERT INTO metrics (name, kind, count, total, max_value, updated_at)
+            VALUES (?, 'timer', 1, ?, ?, ?)
+            ON CONFLICT(name) DO UPDATE SET count = count + 1, total = total + excluded.total,
+                max_value = MAX(COALESCE(max_value, excluded.max_value), excluded.max_value),
+                updated_at = excluded.updated_at
+            """,
+            (name, value, value, time.time()),
+        )
+    except Exception as e:
+        print(f"[METRICS] observe {name} failed: {e}")
+
+
+def snapshot() -> Dict[str, Dict]:
+    """
+    Returns:
+        dict: {"counters": {...}, "gauges": {...}, "timers": {name: {count, avg, max}}}
+    """
+    result = {"counters": {}, "gauges": {}, "timers": {}}
+    for row in _conn().execute("SELECT * FROM metrics ORDER BY name"):
+        if row["kind"] == "counter":
+            result["counters"][row["name"]] = row["total"]
+        elif row["kind"] == "gauge":
+            result["gauges"][row["name"]] = row["total"]
+        else:
+            count = row["count"] or 0
+            result["timers"][row["name"]] = {
+                "count": count,
+                "avg": (row["total"] / count) if count else 0.0,
+                "max": row["max_value"],
+            }
+    return result
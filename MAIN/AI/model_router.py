@@ -0,0 +1,336 @@
+"""
+Routing model Gemini (flash-lite / flash / pro) berdasarkan hasil nyata.
+
+Setiap panggilan LLM pipeline termasuk salah satu task berikut:
+    plan -> stage 1 (educational breakdown). Sukses = JSON ter-parse.
+    code -> kode Manim dari video plan. Sukses = lolos compile + trial
+            render pertama tanpa perbaikan.
+    fix  -> satu perbaikan kode (compile / trial render). Sukses = cek
+            berikutnya lolos.
+
+Hasil dan latensinya dicatat per model untuk beberapa konteks:
+"domain:<domain>" (classify_domain di script_generator), untuk fix juga
+"error:<jenis error>", dan selalu "*". Datanya ada di local_store
+("model_routing"), jadi semua worker di satu host belajar bersama.
+Hitungan lama meluruh (ROUTER_WINDOW), supaya router ikut berubah jika
+sebuah model membaik atau memburuk.
+
+choose() memilih model dengan biaya per sukses terendah
+(ROUTER_MODEL_COSTS / peluang sukses), lalu latensi terendah. Hanya model
+dengan sampel cukup (ROUTER_MIN_SAMPLES) dan peluang sukses minimal
+ROUTER_MIN_SUCCESS yang dipertimbangkan, mulai dari konteks paling
+spesifik. Sebelum data cukup, urutan default dipakai. Urutan default ini
+sama dengan perilaku lama: plan = flash-lite, code = pro, fix = flash
+tiga kali lalu pro. Sebagian kecil panggilan (ROUTER_EXPLORE_RATE)
+mencoba model yang sampelnya masih kurang.
+
+CLI:
+    python -m MAIN.AI.model_router   # tabel routing
+"""
+
+import contextvars
+import json
+import os
+import random
+import re
+import time
+from typing import Dict, List, Optional
+
+from MAIN.AI import metrics
+from MAIN.AI.local_store import connect
+from MAIN.AI.token_budget import pro_allowed
+
+ROUTER_ENABLED = os.getenv("ROUTER_ENABLED", "1").lower() not in ("0", "false", "no")
+ROUTER_MIN_SAMPLES = int(os.getenv("ROUTER_MIN_SAMPLES", "10"))
+ROUTER_MIN_SUCCESS = float(os.getenv("ROUTER_MIN_SUCCESS", "0.6"))
+ROUTER_EXPLORE_RATE = float(os.getenv("ROUTER_EXPLORE_RATE", "0.05"))
+# Kegagalan beruntun satu model dalam satu loop perbaikan sebelum naik ke model berikutnya
+ROUTER_MAX_FAILURES_PER_MODEL = int(os.getenv("ROUTER_MAX_FAILURES_PER_MODEL", "3"))
+# Di atas jumlah sampel ini hitungan lama dibagi dua
+ROUTER_WINDOW = int(os.getenv("ROUTER_WINDOW", "200"))
+
+
+def _parse_costs(value: str) -> Dict[str, float]:
+    costs = {}
+    for item in value.split(","):
+        model, _, cost = item.partition("=")
+        if model.strip() and cost.strip():
+            costs[model.strip()] = float(cost)
+    return costs
+
+
+# Biaya relatif per panggilan (kurang lebih rasio harga token output)
+MODEL_COSTS = _parse_costs(os.getenv(
+    "ROUTER_MODEL_COSTS",
+    "gemini-2.5-flash-lite=1,gemini-2.5-flash=4,gemini-2.5-pro=20",
+))
+
+# Model yang boleh dipilih per task, dan urutan default sebelum ada data
+TASK_MODELS = {
+    "plan": ["gemini-2.5-flash-lite", "gemini-2.5-flash", "gemini-2.5-pro"],
+    "code": ["gemini-2.5-flash", "gemini-2.5-pro"],
+    "fix": ["gemini-2.5-flash-lite", "gemini-2.5-flash", "gemini-2.5-pro"],
+}
+DEFAULT_MODELS = {
+    "plan": ["gemini-2.5-flash-lite"],
+    "code": ["gemini-2.5-pro"],
+    "fix": ["gemini-2.5-flash", "gemini-2.5-pro"],
+}
+
+_ERROR_PATTERN = re.compile(r"\b([A-Z]\w*(?:Error|Exception))\b")
+
+_domain: contextvars.ContextVar = contextvars.ContextVar("routing_domain", default=None)
+
+
+def set_current_domain(domain: Optional[str]):
+    """Domain job yang sedang berjalan (dipasang pipeline, dibaca loop perbaikan)."""
+    return _domain.set(domain)
+
+
+def current_domain() -> Optional[str]:
+    return _domain.get()
+
+
+def classify_error(error_text: Optional[str]) -> str:
+    """Jenis error dari pesan compile / trial render (exception terakhir di traceback)."""
+    text = error_text or ""
+    if "latex" in text.lower():
+        return "LaTeXError"
+    if "timed out" in text.lower() or "timeout" in text.lower():
+        return "Timeout"
+    found = _ERROR_PATTERN.findall(text)
+    return found[-1] if found else "Other"
+
+
+def _contexts(domain: Optional[str], error_type: Optional[str]) -> List[str]:
+    """Konteks dari yang paling spesifik ke yang paling umum."""
+    contexts = []
+    if error_type:
+        contexts.append(f"error:{error_type}")
+    if domain:
+        contexts.append(f"domain:{domain}")
+    contexts.append("*")
+    return contexts
+
+
+def _conn():
+    conn = connect("model_routing")
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS model_outcomes (
+            task TEXT NOT NULL,
+            context TEXT NOT NULL,
+            model TEXT NOT NULL,
+            successes REAL NOT NULL DEFAULT 0,
+            failures REAL NOT NULL DEFAULT 0,
+            avg_seconds REAL,
+            updated_at REAL NOT NULL,
+            PRIMARY KEY (task, context, model)
+        )
+        """
+    )
+    return conn
+
+
+def record(task: str, model: Optional[str], success: bool, seconds: Optional[float] = None,
+           domain: Optional[str] = None, error_type: Optional[str] = None) -> None:
+    """Catat hasil satu panggilan (domain default: domain job yang sedang berjalan)."""
+    if not model:
+        return
+    domain = domain or current_domain()
+    metrics.incr(f"router.{task}.{'success' if success else 'failure'}")
+    try:
+        conn = _conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for context in _contexts(domain, error_type):
+                _update(conn, task, context, model, success, seconds)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+    except Exception as e:
+        print(f"[ROUTER] Failed to record outcome: {e}")
+
+
+def _update(conn, task, context, model, success, seconds) -> None:
+    row = conn.execute(
+        "SELECT successes, failures, avg_seconds FROM model_outcomes WHERE task = ? AND context = ? AND model = ?",
+        (task, context, model),
+    ).fetchone()
+    successes, failures, avg_seconds = (row["successes"], row["failures"], row["avg_seconds"]) if row else (0.0, 0.0, None)
+    if successes + failures >= ROUTER_WINDOW:
+        successes, failures = successes / 2, failures / 2
+    if success:
+        successes += 1
+    else:
+        failures += 1
+    if seconds is not None:
+        avg_seconds = seconds if avg_seconds is None else avg_seconds + (seconds - avg_seconds) * 0.2
+    conn.execute(
+        """
+        INSERT OR REPLACE INTO model_outcomes (task, context, model, successes, failures, avg_seconds, updated_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+        """,
+        (task, context, model, successes, failures, avg_seconds, time.time()),
+    )
+
+
+def _stats(task: str, contexts: List[str]) -> Dict[str, Dict[str, dict]]:
+    """{context: {model: {samples, success_rate, avg_seconds}}}"""
+    stats: Dict[str, Dict[str, dict]] = {context: {} for context in contexts}
+    try:
+        rows = _conn().execute(
+            "SELECT context, model, successes, failures, avg_seconds FROM model_outcomes WHERE task = ? AND context IN ({})".format(
+                ",".join("?" * len(contexts))
+            ),
+            (task, *contexts),
+        ).fetchall()
+    except Exception as e:
+        print(f"[ROUTER] Failed to read outcomes: {e}")
+        return stats
+    for row in rows:
+        samples = row["successes"] + row["failures"]
+        stats[row["context"]][row["model"]] = {
+            "samples": round(samples, 1),
+            "success_rate": round(row["successes"] / samples, 3) if samples else 0.0,
+            "avg_seconds": round(row["avg_seconds"], 1) if row["avg_seconds"] is not None else None,
+        }
+    return stats
+
+
+def _eligible(model_stats: Optional[dict]) -> bool:
+    return bool(model_stats) and model_stats["samples"] >= ROUTER_MIN_SAMPLES \
+        and model_stats["success_rate"] >= ROUTER_MIN_SUCCESS
+
+
+def _score(model: str, model_stats: dict) -> tuple:
+    # Biaya per sukses, lalu latensi
+    cost = MODEL_COSTS.get(model, max(MODEL_COSTS.values(), default=1.0))
+    return cost / max(model_stats["success_rate"], 0.01), model_stats["avg_seconds"] or float("inf")
+
+
+def _usable(task: str, failed: Optional[Dict[str, int]]) -> List[str]:
+    failed = failed or {}
+    models = [m for m in TASK_MODELS[task] if failed.get(m, 0) < ROUTER_MAX_FAILURES_PER_MODEL]
+    if not pro_allowed() and any("pro" in m for m in models):
+        # Token job melewati JOB_PRO_TOKEN_BUDGET
+        print(f"💸 Token usage past the pro budget, {task} stays off gemini-2.5-pro.")
+        models = [m for m in models if "pro" not in m] or models
+    if not models:
+        # Semua model sudah gagal berkali-kali: tetap pakai model default terakhir
+        models = [DEFAULT_MODELS[task][-1]]
+    return models
+
+
+def choose(task: str, domain: Optional[str] = None, error_type: Optional[str] = None,
+           failed: Optional[Dict[str, int]] = None) -> str:
+    """
+    Model untuk satu panggilan task ini.
+
+    failed: kegagalan per model di loop perbaikan ini (model yang sudah
+    gagal ROUTER_MAX_FAILURES_PER_MODEL kali dilewati).
+    """
+    model, reason = _route(task, domain or current_domain(), error_type, failed)
+    metrics.incr(f"router.{task}.{model}")
+    print(f"[ROUTER] {task} -> {model} ({reason})")
+    return model
+
+
+def _route(task, domain, error_type, failed):
+    usable = _usable(task, failed)
+    if ROUTER_ENABLED:
+        contexts = _contexts(domain, error_type)
+        stats = _stats(task, contexts)
+        if random.random() < ROUTER_EXPLORE_RATE:
+            unexplored = [m for m in usable if not _enough_samples(stats["*"].get(m))]
+            if unexplored:
+                return random.choice(unexplored), "explore"
+        for context in contexts:
+            ranked = sorted(
+                (_score(m, stats[context][m]), m) for m in usable if _eligible(stats[context].get(m))
+            )
+            if ranked:
+                model = ranked[0][1]
+                return model, f"{context}: {stats[context][model]['success_rate']:.0%} success"
+    for model in DEFAULT_MODELS[task]:
+        if model in usable:
+            return model, "default"
+    return usable[0], "default"
+
+
+def _enough_samples(model_stats: Optional[dict]) -> bool:
+    return bool(model_stats) and model_stats["samples"] >= ROUTER_MIN_SAMPLES
+
+
+def routing_table() -> dict:
+    """Statistik per task / konteks / model beserta model yang akan dipilih (tanpa eksplorasi)."""
+    try:
+        contexts_by_task: Dict[str, List[str]] = {}
+        for row in _conn().execute("SELECT DISTINCT task, context FROM model_outcomes ORDER BY task, context"):
+            contexts_by_task.setdefault(row["task"], []).append(row["context"])
+    except Exception as e:
+        return {"enabled": ROUTER_ENABLED, "error": str(e)}
+
+    tasks = {}
+    for task in TASK_MODELS:
+        contexts = contexts_by_task.get(task, ["*"])
+        stats = _stats(task, contexts)
+        tasks[task] = {
+            context: {
+                "models": stats[context],
+                "route": _route_for_context(task, context, stats[context]),
+            }
+            for context in contexts
+        }
+    return {
+        "enabled": ROUTER_ENABLED,
+        "min_samples": ROUTER_MIN_SAMPLES,
+        "min_success": ROUTER_MIN_SUCCESS,
+        "costs": MODEL_COSTS,
+        "defaults": DEFAULT_MODELS,
+        "tasks": tasks,
+    }
+
+
+def _route_for_context(task: str, context: str, context_stats: dict) -> str:
+    ranked = sorted((_score(m, context_stats[m]), m) for m in TASK_MODELS[task] if _eligible(context_stats.get(m)))
+    return ranked[0][1] if ranked else DEFAULT_MODELS[task][0]
+
+
+class FixRouter:
+    """
+    Routing untuk satu loop perbaikan: pilih model per attempt, lalu catat
+    hasilnya begitu cek berikutnya (compile / trial render) selesai.
+    """
+
+    def __init__(self):
+        self.failed: Dict[str, int] = {}
+        self._pending = None
+
+    def choose(self, error_text: Optional[str]) -> str:
+        error_type = classify_error(error_text)
+        model = choose("fix", error_type=error_type, failed=self.failed)
+        self._pending = {"model": model, "error_type": error_type, "seconds": None}
+        return model
+
+    def fixed(self, seconds: float, answered: bool = True) -> None:
+        """
+        Perbaikan terakhir selesai. answered=False: panggilan LLM gagal (mis.
+        kuota habis) dan kode dikembalikan apa adanya, jadi tidak dinilai.
+        """
+        if self._pending:
+            self._pending["seconds"] = seconds if answered else None
+
+    def outcome(self, success: bool) -> None:
+        """Hasil cek setelah perbaikan terakhir (tidak melakukan apa-apa sebelum perbaikan pertama)."""
+        pending, self._pending = self._pending, None
+        if not pending or pending["seconds"] is None:
+            return
+        if not success:
+            self.failed[pending["model"]] = self.failed.get(pending["model"], 0) + 1
+        record("fix", pending["model"], success, pending["seconds"], error_type=pending["error_type"])
+
+
+if __name__ == "__main__":
+    print(json.dumps(routing_table(), indent=2))
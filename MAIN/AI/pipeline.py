@@ -0,0 +1,664 @@
+"""
+Pipeline generate video bertahap: plan -> code -> validate -> render -> store.
+
+Setiap tahap adalah objek Stage dengan versi sinkron (run) dan async
+(arun). VideoPipeline menjalankan tahap-tahap tersebut, mengirim event
+progress, memakai checkpoint bila ada, dan mencatat durasi / retry /
+error per tahap ke MAIN.AI.metrics (pipeline.<stage>.seconds, dst).
+
+Setiap tahap punya batas waktu (STAGE_DEADLINE_<TAHAP>_SECONDS) di dalam
+batas waktu job (JOB_DEADLINE_SECONDS), lihat MAIN.AI.cancellation.
+Deadline yang habis menggagalkan tahap tanpa retry.
+
+Token LLM yang dipakai dicatat per tahap di ctx.token_usage (lihat
+MAIN.AI.token_budget). Job yang melewati JOB_TOKEN_BUDGET tidak me-retry
+tahap yang gagal.
+
+Dipakai oleh CLI (generate_educational_video) maupun worker
+(generate_video_for_topic_with_progress / versi async-nya).
+"""
+
+import asyncio
+import contextvars
+import os
+import shutil
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from MAIN.AI import llm_backend, metrics, model_router
+from MAIN.AI.cancellation import (
+    JOB_DEADLINE_SECONDS,
+    CancelToken,
+    DeadlineExceeded,
+    JobCancelled,
+    set_current_token,
+    stage_deadline_seconds,
+)
+from MAIN.AI.checkpoints import StageCheckpoint
+from MAIN.AI.llm_cache import LLM_CACHE_REFRESH, LLM_CACHE_USE, llm_cache_mode
+from MAIN.AI.token_budget import TokenUsage
+
+OUTPUT_ROOT = (Path(__file__).resolve().parent.parent / "MAIN" / "output").resolve()
+
+
+class StageError(Exception):
+    """Tahap pipeline gagal (pesan dipakai langsung sebagai pesan error ke user)."""
+
+
+class PipelineInterrupted(Exception):
+    """
+    Pipeline sengaja dihentikan (mis. job dijadwalkan ulang oleh scheduler).
+    event dikirim ke konsumen apa adanya; checkpoint tidak dihapus.
+    """
+
+    def __init__(self, event: dict):
+        super().__init__(event.get("message", ""))
+        self.event = event
+
+
+@dataclass
+class PipelineContext:
+    """State yang dibawa dari satu tahap ke tahap berikutnya."""
+    topic: str
+    complexity: str = "high-school"
+    domain: str = "auto-detect"
+    message_id: Optional[int] = None
+    use_cache: bool = True
+    checkpoint: Optional[StageCheckpoint] = None
+    publish: Callable[[dict], None] = lambda event: None
+    # Dipanggil setelah setiap tahap (termasuk yang diambil dari checkpoint)
+    after_stage: Optional[Callable[[str, "PipelineContext"], None]] = None
+    # Diset worker saat client terputus; dicek di batas tahap dan oleh _run_manim
+    cancel_token: Optional[CancelToken] = None
+    # Batas waktu satu attempt job (None -> JOB_DEADLINE_SECONDS)
+    deadline_seconds: Optional[float] = None
+    # Token LLM job ini; worker mengisinya dari video_jobs supaya hitungan berlanjut antar attempt
+    token_usage: Optional[TokenUsage] = None
+    # Attempt job di antrian (retry_job / lease habis -> > 1)
+    job_attempt: int = 1
+
+    work_dir: Optional[Path] = None
+    timestamp: str = ""
+    safe_topic: str = ""
+
+    video_plan: Optional[dict] = None
+    # Draft method per langkah yang dimulai PlanStage selagi stage 1 streaming (per_step mode)
+    step_drafts: Optional[object] = None
+    manim_code: Optional[str] = None
+    # Kandidat kode spekulatif (MANIM_CODE_CANDIDATES > 1), di-race oleh ValidateStage
+    code_candidates: List[str] = field(default_factory=list)
+    code_model: Optional[str] = None
+    # Model tiap kandidat + lama pembuatannya, untuk mencatat hasil validasi ke model_router
+    code_models: List[str] = field(default_factory=list)
+    code_seconds: Optional[float] = None
+    validated_code: Optional[str] = None
+    video_path: Optional[str] = None
+    video_url: Optional[str] = None
+
+    timings: Dict[str, float] = field(default_factory=dict)
+    retries: Dict[str, int] = field(default_factory=dict)
+    resumed: List[str] = field(default_factory=list)
+
+    @property
+    def api_key(self) -> str:
+        api_key = llm_backend.api_key()
+        if not api_key:
+            raise ValueError("GOOGLE_API_KEY environment variable not set")
+        return api_key
+
+    @property
+    def routing_domain(self) -> str:
+        from MAIN.AI.script_generator import classify_domain
+
+        return self.domain if self.domain and self.domain != "auto-detect" else classify_domain(self.topic)
+
+    @property
+    def prompt(self) -> str:
+        return f"Create an educational animation about {self.topic} for {self.complexity} level ({self.domain})."
+
+    @property
+    def video_name(self) -> str:
+        prefix = f"{self.message_id}_" if self.message_id is not None else ""
+        return f"{prefix}{self.timestamp}_{self.safe_topic}.mp4"
+
+
+class Stage:
+    """
+    Satu tahap pipeline.
+
+    name         -> nama untuk metrics / timings
+    status       -> status event progress yang dikirim saat tahap mulai
+    max_retries  -> berapa kali tahap diulang jika melempar exception
+    """
+    name = ""
+    status = ""
+    message = ""
+    max_retries = 0
+
+    def load(self, ctx: PipelineContext) -> bool:
+        """Ambil hasil dari checkpoint. True jika tahap bisa dilewati."""
+        return False
+
+    def save(self, ctx: PipelineContext) -> None:
+        """Simpan hasil tahap ke checkpoint."""
+
+    def run(self, ctx: PipelineContext) -> None:
+        raise NotImplementedError
+
+    async def arun(self, ctx: PipelineContext) -> None:
+        await asyncio.to_thread(self.run, ctx)
+
+
+class PlanStage(Stage):
+    name = "plan"
+    status = "generating_content"
+    message = "📝 Membuat konten edukatif..."
+    max_retries = 1
+
+    def load(self, ctx):
+        ctx.video_plan = ctx.checkpoint.load_plan() if ctx.checkpoint else None
+        return bool(ctx.video_plan)
+
+    def save(self, ctx):
+        if ctx.checkpoint:
+            ctx.checkpoint.save_plan(ctx.video_plan)
+
+    def run(self, ctx):
+        generator = self._generator(ctx)
+        on_step = self._step_streamed(ctx, asynchronous=False)
+        started = time.monotonic()
+        video_plan = generator.generate_complete_video_plan(ctx.prompt, on_step)
+        self._record(generator, started)
+        self._check(ctx, video_plan)
+
+    async def arun(self, ctx):
+        generator = self._generator(ctx)
+        on_step = self._step_streamed(ctx, asynchronous=True)
+        started = time.monotonic()
+        video_plan = await generator.agenerate_complete_video_plan(ctx.prompt, on_step)
+        self._record(generator, started)
+        self._check(ctx, video_plan)
+
+    @staticmethod
+    def _generator(ctx):
+        from MAIN.AI.script_generator import ScienceVideoGenerator
+
+        return ScienceVideoGenerator(google_api_key=ctx.api_key, model=model_router.choose("plan"))
+
+    @staticmethod
+    def _record(generator, started):
+        # Sukses = respons stage 1 ter-parse (fallback lokal dihitung gagal)
+        model_router.record("plan", generator.model, generator.stage1_parsed, time.monotonic() - started)
+
+    @staticmethod
+    def _step_streamed(ctx, asynchronous):
+        """
+        Callback untuk setiap educational step yang selesai di-stream:
+        kirim progress ke user, dan di per_step mode langsung mulai
+        draft kode langkah tsb (dipakai CodeStage jika prompt-nya sama).
+        """
+        from MAIN.AI.manim_code_generator import MANIM_CODEGEN_MODE, StepDrafts
+
+        code_generator = None
+        if MANIM_CODEGEN_MODE == "per_step":
+            if ctx.step_drafts is None:
+                ctx.step_drafts = StepDrafts()
+            code_generator = CodeStage._generator(ctx)
+
+        def _on_step(index, step, title):
+            metrics.incr("pipeline.plan.steps_streamed")
+            ctx.publish({
+                "status": "plan_step",
+                "message": f"📚 Langkah {index}: {step.get('step_title', '')}",
+                "stage": "plan",
+            })
+            if code_generator is None:
+                return
+            partial_plan = {"educational_breakdown": {"title": title or "Educational Animation"}}
+            if asynchronous:
+                ctx.step_drafts.astart(code_generator, partial_plan, index, step)
+            else:
+                ctx.step_drafts.start(code_generator, partial_plan, index, step)
+
+        return _on_step
+
+    @staticmethod
+    def _check(ctx, video_plan):
+        if not video_plan or "error" in video_plan:
+            error = video_plan.get("error", "Unknown error") if video_plan else "Unknown error"
+            raise StageError(f"Failed to generate educational content: {error}")
+        ctx.video_plan = video_plan
+
+
+class CodeStage(Stage):
+    """
+    Kode Manim dari video plan. Dengan MANIM_CODE_CANDIDATES > 1 beberapa
+    kandidat (model / temperature berbeda) dibuat paralel; ValidateStage
+    me-race trial render-nya.
+    """
+    name = "code"
+    status = "generating_code"
+    message = "💻 Membuat kode animasi..."
+    max_retries = 1
+
+    def load(self, ctx):
+        ctx.manim_code = ctx.checkpoint.load_code() if ctx.checkpoint else None
+        return bool(ctx.manim_code)
+
+    def save(self, ctx):
+        if ctx.checkpoint:
+            ctx.checkpoint.save_code(ctx.manim_code)
+
+    def run(self, ctx):
+        try:
+            self._generate(ctx)
+        finally:
+            self._release_drafts(ctx)
+
+    async def arun(self, ctx):
+        try:
+            await self._agenerate(ctx)
+        finally:
+            self._release_drafts(ctx)
+
+    def _generate(self, ctx):
+        from MAIN.AI.manim_code_generator import MANIM_CODE_CANDIDATES, code_candidate_variants
+
+        started = time.monotonic()
+        if MANIM_CODE_CANDIDATES <= 1:
+            generator = self._generator(ctx)
+            self._check(ctx, generator.generate_3b1b_manim_code(ctx.video_plan, ctx.step_drafts))
+            self._routed(ctx, [generator.model], started)
+            return
+
+        variants = code_candidate_variants(MANIM_CODE_CANDIDATES)
+        with ThreadPoolExecutor(max_workers=len(variants), thread_name_prefix="manim-codegen") as pool:
+            # copy_context: token / deadline job ikut ke thread pool
+            futures = [
+                pool.submit(
+                    contextvars.copy_context().run,
+                    self._generator(ctx, model, temperature).generate_3b1b_manim_code,
+                    ctx.video_plan,
+                    ctx.step_drafts,
+                )
+                for model, temperature in variants
+            ]
+            results = []
+            for future in futures:
+                try:
+                    results.append(future.result())
+                except Exception as e:
+                    results.append(e)
+        self._check_candidates(ctx, results, [model for model, _ in variants])
+        self._routed(ctx, ctx.code_models, started)
+
+    async def _agenerate(self, ctx):
+        from MAIN.AI.manim_code_generator import MANIM_CODE_CANDIDATES, code_candidate_variants
+
+        started = time.monotonic()
+        if MANIM_CODE_CANDIDATES <= 1:
+            generator = self._generator(ctx)
+            self._check(ctx, await generator.agenerate_3b1b_manim_code(ctx.video_plan, ctx.step_drafts))
+            self._routed(ctx, [generator.model], started)
+            return
+
+        variants = code_candidate_variants(MANIM_CODE_CANDIDATES)
+        results = await asyncio.gather(
+            *(
+                self._generator(ctx, model, temperature).agenerate_3b1b_manim_code(ctx.video_plan, ctx.step_drafts)
+                for model, temperature in variants
+            ),
+            return_exceptions=True,
+        )
+        self._check_candidates(ctx, results, [model for model, _ in variants])
+        self._routed(ctx, ctx.code_models, started)
+
+    @staticmethod
+    def _release_drafts(ctx):
+        # Draft yang tidak cocok dengan plan final tidak perlu ditunggu
+        if ctx.step_drafts is not None:
+            ctx.step_drafts.close()
+            ctx.step_drafts = None
+
+    @staticmethod
+    def _generator(ctx, model=None, temperature=None):
+        from MAIN.AI.manim_code_generator import ManIMCodeGenerator
+
+        if model is None:
+            # Dipilih sekali per job, supaya draft per langkah dari PlanStage tetap cocok
+            ctx.code_model = ctx.code_model or model_router.choose("code")
+            return ManIMCodeGenerator(google_api_key=ctx.api_key, model=ctx.code_model)
+        return ManIMCodeGenerator(google_api_key=ctx.api_key, model=model, temperature=temperature)
+
+    @staticmethod
+    def _routed(ctx, models, started):
+        # Hasilnya baru diketahui di ValidateStage (lolos trial render tanpa perbaikan?)
+        ctx.code_models = list(models)
+        ctx.code_seconds = time.monotonic() - started
+
+    @staticmethod
+    def _check(ctx, manim_code):
+        if not manim_code or len(manim_code.strip()) < 100:
+            raise StageError("Generated Manim code is too short or empty")
+        ctx.manim_code = manim_code
+
+    @classmethod
+    def _check_candidates(cls, ctx, results, models):
+        candidates = []
+        candidate_models = []
+        for index, result in enumerate(results):
+            if isinstance(result, BaseException):
+                if not isinstance(result, Exception):
+                    raise result  # JobCancelled / DeadlineExceeded
+                print(f"[PIPELINE] Code candidate {index + 1} failed: {result}")
+                continue
+            try:
+                cls._check(ctx, result)
+                candidates.append(result)
+                candidate_models.append(models[index])
+            except StageError as e:
+                print(f"[PIPELINE] Code candidate {index + 1} rejected: {e}")
+        metrics.observe("pipeline.code.candidates", len(candidates))
+        if not candidates:
+            raise StageError("All generated Manim code candidates were empty or failed")
+        ctx.code_candidates = candidates
+        ctx.code_models = candidate_models
+        ctx.manim_code = candidates[0]
+        print(f"[PIPELINE] {len(candidates)}/{len(results)} code candidate(s) ready")
+
+
+class ValidateStage(Stage):
+    """
+    Compile + trial render (-ql) dengan perbaikan LLM. Jika ada beberapa
+    kandidat kode, semuanya diuji bersamaan dan yang pertama lolos menang.
+    """
+    name = "validate"
+    status = "validating"
+    message = "🧪 Menguji kode animasi..."
+
+    def load(self, ctx):
+        ctx.validated_code = ctx.checkpoint.load_validated_code() if ctx.checkpoint else None
+        return bool(ctx.validated_code)
+
+    def save(self, ctx):
+        if ctx.checkpoint:
+            ctx.checkpoint.save_validated_code(ctx.validated_code)
+
+    def run(self, ctx):
+        from MAIN.AI.animation_creator import race_render_tests, render_test_manim_code
+
+        if len(ctx.code_candidates) > 1:
+            self._check_race(ctx, race_render_tests(ctx.code_candidates, str(ctx.work_dir)))
+            return
+        self._check(ctx, render_test_manim_code(ctx.manim_code, trial_dir=str(ctx.work_dir / "trial_media")))
+
+    async def arun(self, ctx):
+        from MAIN.AI.animation_creator import arace_render_tests, arender_test_manim_code
+
+        if len(ctx.code_candidates) > 1:
+            self._check_race(ctx, await arace_render_tests(ctx.code_candidates, str(ctx.work_dir)))
+            return
+        self._check(ctx, await arender_test_manim_code(ctx.manim_code, trial_dir=str(ctx.work_dir / "trial_media")))
+
+    @classmethod
+    def _check_race(cls, ctx, winner):
+        if winner is None:
+            raise StageError("Failed to create animation (code could not be fixed).")
+        index, validated_code = winner
+        metrics.observe("pipeline.validate.winning_candidate", index)
+        ctx.manim_code = ctx.code_candidates[index]
+        cls._check(ctx, validated_code, index)
+
+    @staticmethod
+    def _check(ctx, validated_code, index=0):
+        if index < len(ctx.code_models):
+            # Kandidat yang kalah race dibatalkan di tengah jalan: hanya pemenang yang dicatat
+            model_router.record(
+                "code", ctx.code_models[index], validated_code == ctx.manim_code, ctx.code_seconds
+            )
+        if not validated_code:
+            raise StageError("Failed to create animation (code could not be fixed).")
+        ctx.validated_code = validated_code
+
+
+class RenderStage(Stage):
+    """Render final (-qm) dari kode yang sudah lolos trial render."""
+    name = "render"
+    status = "rendering"
+    message = "🎬 Merender video (mohon tunggu)..."
+
+    def load(self, ctx):
+        ctx.video_path = ctx.checkpoint.load_video() if ctx.checkpoint else None
+        return bool(ctx.video_path)
+
+    def save(self, ctx):
+        if ctx.checkpoint:
+            ctx.video_path = ctx.checkpoint.save_video(ctx.video_path)
+
+    def run(self, ctx):
+        from MAIN.AI.animation_creator import render_final_video
+
+        self._check(ctx, render_final_video(ctx.validated_code, str(ctx.work_dir)))
+
+    async def arun(self, ctx):
+        from MAIN.AI.animation_creator import arender_final_video
+
+        self._check(ctx, await arender_final_video(ctx.validated_code, str(ctx.work_dir)))
+
+    @staticmethod
+    def _check(ctx, video_path):
+        if not video_path or not os.path.exists(video_path):
+            raise StageError("Failed to create animation (File not found).")
+        file_size = os.path.getsize(video_path)
+        print(f"[PIPELINE] Rendered file size: {file_size} bytes")
+        if file_size == 0:
+            print(f"[PIPELINE] ⚠️ Video file is empty!")
+        ctx.video_path = video_path
+
+
+class StoreStage(Stage):
+    """Upload ke R2, simpan ke video cache, hapus checkpoint."""
+    name = "store"
+    status = "saving"
+    message = "💾 Menyimpan video ke server..."
+    max_retries = 2
+
+    def run(self, ctx):
+        from MAIN.AI.storage import upload_video
+
+        ctx.video_url = upload_video(ctx.video_path, ctx.video_name)
+        self._finish(ctx)
+
+    async def arun(self, ctx):
+        from MAIN.AI.storage import upload_video
+
+        ctx.video_url = await asyncio.to_thread(upload_video, ctx.video_path, ctx.video_name)
+        await asyncio.to_thread(self._finish, ctx)
+
+    @staticmethod
+    def _finish(ctx):
+        from MAIN.AI.video_cache import get_video_cache
+
+        if ctx.use_cache:
+            get_video_cache().put(ctx.topic, ctx.video_url, ctx.complexity, ctx.domain)
+        if ctx.checkpoint:
+            ctx.checkpoint.clear()
+
+
+def default_stages() -> List[Stage]:
+    return [PlanStage(), CodeStage(), ValidateStage(), RenderStage(), StoreStage()]
+
+
+class VideoPipeline:
+    """Jalankan daftar Stage berurutan (sinkron via run, asyncio via arun)."""
+
+    def __init__(self, stages: Optional[List[Stage]] = None):
+        self.stages = stages if stages is not None else default_stages()
+
+    def run(self, ctx: PipelineContext) -> PipelineContext:
+        self._start(ctx)
+        try:
+            for stage in self.stages:
+                if self._begin_stage(stage, ctx):
+                    self._after_stage(stage, ctx)
+                    continue
+                started = time.monotonic()
+                for attempt in range(stage.max_retries + 1):
+                    try:
+                        with llm_cache_mode(self._cache_mode(ctx, attempt)):
+                            stage.run(ctx)
+                        break
+                    except DeadlineExceeded as e:
+                        self._deadline_exceeded(stage, e)
+                    except Exception as e:
+                        self._stage_failed(stage, ctx, attempt, e)
+                self._end_stage(stage, ctx, started)
+                self._after_stage(stage, ctx)
+            return ctx
+        finally:
+            self._finish(ctx)
+
+    async def arun(self, ctx: PipelineContext) -> PipelineContext:
+        self._start(ctx)
+        try:
+            for stage in self.stages:
+                if self._begin_stage(stage, ctx):
+                    self._after_stage(stage, ctx)
+                    continue
+                started = time.monotonic()
+                for attempt in range(stage.max_retries + 1):
+                    try:
+                        with llm_cache_mode(self._cache_mode(ctx, attempt)):
+                            await self._arun_stage(stage, ctx)
+                        break
+                    except DeadlineExceeded as e:
+                        self._deadline_exceeded(stage, e)
+                    except Exception as e:
+                        self._stage_failed(stage, ctx, attempt, e)
+                self._end_stage(stage, ctx, started)
+                self._after_stage(stage, ctx)
+            return ctx
+        finally:
+            self._finish(ctx)
+
+    @staticmethod
+    async def _arun_stage(stage: Stage, ctx: PipelineContext) -> None:
+        """stage.arun dengan batas waktu keras (task dibatalkan saat deadline)."""
+        token = ctx.cancel_token
+        try:
+            await asyncio.wait_for(stage.arun(ctx), token.remaining())
+        except asyncio.TimeoutError:
+            remaining = token.remaining()
+            if remaining is not None and remaining <= 0:
+                raise DeadlineExceeded(f"Batas waktu tahap '{stage.name}' habis")
+            raise
+
+    # === helpers dipakai run() dan arun() ===
+    @staticmethod
+    def _start(ctx: PipelineContext) -> None:
+        if ctx.cancel_token is None:
+            ctx.cancel_token = CancelToken()
+        ctx.cancel_token.start_job(ctx.deadline_seconds or JOB_DEADLINE_SECONDS)
+        if ctx.token_usage is None:
+            ctx.token_usage = TokenUsage()
+        ctx.cancel_token.usage = ctx.token_usage
+        # Token aktif untuk thread / task ini (asyncio.to_thread ikut menyalin context)
+        set_current_token(ctx.cancel_token)
+        model_router.set_current_domain(ctx.routing_domain)
+        OUTPUT_ROOT.mkdir(parents=True, exist_ok=True)
+        ctx.timestamp = ctx.timestamp or datetime.now().strftime("%Y%m%d_%H%M%S")
+        ctx.safe_topic = "".join(c if c.isalnum() else "_" for c in ctx.topic)[:25]
+        # Suffix acak: job lain (proses lain / batch) bisa mulai di detik yang sama dengan topik serupa
+        ctx.work_dir = OUTPUT_ROOT / f"{ctx.timestamp}_{ctx.safe_topic}_{uuid.uuid4().hex[:8]}"
+        ctx.work_dir.mkdir(parents=True, exist_ok=True)
+        print(f"[PIPELINE] '{ctx.topic}' ({ctx.complexity}, {ctx.domain}) -> {ctx.work_dir}")
+
+        resumed_stage = ctx.checkpoint.completed_stage() if ctx.checkpoint else None
+        if resumed_stage:
+            print(f"[PIPELINE] Resuming from checkpoint (last stage: {resumed_stage})")
+            ctx.publish({"status": "resuming", "message": f"🔁 Melanjutkan dari tahap terakhir ({resumed_stage})..."})
+
+    @staticmethod
+    def _begin_stage(stage: Stage, ctx: PipelineContext) -> bool:
+        """Kirim event tahap; True jika hasilnya sudah ada di checkpoint."""
+        ctx.cancel_token.start_stage(stage.name, stage_deadline_seconds(stage.name))
+        try:
+            ctx.cancel_token.raise_if_cancelled()
+        except DeadlineExceeded as e:
+            # Deadline job sudah habis sebelum tahap ini dimulai
+            VideoPipeline._deadline_exceeded(stage, e)
+        ctx.publish({"status": stage.status, "message": stage.message, "stage": stage.name})
+        if stage.load(ctx):
+            ctx.resumed.append(stage.name)
+            metrics.incr(f"pipeline.{stage.name}.resumed")
+            print(f"[PIPELINE] Stage '{stage.name}' loaded from checkpoint")
+            return True
+        return False
+
+    @staticmethod
+    def _cache_mode(ctx: PipelineContext, attempt: int) -> str:
+        # Retry tahap atau retry job: jawaban LLM yang di-cache ikut gagal, jadi minta jawaban baru
+        return LLM_CACHE_REFRESH if attempt or ctx.job_attempt > 1 else LLM_CACHE_USE
+
+    @staticmethod
+    def _stage_failed(stage: Stage, ctx: PipelineContext, attempt: int, error: Exception) -> None:
+        metrics.incr(f"pipeline.{stage.name}.errors")
+        if attempt < stage.max_retries and ctx.token_usage.exhausted():
+            metrics.incr("pipeline.token_budget_exhausted")
+            print(f"[PIPELINE] Token budget exhausted ({ctx.token_usage.describe()}), not retrying '{stage.name}'")
+            attempt = stage.max_retries
+        if attempt >= stage.max_retries:
+            print(f"[PIPELINE] Stage '{stage.name}' failed: {error}")
+            if isinstance(error, StageError):
+                raise error
+            raise StageError(f"{stage.name} failed: {error}") from error
+        ctx.retries[stage.name] = ctx.retries.get(stage.name, 0) + 1
+        metrics.incr(f"pipeline.{stage.name}.retries")
+        print(f"[PIPELINE] Stage '{stage.name}' attempt {attempt + 1} failed ({error}), retrying...")
+
+    @staticmethod
+    def _deadline_exceeded(stage: Stage, error: DeadlineExceeded) -> None:
+        metrics.incr(f"pipeline.{stage.name}.deadline_exceeded")
+        print(f"[PIPELINE] Stage '{stage.name}' hit its deadline: {error}")
+        raise StageError(f"Stage '{stage.name}' exceeded its time budget") from None
+
+    @staticmethod
+    def _end_stage(stage: Stage, ctx: PipelineContext, started: float) -> None:
+        elapsed = time.monotonic() - started
+        ctx.timings[stage.name] = round(elapsed, 3)
+        metrics.observe(f"pipeline.{stage.name}.seconds", elapsed)
+        if ctx.cancel_token.cancelled:
+            # Job dibatalkan saat tahap berjalan: jangan hidupkan lagi checkpoint-nya
+            raise JobCancelled()
+        stage.save(ctx)
+        print(f"[PIPELINE] Stage '{stage.name}' done in {elapsed:.1f}s")
+
+    @staticmethod
+    def _after_stage(stage: Stage, ctx: PipelineContext) -> None:
+        if ctx.after_stage:
+            ctx.after_stage(stage.name, ctx)
+
+    @staticmethod
+    def _finish(ctx: PipelineContext) -> None:
+        # Folder kerja selalu dibuang (juga saat dibatalkan); hasil yang perlu
+        # di-resume ada di checkpoint
+        set_current_token(None)
+        model_router.set_current_domain(None)
+        if ctx.step_drafts is not None:
+            ctx.step_drafts.close()
+        if ctx.work_dir:
+            shutil.rmtree(ctx.work_dir, ignore_errors=True)
+        if ctx.timings:
+            summary = ", ".join(f"{name}={seconds:.1f}s" for name, seconds in ctx.timings.items())
+            print(f"[PIPELINE] Timings for '{ctx.topic}': {summary}")
+        if ctx.token_usage is not None:
+            usage = ctx.token_usage.summary()
+            for stage_name, counts in usage["stages"].items():
+                metrics.observe(f"pipeline.{stage_name}.tokens", counts["input_tokens"] + counts["output_tokens"])
+            metrics.observe("pipeline.tokens", usage["total_tokens"])
+            print(f"[PIPELINE] Token usage for '{ctx.topic}': {ctx.token_usage.describe()}")
@@ -0,0 +1,198 @@
+"""
+Skema output terstruktur untuk stage 1 (educational breakdown) dan
+stage 2 (struktur scene Manim).
+
+JSON schema dari model di bawah dikirim ke Gemini sebagai response_schema
+(dengan response_mime_type application/json), jadi responsnya sudah
+berupa JSON dengan bentuk yang benar. Penerimaan cukup satu langkah:
+parse_plan() memvalidasi teks respons dengan Pydantic dan mengembalikan
+dict. Bentuk dict-nya sama dengan yang sudah dipakai pipeline,
+checkpoint dan prompt kode. Respons yang tidak valid menghasilkan None,
+lalu pemanggil memakai struktur fallback seperti sebelumnya.
+
+Hampir semua field punya default. Gemini tetap mengisinya (prompt
+memintanya), tetapi satu field kecil yang hilang tidak membuang seluruh
+plan. Field yang wajib hanya field yang benar-benar dipakai untuk
+membuat kode.
+"""
+
+from typing import Dict, List, Optional, Type
+
+from langchain_core.utils.json_schema import dereference_refs
+from pydantic import BaseModel, ConfigDict, Field, ValidationError
+
+from MAIN.AI import metrics
+
+
+class _PlanModel(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+
+
+# === Stage 1: educational breakdown ===
+
+class TopicAnalysis(_PlanModel):
+    domain: str = Field("", description="Scientific field")
+    complexity_level: str = Field("", description="Difficulty level")
+    core_concepts: List[str] = Field(default_factory=list)
+    prerequisites: List[str] = Field(default_factory=list)
+
+
+class VisualElements(_PlanModel):
+    diagrams: List[str] = Field(default_factory=list, description="Types of diagram needed")
+    animations: List[str] = Field(default_factory=list, description="Specific animation requirements")
+    text_displays: List[str] = Field(default_factory=list, description="Text elements to show")
+    color_scheme: List[str] = Field(default_factory=list, description="Manim color constants, e.g. BLUE")
+    highlighting: List[str] = Field(default_factory=list, description="Elements to emphasize")
+
+
+class EducationalStep(_PlanModel):
+    step_number: int
+    step_title: str = Field(description="Clear, descriptive title for this step")
+    description: str = Field(description="What this step covers (100-150 words)")
+    key_concepts: List[str] = Field(default_factory=list)
+    equations: List[str] = Field(default_factory=list, description="LaTeX equations, if applicable")
+    data_points: List[str] = Field(default_factory=list, description="Relevant statistics, measurements or facts")
+    real_world_examples: List[str] = Field(default_factory=list)
+    common_misconceptions: List[str] = Field(default_factory=list, description="Misconception and its correction")
+    narration_script: str = Field(description="Narration for this step (50-100 words, conversational tone)")
+    visual_elements: VisualElements = Field(default_factory=VisualElements)
+    animation_plan: str = Field(description="How this step is visualized in Manim, step by step (200+ words)")
+    duration_seconds: int = Field(25, description="Duration of this step in seconds")
+    difficulty_level: str = Field("intermediate", description="beginner | intermediate | advanced")
+    transition_to_next: str = Field("", description="How this step connects to the next step")
+
+
+class QuizQuestion(_PlanModel):
+    question: str
+    type: str = Field("short_answer", description="multiple_choice | short_answer | true_false | numerical")
+    difficulty: str = Field("intermediate", description="beginner | intermediate | advanced")
+    correct_answer: str = ""
+    explanation: str = ""
+
+
+class Assessment(_PlanModel):
+    quiz_questions: List[QuizQuestion] = Field(default_factory=list)
+    thought_experiments: List[str] = Field(default_factory=list)
+    interactive_elements: List[str] = Field(default_factory=list)
+
+
+class PlanMetadata(_PlanModel):
+    target_audience: str = Field("General", description="Specific age range and education level")
+    estimated_total_duration: int = Field(0, description="Total duration in seconds")
+    real_world_applications: List[str] = Field(default_factory=list)
+    related_topics: List[str] = Field(default_factory=list)
+    difficulty_progression: str = Field("intermediate", description="How complexity increases through the steps")
+
+
+class EducationalBreakdown(_PlanModel):
+    """Respons stage 1. Urutan field = urutan output (title sebelum educational_steps untuk streaming)."""
+    topic_analysis: TopicAnalysis = Field(default_factory=TopicAnalysis)
+    title: str = Field(description="Engaging title for the educational content")
+    abstract: str = Field("", description="2-3 sentence summary of the concept and its importance")
+    learning_objectives: List[str] = Field(default_factory=list)
+    educational_steps: List[EducationalStep] = Field(min_length=1, description="4-6 logical learning steps")
+    summary: str = ""
+    assessment: Assessment = Field(default_factory=Assessment)
+    metadata: PlanMetadata = Field(default_factory=PlanMetadata)
+
+
+# === Stage 2: struktur scene Manim ===
+
+class Timing(_PlanModel):
+    start: int = 0
+    end: int = 0
+
+
+class AnimationStep(_PlanModel):
+    step_number: int
+    action_type: str = Field("content", description="intro | content | transition | conclusion")
+    manim_objects: List[str] = Field(default_factory=list, description="e.g. Text, MathTex, Circle")
+    animations: List[str] = Field(default_factory=list, description="e.g. Write, FadeIn, Transform")
+    description: str = Field(description="What happens in this animation step")
+    narration: str = Field("", description="Corresponding narration from the educational breakdown")
+    code_snippet: str = Field("", description="Key Manim code lines for this step")
+    duration: int = Field(30, description="Duration in seconds")
+    positioning: str = Field("center", description="center | UP*2 | LEFT*3 | ...")
+    colors: List[str] = Field(default_factory=list)
+    transformations: List[str] = Field(default_factory=list)
+    mathematical_content: str = Field("", description="LaTeX equations to display")
+    visual_elements: List[str] = Field(default_factory=list)
+    timing: Timing = Field(default_factory=Timing)
+    layer_order: int = 1
+
+
+class SceneConfig(_PlanModel):
+    background_color: str = "BLACK"
+    camera_config: str = "default"
+    total_duration: int = 0
+    resolution: str = "1080p"
+    frame_rate: int = 30
+
+
+class EducationalMetadata(_PlanModel):
+    learning_objectives: List[str] = Field(default_factory=list)
+    target_audience: str = ""
+    difficulty_level: str = "intermediate"
+
+
+class TechnicalRequirements(_PlanModel):
+    required_imports: List[str] = Field(default_factory=list)
+    custom_functions: List[str] = Field(default_factory=list)
+    external_resources: List[str] = Field(default_factory=list)
+
+
+class CodeStructure(_PlanModel):
+    class_name: str = ""
+    methods: List[str] = Field(default_factory=lambda: ["construct"])
+    complexity_level: str = "intermediate"
+
+
+class ManimStructure(_PlanModel):
+    """Respons stage 2."""
+    scene_title: str = Field(description="Title for the Manim scene class")
+    scene_description: str = ""
+    animation_steps: List[AnimationStep] = Field(min_length=1)
+    scene_config: SceneConfig = Field(default_factory=SceneConfig)
+    educational_metadata: EducationalMetadata = Field(default_factory=EducationalMetadata)
+    technical_requirements: TechnicalRequirements = Field(default_factory=TechnicalRequirements)
+    code_structure: CodeStructure = Field(default_factory=CodeStructure)
+
+
+_schemas: Dict[type, dict] = {}
+
+
+def _order_properties(node) -> None:
+    """propertyOrdering di setiap objek (termasuk yang bertingkat) = urutan field model."""
+    if isinstance(node, dict):
+        if "properties" in node:
+            node["propertyOrdering"] = list(node["properties"])
+        for value in node.values():
+            _order_properties(value)
+    elif isinstance(node, list):
+        for value in node:
+            _order_properties(value)
+
+
+def response_schema(model: Type[BaseModel]) -> dict:
+    """JSON schema untuk response_schema Gemini (urutan properti mengikuti urutan field)."""
+    schema = _schemas.get(model)
+    if schema is None:
+        # Gemini tidak mengenal $ref / $defs: model bertingkat di-inline
+        schema = dereference_refs(model.model_json_schema())
+        schema.pop("$defs", None)
+        _order_properties(schema)
+        _schemas[model] = schema
+    return schema
+
+
+def parse_plan(model: Type[BaseModel], text: Optional[str]) -> Optional[dict]:
+    """Validasi respons terhadap skema; dict hasil model_dump, atau None jika tidak sesuai."""
+    try:
+        return model.model_validate_json(text or "").model_dump()
+    except ValidationError as e:
+        metrics.incr(f"plan.{model.__name__}.invalid")
+        first = e.errors()[0]
+        location = ".".join(str(part) for part in first["loc"])
+        print(f"⚠️ {model.__name__} response does not match the schema "
+              f"({e.error_count()} error(s), first: {location or 'root'}: {first['msg']})")
+        return None
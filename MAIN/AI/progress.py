@@ -0,0 +1,125 @@
+"""
+Progress bus untuk pipeline generate video.
+
+Tahap-tahap pipeline berjalan di satu thread latar dan memanggil
+publish(event). Konsumen (worker / SSE) mengiterasi bus: event diteruskan
+begitu masuk ke queue, dan heartbeat hanya dikirim dari sini bila tidak
+ada event selama PROGRESS_HEARTBEAT_SECONDS.
+"""
+
+import asyncio
+import os
+import queue
+import random
+import string
+import threading
+import traceback
+from typing import AsyncIterator, Callable, Iterator, Union
+
+PROGRESS_HEARTBEAT_SECONDS = float(os.getenv("PROGRESS_HEARTBEAT_SECONDS", "1.0"))
+
+# Padding dibuat sekali saja; isinya tidak penting, hanya ukurannya
+# (memaksa proxy seperti nginx mem-flush buffer).
+_HEARTBEAT_PADDING = "".join(
+    random.choices(string.ascii_letters, k=int(os.getenv("PROGRESS_HEARTBEAT_PADDING", "400")))
+)
+
+_DONE = object()
+
+
+def heartbeat_comment(label: str, count: int) -> str:
+    """Komentar SSE (diabaikan browser) untuk menjaga koneksi tetap hidup."""
+    return f": heartbeat-{label}-{count}-{_HEARTBEAT_PADDING}\n\n"
+
+
+class ProgressBus:
+    """Queue event antara thread pipeline dan konsumennya."""
+
+    def __init__(self, heartbeat_interval: float = PROGRESS_HEARTBEAT_SECONDS):
+        self.heartbeat_interval = heartbeat_interval
+        self.stage = "start"
+        self._queue: "queue.Queue" = queue.Queue()
+        self._thread = None
+
+    def publish(self, event: dict) -> None:
+        if event.get("status"):
+            self.stage = event["status"]
+        self._queue.put(event)
+
+    def run(self, target: Callable, *args, **kwargs) -> "ProgressBus":
+        """
+        Jalankan target(publish, *args, **kwargs) di thread latar.
+        Exception yang lolos dari target dikirim sebagai event 'error'.
+        """
+        def _runner():
+            try:
+                target(self.publish, *args, **kwargs)
+            except Exception as e:
+                print(f"[PROGRESS] Pipeline crashed: {traceback.format_exc()}")
+                self.publish({"status": "error", "message": f"❌ Error: {str(e)}"})
+            finally:
+                self._queue.put(_DONE)
+
+        self._thread = threading.Thread(target=_runner, name="video-pipeline", daemon=True)
+        self._thread.start()
+        return self
+
+    def __iter__(self) -> Iterator[Union[dict, str]]:
+        heartbeat_count = 0
+        while True:
+            try:
+                event = self._queue.get(timeout=self.heartbeat_interval)
+            except queue.Empty:
+                heartbeat_count += 1
+                yield heartbeat_comment(self.stage, heartbeat_count)
+                continue
+            if event is _DONE:
+                return
+            yield event
+
+
+class AsyncProgressBus:
+    """Versi asyncio dari ProgressBus: pipeline berjalan sebagai task di event loop yang sama."""
+
+    def __init__(self, heartbeat_interval: float = PROGRESS_HEARTBEAT_SECONDS):
+        self.heartbeat_interval = heartbeat_interval
+        self.stage = "start"
+        self._queue: "asyncio.Queue" = asyncio.Queue()
+        self._task = None
+
+    def publish(self, event: dict) -> None:
+        if event.get("status"):
+            self.stage = event["status"]
+        self._queue.put_nowait(event)
+
+    def run(self, target: Callable, *args, **kwargs) -> "AsyncProgressBus":
+        """Jalankan coroutine target(publish, *args, **kwargs) sebagai task."""
+        async def _runner():
+            try:
+                await target(self.publish, *args, **kwargs)
+            except Exception as e:
+                print(f"[PROGRESS] Pipeline crashed: {traceback.format_exc()}")
+                self.publish({"status": "error", "message": f"❌ Error: {str(e)}"})
+            finally:
+                self._queue.put_nowait(_DONE)
+
+        self._task = asyncio.ensure_future(_runner())
+        return self
+
+    async def __aiter__(self) -> AsyncIterator[Union[dict, str]]:
+        heartbeat_count = 0
+        try:
+            while True:
+                try:
+                    event = await asyncio.wait_for(self._queue.get(), timeout=self.heartbeat_interval)
+                except asyncio.TimeoutError:
+                    heartbeat_count += 1
+                    yield heartbeat_comment(self.stage, heartbeat_count)
+                    continue
+                if event is _DONE:
+                    return
+                yield event
+        finally:
+            # Konsumen berhenti lebih awal -> jangan biarkan task berjalan tanpa pemilik
+            if self._task and not self._task.done():
+                self._task.cancel()
@@ -0,0 +1,307 @@
+"""
+Cache prefix prompt di sisi provider.
+
+Prompt Manim whole-scene terdiri dari prefix statis yang sangat besar
+(panduan, contoh scene, template output) dan bagian kecil yang
+bergantung pada video plan. Tanpa cache, prefix itu dikirim ulang
+sebagai input token di setiap request. Modul ini membuat prefix
+statis tersebut cukup diunggah sekali per model.
+
+Mode (PROMPT_PREFIX_CACHE):
+    off     -> prefix dikirim inline di depan bagian dinamis (default).
+               Teksnya identik byte-per-byte dan selalu di depan, jadi
+               implicit caching Gemini 2.5 tetap bisa kena.
+    gemini  -> prefix dibuat sekali sebagai CachedContent (explicit
+               caching); request hanya membawa bagian dinamis +
+               cached_content=<nama cache>.
+    mock    -> provider lokal untuk dev / test tanpa API: registrasi,
+               TTL, hit/miss dan metrics sama seperti gemini, tetapi
+               prefix tetap dikirim inline.
+
+Nama cache disimpan di local_store ("prompt_cache"), jadi semua worker
+di satu host memakai CachedContent yang sama sampai TTL-nya habis.
+Cache respons LLM (llm_cache) selalu memakai bentuk inline sebagai key,
+jadi mengganti mode tidak mengosongkan cache respons.
+"""
+
+import asyncio
+import hashlib
+import os
+import re
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from langchain_core.messages import HumanMessage
+
+from MAIN.AI import metrics
+from MAIN.AI.local_store import connect
+
+PROMPT_CACHE_OFF = "off"
+PROMPT_CACHE_GEMINI = "gemini"
+PROMPT_CACHE_MOCK = "mock"
+
+PROMPT_PREFIX_CACHE = os.getenv("PROMPT_PREFIX_CACHE", PROMPT_CACHE_OFF).strip().lower()
+PROMPT_CACHE_TTL_SECONDS = int(os.getenv("PROMPT_CACHE_TTL_MINUTES", "60")) * 60
+# Jangan pakai cache yang akan habis di tengah request
+PROMPT_CACHE_EXPIRY_MARGIN_SECONDS = 120
+# Setelah gagal membuat cache (mis. kuota / prefix terlalu pendek), tunggu sebelum mencoba lagi
+PROMPT_CACHE_RETRY_SECONDS = int(os.getenv("PROMPT_CACHE_RETRY_SECONDS", "600"))
+
+_CACHE_ERROR_PATTERN = re.compile(r"cached.?content", re.IGNORECASE)
+
+
+class PromptPrefix:
+    """Prefix prompt statis (dibuat sekali saat import) yang bisa di-cache provider."""
+
+    def __init__(self, name: str, text: str):
+        self.name = name
+        self.text = text
+        self.sha = hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+
+    def __repr__(self):
+        return f"PromptPrefix({self.name!r}, {len(self.text)} chars, sha={self.sha})"
+
+
+def inline_messages(prefix: PromptPrefix, messages):
+    """Bentuk inline: teks prefix digabung di depan pesan human pertama."""
+    if isinstance(messages, str):
+        return [HumanMessage(content=prefix.text + messages)]
+    messages = list(messages)
+    for i, message in enumerate(messages):
+        if isinstance(message, HumanMessage) and isinstance(message.content, str):
+            messages[i] = HumanMessage(content=prefix.text + message.content)
+            return messages
+    return [HumanMessage(content=prefix.text)] + messages
+
+
+def _as_messages(messages) -> List:
+    return [HumanMessage(content=messages)] if isinstance(messages, str) else list(messages)
+
+
+def _model_name(llm) -> str:
+    model = getattr(llm, "model", None) or ""
+    return model if model.startswith("models/") else f"models/{model}"
+
+
+def _api_key(llm) -> Optional[str]:
+    key = getattr(llm, "google_api_key", None)
+    if key is not None and hasattr(key, "get_secret_value"):
+        key = key.get_secret_value()
+    return key or os.getenv("GOOGLE_API_KEY")
+
+
+class _Registry:
+    """(provider, model, sha prefix) -> nama cache + waktu kedaluwarsa, di memori dan di disk."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._memory: Dict[Tuple[str, str, str], Tuple[str, float]] = {}
+        self._failed_until: Dict[Tuple[str, str, str], float] = {}
+
+    def _conn(self):
+        conn = connect("prompt_cache")
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS prompt_cache (
+                provider TEXT NOT NULL,
+                model TEXT NOT NULL,
+                prefix_sha TEXT NOT NULL,
+                cache_name TEXT NOT NULL,
+                expires_at REAL NOT NULL,
+                created_at REAL NOT NULL,
+                PRIMARY KEY (provider, model, prefix_sha)
+            )
+            """
+        )
+        return conn
+
+    def get(self, key) -> Optional[str]:
+        usable_after = time.time() + PROMPT_CACHE_EXPIRY_MARGIN_SECONDS
+        with self._lock:
+            entry = self._memory.get(key)
+        if entry and entry[1] > usable_after:
+            return entry[0]
+        try:
+            row = self._conn().execute(
+                "SELECT cache_name, expires_at FROM prompt_cache WHERE provider = ? AND model = ? AND prefix_sha = ?",
+                key,
+            ).fetchone()
+        except Exception as e:
+            print(f"[PROMPT CACHE] lookup failed: {e}")
+            return None
+        if row and row["expires_at"] > usable_after:
+            with self._lock:
+                self._memory[key] = (row["cache_name"], row["expires_at"])
+            return row["cache_name"]
+        return None
+
+    def put(self, key, cache_name: str, expires_at: float) -> None:
+        with self._lock:
+            self._memory[key] = (cache_name, expires_at)
+            self._failed_until.pop(key, None)
+        try:
+            self._conn().execute(
+                """
+                INSERT OR REPLACE INTO prompt_cache
+                    (provider, model, prefix_sha, cache_name, expires_at, created_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                """,
+                (*key, cache_name, expires_at, time.time()),
+            )
+        except Exception as e:
+            print(f"[PROMPT CACHE] store failed: {e}")
+
+    def forget(self, key) -> None:
+        with self._lock:
+            self._memory.pop(key, None)
+        try:
+            self._conn().execute(
+                "DELETE FROM prompt_cache WHERE provider = ? AND model = ? AND prefix_sha = ?", key
+            )
+        except Exception as e:
+            print(f"[PROMPT CACHE] delete failed: {e}")
+
+    def mark_failed(self, key) -> None:
+        with self._lock:
+            self._failed_until[key] = time.time() + PROMPT_CACHE_RETRY_SECONDS
+
+    def failed_recently(self, key) -> bool:
+        with self._lock:
+            return self._failed_until.get(key, 0.0) > time.time()
+
+
+class PromptCacheProvider:
+    """Dasar provider: create() mengunggah prefix dan mengembalikan (nama cache, expires_at)."""
+
+    name = PROMPT_CACHE_OFF
+    # True = provider tidak benar-benar dikenal LLM; prefix tetap dikirim inline
+    inline = False
+
+    def __init__(self, registry: _Registry):
+        self.registry = registry
+        self._create_lock = threading.Lock()
+
+    def create(self, llm, prefix: PromptPrefix) -> Tuple[str, float]:
+        raise NotImplementedError
+
+    def cache_name(self, llm, prefix: PromptPrefix) -> Optional[str]:
+        """Nama cache untuk prefix di model ini (dibuat jika belum ada); None = kirim inline."""
+        key = (self.name, _model_name(llm), prefix.sha)
+        cache_name = self.registry.get(key)
+        if cache_name:
+            metrics.incr("prompt_cache.hit")
+            metrics.incr("prompt_cache.cached_chars", len(prefix.text))
+            return cache_name
+        if self.registry.failed_recently(key):
+            metrics.incr("prompt_cache.inline")
+            return None
+
+        with self._create_lock:
+            # Thread lain mungkin baru saja membuatnya
+            cache_name = self.registry.get(key)
+            if cache_name is None:
+                started = time.monotonic()
+                try:
+                    cache_name, expires_at = self.create(llm, prefix)
+                except Exception as e:
+                    print(f"[PROMPT CACHE] ⚠️ Could not cache {prefix.name} for {key[1]}: {e}")
+                    metrics.incr("prompt_cache.create_failed")
+                    self.registry.mark_failed(key)
+                    return None
+                self.registry.put(key, cache_name, expires_at)
+                metrics.incr("prompt_cache.created")
+                metrics.observe("prompt_cache.create_seconds", time.monotonic() - started)
+                print(f"[PROMPT CACHE] Cached {prefix.name} ({len(prefix.text)} chars) for {key[1]} as {cache_name}")
+            else:
+                metrics.incr("prompt_cache.hit")
+        metrics.incr("prompt_cache.cached_chars", len(prefix.text))
+        return cache_name
+
+    def invalidate(self, llm, prefix: PromptPrefix) -> None:
+        self.registry.forget((self.name, _model_name(llm), prefix.sha))
+        metrics.incr("prompt_cache.invalidated")
+
+
+class GeminiPromptCache(PromptCacheProvider):
+    """Explicit context caching Gemini (CachedContent lewat CacheService)."""
+
+    name = PROMPT_CACHE_GEMINI
+
+    def create(self, llm, prefix: PromptPrefix) -> Tuple[str, float]:
+        from google.ai.generativelanguage_v1beta import CacheServiceClient, CachedContent, Content, Part
+        from google.api_core.client_options import ClientOptions
+        from google.protobuf import duration_pb2
+
+        client = CacheServiceClient(client_options=ClientOptions(api_key=_api_key(llm)))
+        cached = client.create_cached_content(
+            cached_content=CachedContent(
+                model=_model_name(llm),
+                display_name=f"learnvidai-{prefix.name}-{prefix.sha}",
+                contents=[Content(role="user", parts=[Part(text=prefix.text)])],
+                ttl=duration_pb2.Duration(seconds=PROMPT_CACHE_TTL_SECONDS),
+            )
+        )
+        # Pakai TTL lokal: expire_time dari server bisa berbeda zona / presisi
+        return cached.name, time.time() + PROMPT_CACHE_TTL_SECONDS
+
+
+class MockPromptCache(PromptCacheProvider):
+    """Provider lokal: meniru siklus hidup cache tanpa memanggil API."""
+
+    name = PROMPT_CACHE_MOCK
+    inline = True
+
+    def create(self, llm, prefix: PromptPrefix) -> Tuple[str, float]:
+        return f"cachedContents/mock-{prefix.sha}", time.time() + PROMPT_CACHE_TTL_SECONDS
+
+
+_PROVIDERS = {
+    PROMPT_CACHE_GEMINI: GeminiPromptCache,
+    PROMPT_CACHE_MOCK: MockPromptCache,
+}
+_provider: Optional[PromptCacheProvider] = None
+_provider_lock = threading.Lock()
+
+
+def get_provider() -> Optional[PromptCacheProvider]:
+    """Provider sesuai PROMPT_PREFIX_CACHE (None = off / mode tidak dikenal)."""
+    global _provider
+    factory = _PROVIDERS.get(PROMPT_PREFIX_CACHE)
+    if factory is None:
+        return None
+    with _provider_lock:
+        if _provider is None:
+            _provider = factory(_Registry())
+        return _provider
+
+
+def resolve(llm, prefix: PromptPrefix, messages) -> Tuple[List, Optional[str]]:
+    """
+    (pesan yang dikirim, cached_content) untuk prefix + bagian dinamis.
+
+    cached_content None berarti prefix dikirim inline.
+    """
+    provider = get_provider()
+    cache_name = provider.cache_name(llm, prefix) if provider else None
+    if cache_name is None or provider.inline:
+        return inline_messages(prefix, messages), None
+    return _as_messages(messages), cache_name
+
+
+async def aresolve(llm, prefix: PromptPrefix, messages) -> Tuple[List, Optional[str]]:
+    """Versi async dari resolve (pembuatan cache berjalan di thread pool)."""
+    if get_provider() is None:
+        return inline_messages(prefix, messages), None
+    return await asyncio.to_thread(resolve, llm, prefix, messages)
+
+
+def invalidate(llm, prefix: PromptPrefix) -> None:
+    provider = get_provider()
+    if provider is not None:
+        provider.invalidate(llm, prefix)
+
+
+def is_cache_error(error: BaseException) -> bool:
+    """Error karena CachedContent sudah hilang / kedaluwarsa di sisi provider."""
+    return bool(_CACHE_ERROR_PATTERN.search(str(error)))
@@ -0,0 +1,479 @@
+"""
+Rate limiter bersama untuk request Gemini (semua proses di satu host).
+
+Setiap gunicorn / render worker punya client sendiri dengan retry
+sendiri. Saat banyak job masuk bersamaan, semuanya menembak kuota yang
+sama, kena 429, lalu retry dengan backoff masing-masing. Hasilnya retry
+storm. Modul ini membatasi request per menit (RPM) dan token per menit
+(TPM) per model lewat satu state bersama:
+
+    reserve  -> sebelum request: ambil 1 request + perkiraan token dari
+                token bucket model. Bucket boleh minus; pemanggil tidur
+                sampai saldonya cukup. Karena pengurangan dilakukan saat
+                antre, pemanggil dilayani urut kedatangan (FIFO) di semua
+                proses, tanpa polling.
+    settle   -> setelah respons: selisih token perkiraan vs usage_metadata
+                dikembalikan / ditagihkan ke bucket.
+    penalize -> saat 429: cooldown bersama untuk model itu dengan backoff
+                eksponensial + jitter (makin sering 429 beruntun, makin
+                lama), dan saldo bucket dinolkan supaya setelah cooldown
+                request berjalan sesuai laju, tidak serentak.
+
+Retry internal client (tenacity di langchain) dimatikan per panggilan;
+429 dan error 5xx di-retry di sini (LLM_RATE_LIMIT_RETRIES).
+
+Backend (LLM_RATE_LIMIT_BACKEND):
+    sqlite  -> local_store ("rate_limits"), dibagi semua proses (default)
+    memory  -> per proses (dev / test)
+    off     -> tanpa pembatasan dan tanpa retry tambahan
+
+Batas per model (GEMINI_RATE_LIMITS, "model=rpm/tpm,..."). Model yang
+tidak tercantum tidak dibatasi, tetapi tetap ikut cooldown 429.
+"""
+
+import asyncio
+import os
+import random
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from google.api_core.exceptions import ResourceExhausted, ServerError
+from langchain_core.messages.ai import add_usage
+
+from MAIN.AI import metrics
+from MAIN.AI.cancellation import raise_if_cancelled, remaining_seconds
+from MAIN.AI.local_store import connect
+
+RATE_LIMIT_SQLITE = "sqlite"
+RATE_LIMIT_MEMORY = "memory"
+RATE_LIMIT_OFF = "off"
+
+LLM_RATE_LIMIT_BACKEND = os.getenv("LLM_RATE_LIMIT_BACKEND", RATE_LIMIT_SQLITE).strip().lower()
+# Bucket boleh menampung kuota sebanyak ini detik (burst setelah idle)
+LLM_RATE_LIMIT_BURST_SECONDS = float(os.getenv("LLM_RATE_LIMIT_BURST_SECONDS", "10"))
+# Perkiraan token output per request sebelum usage aslinya diketahui
+LLM_RATE_LIMIT_OUTPUT_ESTIMATE = int(os.getenv("LLM_RATE_LIMIT_OUTPUT_ESTIMATE", "2048"))
+LLM_RATE_LIMIT_RETRIES = int(os.getenv("LLM_RATE_LIMIT_RETRIES", "4"))
+LLM_RATE_LIMIT_BACKOFF_SECONDS = float(os.getenv("LLM_RATE_LIMIT_BACKOFF_SECONDS", "2"))
+LLM_RATE_LIMIT_BACKOFF_MAX_SECONDS = float(os.getenv("LLM_RATE_LIMIT_BACKOFF_MAX_SECONDS", "60"))
+
+
+def _parse_limits(value: str) -> Dict[str, Tuple[float, float]]:
+    limits = {}
+    for item in value.split(","):
+        model, _, limit = item.partition("=")
+        rpm, _, tpm = limit.partition("/")
+        if model.strip() and rpm.strip():
+            limits[model.strip()] = (float(rpm), float(tpm or 0))
+    return limits
+
+
+# (RPM, TPM) per model; 0 = tanpa batas untuk dimensi itu
+GEMINI_RATE_LIMITS = _parse_limits(os.getenv(
+    "GEMINI_RATE_LIMITS",
+    "gemini-2.5-pro=150/2000000,gemini-2.5-flash=1000/1000000,gemini-2.5-flash-lite=4000/4000000",
+))
+
+
+def model_name(llm) -> str:
+    model = getattr(llm, "model", None) or ""
+    return model[len("models/"):] if model.startswith("models/") else model
+
+
+def estimate_tokens(messages) -> int:
+    """Perkiraan kasar token input (~4 karakter per token) + output."""
+    if isinstance(messages, str):
+        chars = len(messages)
+    else:
+        chars = sum(len(m.content) if isinstance(m.content, str) else len(str(m.content)) for m in messages)
+    return chars // 4 + LLM_RATE_LIMIT_OUTPUT_ESTIMATE
+
+
+def is_rate_limited(error: BaseException) -> bool:
+    return isinstance(error, ResourceExhausted) or "429" in str(error) or "RESOURCE_EXHAUSTED" in str(error)
+
+
+def _backoff(strikes: int) -> float:
+    """Backoff eksponensial dengan "equal jitter": separuh tetap, separuh acak."""
+    delay = min(LLM_RATE_LIMIT_BACKOFF_MAX_SECONDS, LLM_RATE_LIMIT_BACKOFF_SECONDS * 2 ** max(strikes - 1, 0))
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+def _refill(level: Optional[float], updated: float, per_minute: float, now: float) -> float:
+    rate = per_minute / 60.0
+    capacity = max(rate * LLM_RATE_LIMIT_BURST_SECONDS, 1.0)
+    if level is None:
+        return capacity
+    return min(capacity, level + rate * max(now - updated, 0.0))
+
+
+def _wait(level: float, per_minute: float) -> float:
+    return 0.0 if level >= 0 else -level / (per_minute / 60.0)
+
+
+class _Bucket:
+    """State satu model: saldo request & token, cooldown 429."""
+
+    def __init__(self, requests=None, tokens=None, updated=0.0, cooldown_until=0.0, strikes=0):
+        self.requests = requests
+        self.tokens = tokens
+        self.updated = updated
+        self.cooldown_until = cooldown_until
+        self.strikes = strikes
+
+    def reserve(self, limits: Tuple[float, float], requests: float, tokens: float, now: float) -> float:
+        """Kurangi saldo; kembalikan detik yang harus ditunggu pemanggil."""
+        rpm, tpm = limits
+        wait = max(self.cooldown_until - now, 0.0)
+        if rpm:
+            self.requests = _refill(self.requests, self.updated, rpm, now) - requests
+            wait = max(wait, _wait(self.requests, rpm))
+        if tpm:
+            self.tokens = _refill(self.tokens, self.updated, tpm, now) - tokens
+            wait = max(wait, _wait(self.tokens, tpm))
+        self.updated = now
+        return wait
+
+    def adjust(self, requests: float, tokens: float) -> None:
+        if self.requests is not None:
+            self.requests -= requests
+        if self.tokens is not None:
+            self.tokens -= tokens
+
+    def penalize(self, now: float) -> float:
+        self.strikes += 1
+        delay = _backoff(self.strikes)
+        self.cooldown_until = max(self.cooldown_until, now + delay)
+        # Setelah cooldown: lanjut sesuai laju, bukan burst (refill mulai dari akhir cooldown)
+        if self.requests is not None:
+            self.requests = min(self.requests, 0.0)
+        if self.tokens is not None:
+            self.tokens = min(self.tokens, 0.0)
+        self.updated = max(self.updated, self.cooldown_until)
+        return delay
+
+
+class RateLimitBackend:
+    """Dasar backend: with_bucket(model, fn) menjalankan fn(bucket) secara atomik."""
+
+    name = RATE_LIMIT_OFF
+
+    def with_bucket(self, model: str, fn):
+        raise NotImplementedError
+
+    def reserve(self, model: str, requests: float, tokens: float) -> float:
+        limits = GEMINI_RATE_LIMITS.get(model, (0.0, 0.0))
+        return self.with_bucket(model, lambda bucket: bucket.reserve(limits, requests, tokens, time.time()))
+
+    def adjust(self, model: str, requests: float, tokens: float, success: bool = False) -> None:
+        def _adjust(bucket):
+            bucket.adjust(requests, tokens)
+            if success:
+                bucket.strikes = 0
+
+        self.with_bucket(model, _adjust)
+
+    def penalize(self, model: str) -> float:
+        return self.with_bucket(model, lambda bucket: bucket.penalize(time.time()))
+
+
+class MemoryRateLimitBackend(RateLimitBackend):
+    name = RATE_LIMIT_MEMORY
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._buckets: Dict[str, _Bucket] = {}
+
+    def with_bucket(self, model, fn):
+        with self._lock:
+            return fn(self._buckets.setdefault(model, _Bucket()))
+
+
+class SQLiteRateLimitBackend(RateLimitBackend):
+    name = RATE_LIMIT_SQLITE
+
+    _COLUMNS = ("requests", "tokens", "updated", "cooldown_until", "strikes")
+
+    def _conn(self):
+        conn = connect("rate_limits")
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS buckets (
+                model TEXT PRIMARY KEY,
+                requests REAL,
+                tokens REAL,
+                updated REAL NOT NULL,
+                cooldown_until REAL NOT NULL,
+                strikes INTEGER NOT NULL
+            )
+            """
+        )
+        return conn
+
+    def with_bucket(self, model, fn):
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT requests, tokens, updated, cooldown_until, strikes FROM buckets WHERE model = ?", (model,)
+            ).fetchone()
+            bucket = _Bucket(**dict(row)) if row else _Bucket()
+            result = fn(bucket)
+            conn.execute(
+                "INSERT OR REPLACE INTO buckets (model, requests, tokens, updated, cooldown_until, strikes) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (model, *(getattr(bucket, column) for column in self._COLUMNS)),
+            )
+            conn.execute("COMMIT")
+            return result
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+
+_BACKENDS = {
+    RATE_LIMIT_SQLITE: SQLiteRateLimitBackend,
+    RATE_LIMIT_MEMORY: MemoryRateLimitBackend,
+}
+_backend: Optional[RateLimitBackend] = None
+_backend_lock = threading.Lock()
+
+
+def get_backend() -> Optional[RateLimitBackend]:
+    """Backend sesuai LLM_RATE_LIMIT_BACKEND (None = off / tidak dikenal)."""
+    global _backend
+    factory = _BACKENDS.get(LLM_RATE_LIMIT_BACKEND)
+    if factory is None:
+        return None
+    with _backend_lock:
+        if _backend is None:
+            _backend = factory()
+        return _backend
+
+
+def enabled() -> bool:
+    return get_backend() is not None
+
+
+class Reservation:
+    """Satu slot request yang sudah diambil dari bucket model."""
+
+    def __init__(self, backend: RateLimitBackend, model: str, tokens: int, wait: float):
+        self.backend = backend
+        self.model = model
+        self.tokens = tokens
+        self.wait = wait
+
+    def settle(self, usage_metadata) -> None:
+        """Koreksi perkiraan token dengan usage_metadata respons (dan reset hitungan 429)."""
+        actual = self.tokens
+        if usage_metadata:
+            actual = int(usage_metadata.get("input_tokens") or 0) + int(usage_metadata.get("output_tokens") or 0)
+        self._adjust(0, actual - self.tokens, success=True)
+
+    def release(self) -> None:
+        """Request tidak jadi / ditolak sebelum diproses: kembalikan slot dan tokennya."""
+        self._adjust(-1, -self.tokens)
+
+    def _adjust(self, requests, tokens, success=False) -> None:
+        try:
+            self.backend.adjust(self.model, requests, tokens, success)
+        except Exception as e:
+            print(f"[RATE LIMIT] Failed to update bucket for {self.model}: {e}")
+
+
+def _reserve(llm, messages) -> Optional[Reservation]:
+    backend = get_backend()
+    if backend is None:
+        return None
+    model = model_name(llm)
+    tokens = estimate_tokens(messages)
+    try:
+        wait = backend.reserve(model, 1, tokens)
+    except Exception as e:
+        # State bersama rusak / terkunci terlalu lama: jangan blokir request
+        print(f"[RATE LIMIT] Reservation failed for {model}: {e}")
+        return None
+    if wait > 0:
+        metrics.incr("llm.rate_limit.queued")
+        metrics.observe("llm.rate_limit.wait_seconds", wait)
+        print(f"[RATE LIMIT] {model}: waiting {wait:.1f}s for quota")
+    return Reservation(backend, model, tokens, wait)
+
+
+def _sleep_slices(wait: float):
+    """Potongan tidur (maks 1 detik) supaya pembatalan / deadline tetap terasa."""
+    deadline = time.monotonic() + wait
+    while True:
+        raise_if_cancelled()
+        left = deadline - time.monotonic()
+        if left <= 0:
+            return
+        yield min(left, 1.0)
+
+
+def acquire(llm, messages) -> Optional[Reservation]:
+    """Tunggu giliran untuk satu request (None = rate limit off)."""
+    reservation = _reserve(llm, messages)
+    if reservation is None:
+        return None
+    try:
+        for seconds in _sleep_slices(reservation.wait):
+            time.sleep(seconds)
+    except BaseException:
+        reservation.release()
+        raise
+    return reservation
+
+
+async def aacquire(llm, messages) -> Optional[Reservation]:
+    """Versi async dari acquire (state bersama dibaca di thread pool)."""
+    if not enabled():
+        return None
+    reservation = await asyncio.to_thread(_reserve, llm, messages)
+    if reservation is None:
+        return None
+    try:
+        for seconds in _sleep_slices(reservation.wait):
+            await asyncio.sleep(seconds)
+    except BaseException:
+        await asyncio.to_thread(reservation.release)
+        raise
+    return reservation
+
+
+def retry_delay(reservation: Optional[Reservation], error: Exception, attempt: int) -> Optional[float]:
+    """
+    Detik sebelum mencoba lagi setelah `error`, atau None jika tidak di-retry.
+
+    429 memasang cooldown bersama (semua proses ikut menunggu); error 5xx
+    hanya backoff lokal.
+    """
+    if reservation is None or attempt >= LLM_RATE_LIMIT_RETRIES:
+        return None
+    if is_rate_limited(error):
+        reservation.release()
+        metrics.incr("llm.rate_limit.throttled")
+        try:
+            delay = reservation.backend.penalize(reservation.model)
+        except Exception as e:
+            print(f"[RATE LIMIT] Failed to record 429 for {reservation.model}: {e}")
+            delay = _backoff(attempt + 1)
+        print(f"[RATE LIMIT] {reservation.model} returned 429, backing off {delay:.1f}s (all workers)")
+        return delay
+    if isinstance(error, ServerError):
+        reservation.release()
+        metrics.incr("llm.rate_limit.server_errors")
+        delay = _backoff(attempt + 1)
+        print(f"[RATE LIMIT] {reservation.model} server error ({error}), retrying in {delay:.1f}s")
+        return delay
+    return None
+
+
+def request_kwargs() -> dict:
+    """Kwargs invoke/stream: retry internal client dimatikan selama limiter aktif."""
+    return {"max_retries": 1} if enabled() else {}
+
+
+def _give_up(delay: Optional[float]) -> bool:
+    remaining = remaining_seconds()
+    return delay is None or (remaining is not None and remaining <= delay)
+
+
+def call(llm, messages, invoke):
+    """
+    invoke(**kwargs) lewat limiter: tunggu kuota, retry 429 / 5xx, lalu
+    koreksi perkiraan token dengan usage respons.
+    """
+    attempt = 0
+    while True:
+        reservation = acquire(llm, messages)
+        try:
+            response = invoke(**request_kwargs())
+        except Exception as e:
+            delay = retry_delay(reservation, e, attempt)
+            if _give_up(delay):
+                raise
+            for seconds in _sleep_slices(delay):
+                time.sleep(seconds)
+            attempt += 1
+            continue
+        if reservation is not None:
+            reservation.settle(getattr(response, "usage_metadata", None))
+        return response
+
+
+async def acall(llm, messages, ainvoke):
+    """Versi async dari call (ainvoke mengembalikan coroutine)."""
+    attempt = 0
+    while True:
+        reservation = await aacquire(llm, messages)
+        try:
+            response = await ainvoke(**request_kwargs())
+        except Exception as e:
+            delay = await asyncio.to_thread(retry_delay, reservation, e, attempt)
+            if _give_up(delay):
+                raise
+            for seconds in _sleep_slices(delay):
+                await asyncio.sleep(seconds)
+            attempt += 1
+            continue
+        if reservation is not None:
+            await asyncio.to_thread(reservation.settle, getattr(response, "usage_metadata", None))
+        return response
+
+
+def stream(llm, messages, open_stream):
+    """
+    Chunk dari open_stream(**kwargs) lewat limiter. Retry hanya jika error
+    terjadi sebelum chunk pertama (teks yang sudah terkirim tidak bisa ditarik).
+    """
+    attempt = 0
+    while True:
+        reservation = acquire(llm, messages)
+        usage = None
+        started = False
+        try:
+            for chunk in open_stream(**request_kwargs()):
+                started = True
+                if chunk.usage_metadata:
+                    usage = add_usage(usage, chunk.usage_metadata)
+                yield chunk
+        except Exception as e:
+            delay = None if started else retry_delay(reservation, e, attempt)
+            if _give_up(delay):
+                raise
+            for seconds in _sleep_slices(delay):
+                time.sleep(seconds)
+            attempt += 1
+            continue
+        if reservation is not None:
+            reservation.settle(usage)
+        return
+
+
+async def astream(llm, messages, open_stream):
+    """Versi async dari stream (open_stream mengembalikan async iterator)."""
+    attempt = 0
+    while True:
+        reservation = await aacquire(llm, messages)
+        usage = None
+        started = False
+        try:
+            async for chunk in open_stream(**request_kwargs()):
+                started = True
+                if chunk.usage_metadata:
+                    usage = add_usage(usage, chunk.usage_metadata)
+                yield chunk
+        except Exception as e:
+            delay = None if started else await asyncio.to_thread(retry_delay, reservation, e, attempt)
+            if _give_up(delay):
+                raise
+            for seconds in _sleep_slices(delay):
+                await asyncio.sleep(seconds)
+            attempt += 1
+            continue
+        if reservation is not None:
+            await asyncio.to_thread(reservation.settle, usage)
+        return
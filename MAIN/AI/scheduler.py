@@ -0,0 +1,63 @@
+"""
+Estimasi biaya render dan prioritas antrian (shortest-expected-first + aging).
+
+Biaya dihitung dari video plan (stage 1) dan, bila ada, kode Manim:
+durasi video, jumlah langkah, scene 3D dan banyaknya MathTex/Tex sangat
+menentukan lama render. Job yang menunggu lama mendapat bonus (aging)
+supaya video besar tidak kelaparan.
+"""
+
+import json
+import os
+import re
+from typing import Optional
+
+# Detik biaya render yang "dihapus" untuk setiap detik job menunggu
+SCHEDULER_AGING_FACTOR = float(os.getenv("SCHEDULER_AGING_FACTOR", "0.5"))
+# Biaya untuk job yang belum punya plan (hanya tahap LLM yang murah)
+SCHEDULER_UNPLANNED_COST = float(os.getenv("SCHEDULER_UNPLANNED_COST", "60"))
+
+_BASE_SECONDS = 20.0
+_SECONDS_PER_VIDEO_SECOND = 0.8
+_SECONDS_PER_STEP = 6.0
+_SECONDS_PER_TEX = 1.5
+_THREE_D_MULTIPLIER = 2.5
+
+
+def estimate_job_cost(video_plan: Optional[dict], manim_code: Optional[str] = None) -> float:
+    """
+    Perkiraan detik render (trial + final) untuk satu job.
+
+    Args:
+        video_plan (dict): hasil generate_complete_video_plan
+        manim_code (str): kode hasil ManIMCodeGenerator (opsional)
+
+    Returns:
+        float: estimasi biaya dalam detik
+    """
+    video_plan = video_plan or {}
+    breakdown = video_plan.get("educational_breakdown") or {}
+    structure = video_plan.get("manim_structure") or {}
+
+    duration = breakdown.get("metadata", {}).get("estimated_total_duration") or 180
+    try:
+        duration = float(duration)
+    except (TypeError, ValueError):
+        duration = 180.0
+    steps = len(breakdown.get("educational_steps", [])) or len(structure.get("animation_steps", []))
+
+    cost = _BASE_SECONDS + duration * _SECONDS_PER_VIDEO_SECOND + steps * _SECONDS_PER_STEP
+
+    scene_text = json.dumps(structure, default=str) + (manim_code or "")
+    if manim_code:
+        cost += len(re.findall(r"\b(?:MathTex|Tex)\(", manim_code)) * _SECONDS_PER_TEX
+    if "ThreeDScene" in scene_text or "ThreeDAxes" in scene_text:
+        cost *= _THREE_D_MULTIPLIER
+
+    return round(cost, 1)
+
+
+def priority_score(estimated_cost: Optional[float], waited_seconds: float) -> float:
+    """Skor antrian: makin kecil makin dulu diambil."""
+    cost = SCHEDULER_UNPLANNED_COST if estimated_cost is None else estimated_cost
+    return cost - SCHEDULER_AGING_FACTOR * max(0.0, waited_seconds)
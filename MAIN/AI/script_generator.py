@@ -1,4 +1,3 @@
-import os
 import re
 import json
 import logging
@@ -6,7 +5,10 @@ from dotenv import load_dotenv
 from collections import deque
 from langchain_core.prompts import ChatPromptTemplate, HumanMessagePromptTemplate, MessagesPlaceholder
 from langchain_core.messages import SystemMessage, HumanMessage, AIMessage
-from langchain_google_genai import ChatGoogleGenerativeAI
+from pydantic import ValidationError
+from MAIN.AI.json_stream import StreamingArrayParser
+from MAIN.AI.llm_clients import ainvoke_llm, astream_llm, get_chat_model, invoke_llm, stream_llm
+from MAIN.AI.plan_schema import EducationalBreakdown, EducationalStep, ManimStructure, parse_plan, response_schema
 
 # Basic logging configuration
 logging.basicConfig(level=logging.INFO)
@@ -18,14 +20,16 @@ load_dotenv('.env')
 #  Custom lightweight ConversationChain replacement
 # ==========================================================
 class ConversationChainLite:
-    def __init__(self, llm, prompt=None, memory=None, input_key="human_input", verbose=False):
+    def __init__(self, llm, prompt=None, memory=None, input_key="human_input", verbose=False, response_schema=None):
         self.llm = llm
         self.prompt = prompt
         self.verbose = verbose
         self.input_key = input_key
-        self.memory = memory or deque(maxlen=5)
+        self.memory = memory if memory is not None else deque(maxlen=5)
+        # JSON schema output (plan_schema.response_schema); None = teks bebas
+        self.response_schema = response_schema
 
-    def predict(self, **kwargs):
+    def _build_messages(self, **kwargs):
         human_input = kwargs.get(self.input_key, "")
         chat_history = list(self.memory)
 
@@ -40,28 +44,73 @@ class ConversationChainLite:
 
         if self.verbose:
             print("🧩 Prompt Messages:", [m.content for m in messages])
+        return messages
 
-        response = self.llm.invoke(messages)
+    def _remember(self, response):
         text = getattr(response, "content", None) or getattr(response, "text", "")
         self.memory.append(AIMessage(content=text))
         return text
 
+    def predict(self, **kwargs):
+        response = invoke_llm(self.llm, self._build_messages(**kwargs), response_schema=self.response_schema)
+        return self._remember(response)
+
+    async def apredict(self, **kwargs):
+        response = await ainvoke_llm(self.llm, self._build_messages(**kwargs), response_schema=self.response_schema)
+        return self._remember(response)
+
+    def predict_streaming(self, on_text, **kwargs):
+        """Seperti predict, tetapi setiap potongan teks diteruskan ke on_text saat tiba."""
+        parts = []
+        for text in stream_llm(self.llm, self._build_messages(**kwargs), response_schema=self.response_schema):
+            parts.append(text)
+            on_text(text)
+        return self._remember(AIMessage(content="".join(parts)))
+
+    async def apredict_streaming(self, on_text, **kwargs):
+        """Versi async dari predict_streaming."""
+        parts = []
+        async for text in astream_llm(self.llm, self._build_messages(**kwargs), response_schema=self.response_schema):
+            parts.append(text)
+            on_text(text)
+        return self._remember(AIMessage(content="".join(parts)))
+
+
+def classify_domain(topic):
+    """Classify the scientific domain of the topic."""
+    topic_lower = topic.lower()
+    
+    if any(word in topic_lower for word in ['force', 'motion', 'energy', 'wave', 'light', 'sound', 'electricity', 'magnetic', 'doppler', 'relativity']):
+        return "Physics"
+    elif any(word in topic_lower for word in ['reaction', 'molecule', 'atom', 'bond', 'compound', 'element', 'acid', 'base']):
+        return "Chemistry"  
+    elif any(word in topic_lower for word in ['cell', 'DNA', 'evolution', 'organism', 'gene', 'protein', 'enzyme']):
+        return "Biology"
+    elif any(word in topic_lower for word in ['equation', 'theorem', 'function', 'derivative', 'integral', 'geometry', 'algebra', 'calculus']):
+        return "Mathematics"
+    elif any(word in topic_lower for word in ['earth', 'planet', 'climate', 'weather', 'geology', 'atmosphere']):
+        return "Earth Science"
+    else:
+        return "General Science"
+
+
 # ==========================================================
 #  Main ScienceVideoGenerator class (adapted for LangChain 1.x)
 # ==========================================================
 class ScienceVideoGenerator:
-    def __init__(self, google_api_key):
+    def __init__(self, google_api_key, model="gemini-2.5-flash-lite"):
         self.google_api_key = google_api_key
+        self.model = model
         self.memory = deque(maxlen=5)
+        # True jika respons stage 1 terakhir ter-parse (bukan fallback); dipakai model_router
+        self.stage1_parsed = False
 
-        self.google_chat = ChatGoogleGenerativeAI(
-            # model="gemini-2.5-pro",
-            model="gemini-2.5-flash-lite",
-            google_api_key=self.google_api_key,
+        # Client dipinjam dari registry bersama (tanpa koneksi baru per request)
+        self.google_chat = get_chat_model(
+            model,
             temperature=0.5,
-            max_output_tokens=None,
-            timeout=None,
-            max_retries=2
+            max_retries=2,
+            google_api_key=self.google_api_key,
         )
 
         # Prompts
@@ -74,9 +123,10 @@ class ScienceVideoGenerator:
             prompt=self.stage1_prompt,
             verbose=True,
             memory=self.memory,
-            input_key="human_input"
+            input_key="human_input",
+            response_schema=response_schema(EducationalBreakdown),
         )
-    def generate_educational_breakdown(self, topic):
+    def generate_educational_breakdown(self, topic, on_step=None):
         """
         Enhanced Stage 1: Generate a comprehensive educational breakdown with detailed step-by-step analysis.
         
@@ -90,6 +140,9 @@ class ScienceVideoGenerator:
         
         Args:
             topic (str): User's science/math topic request.
+            on_step (callable, optional): on_step(index, step, title) dipanggil
+                untuk setiap educational step begitu selesai di-stream, sebelum
+                respons lengkap selesai.
             
         Returns:
             dict: Structured educational content with detailed breakdown.
@@ -99,34 +152,87 @@ class ScienceVideoGenerator:
         
         try:
             # Enhanced multi-step prompting for Stage 1
-            stage1_prompt = self._build_comprehensive_stage1_prompt(topic)
-            
-            print(f"🧠 Analyzing topic: '{topic}'...")
-            print("📋 Executing Step-by-Step Educational Breakdown:")
-            print("   Step 1: Topic Classification & Analysis")
-            print("   Step 2: Learning Objective Formulation") 
-            print("   Step 3: Content Structure Planning")
-            print("   Step 4: Visual Element Design")
-            print("   Step 5: Narration Script Development")
-            print("   Step 6: Assessment & Engagement Planning")
-            
-            response = self.stage1_conversation.predict(human_input=stage1_prompt)
-            
-            # Enhanced JSON parsing with multiple fallback strategies
-            educational_content = self._parse_stage1_response(response, topic)
-            
-            if educational_content:
-                print("✅ Stage 1 Educational Breakdown Complete!")
-                self._validate_educational_content(educational_content)
-                return educational_content
+            stage1_prompt = self._start_stage1(topic)
+            if on_step:
+                response = self.stage1_conversation.predict_streaming(
+                    self._step_listener(on_step), human_input=stage1_prompt
+                )
             else:
-                print("⚠️ Stage 1 parsing failed, using fallback structure")
-                return self._create_enhanced_fallback_structure(topic, response)
+                response = self.stage1_conversation.predict(human_input=stage1_prompt)
+            return self._finish_stage1(response, topic)
                     
         except Exception as e:
             print(f"❌ Error in Stage 1 processing: {e}")
             return self._create_enhanced_fallback_structure(topic, str(e))
 
+    async def agenerate_educational_breakdown(self, topic, on_step=None):
+        """Async version of generate_educational_breakdown (uses ainvoke / astream)."""
+        if not topic:
+            return {}
+
+        try:
+            stage1_prompt = self._start_stage1(topic)
+            if on_step:
+                response = await self.stage1_conversation.apredict_streaming(
+                    self._step_listener(on_step), human_input=stage1_prompt
+                )
+            else:
+                response = await self.stage1_conversation.apredict(human_input=stage1_prompt)
+            return self._finish_stage1(response, topic)
+
+        except Exception as e:
+            print(f"❌ Error in Stage 1 processing: {e}")
+            return self._create_enhanced_fallback_structure(topic, str(e))
+
+    @staticmethod
+    def _step_listener(on_step):
+        """Umpan potongan stream ke parser inkremental; panggil on_step per langkah yang selesai."""
+        parser = StreamingArrayParser("educational_steps")
+
+        def _on_text(text):
+            for step in parser.feed(text):
+                index = len(parser.items)
+                # Bentuk sama dengan langkah di plan final (parse_plan -> model_dump),
+                # supaya prompt draft per langkah cocok dengan prompt dari plan final
+                try:
+                    step = EducationalStep.model_validate(step).model_dump()
+                except ValidationError as e:
+                    print(f"⚠️ Streamed step {index} does not match the schema: {e.error_count()} error(s)")
+                    continue
+                print(f"   ✓ Step {index} streamed: {step.get('step_title', '')}")
+                try:
+                    on_step(index, step, parser.string_field("title"))
+                except Exception as e:
+                    print(f"⚠️ on_step callback failed for step {index}: {e}")
+
+        return _on_text
+
+    def _start_stage1(self, topic):
+        stage1_prompt = self._build_comprehensive_stage1_prompt(topic)
+        
+        print(f"🧠 Analyzing topic: '{topic}'...")
+        print("📋 Executing Step-by-Step Educational Breakdown:")
+        print("   Step 1: Topic Classification & Analysis")
+        print("   Step 2: Learning Objective Formulation") 
+        print("   Step 3: Content Structure Planning")
+        print("   Step 4: Visual Element Design")
+        print("   Step 5: Narration Script Development")
+        print("   Step 6: Assessment & Engagement Planning")
+        return stage1_prompt
+
+    def _finish_stage1(self, response, topic):
+        # Enhanced JSON parsing with multiple fallback strategies
+        educational_content = self._parse_stage1_response(response, topic)
+        self.stage1_parsed = bool(educational_content)
+        
+        if educational_content:
+            print("✅ Stage 1 Educational Breakdown Complete!")
+            self._validate_educational_content(educational_content)
+            return educational_content
+        else:
+            print("⚠️ Stage 1 parsing failed, using fallback structure")
+            return self._create_enhanced_fallback_structure(topic, response)
+
     def _build_comprehensive_stage1_prompt(self, topic):
         """
         Build a detailed, step-by-step prompt for Stage 1 educational breakdown.
@@ -260,106 +366,16 @@ Begin your comprehensive 6-step analysis now:
 
     def _parse_stage1_response(self, response, topic):
         """
-        Enhanced parsing of Stage 1 response with multiple fallback strategies.
+        Parse the Stage 1 response (JSON constrained by the EducationalBreakdown schema).
         
         Args:
             response (str): LLM response from Stage 1
             topic (str): Original topic for context
             
         Returns:
-            dict: Parsed educational content or None if all parsing fails
-        """
-        # Strategy 1: Direct JSON parsing
-        try:
-            return json.loads(response)
-        except json.JSONDecodeError:
-            pass
-        
-        # Strategy 2: Extract JSON from code blocks
-        try:
-            import re
-            json_match = re.search(r'```json\s*(.*?)\s*```', response, re.DOTALL)
-            if json_match:
-                return json.loads(json_match.group(1))
-        except Exception:
-            pass
-        
-        # Strategy 3: Find JSON object in text
-        try:
-            json_match = re.search(r'\{.*\}', response, re.DOTALL)
-            if json_match:
-                json_str = json_match.group(0)
-                # Clean up common JSON issues
-                json_str = self._clean_json_string(json_str)
-                return json.loads(json_str)
-        except Exception:
-            pass
-        
-        # Strategy 4: Attempt to fix common JSON errors
-        try:
-            fixed_json = self._fix_common_json_errors(response)
-            if fixed_json:
-                return json.loads(fixed_json)
-        except Exception:
-            pass
-        
-        print("⚠️ All JSON parsing strategies failed")
-        return None
-
-    def _clean_json_string(self, json_str):
-        """
-        Clean common JSON formatting issues.
-        
-        Args:
-            json_str (str): Raw JSON string
-            
-        Returns:
-            str: Cleaned JSON string
-        """
-        import re
-        
-        # Remove trailing commas before closing brackets/braces
-        json_str = re.sub(r',(\s*[}\]])', r'\1', json_str)
-        
-        # Fix unescaped quotes in strings
-        json_str = re.sub(r'(?<!\\)"(?=.*")', r'\\"', json_str)
-        
-        # Remove comments
-        json_str = re.sub(r'//.*?\n', '\n', json_str)
-        json_str = re.sub(r'/\*.*?\*/', '', json_str, flags=re.DOTALL)
-        
-        return json_str
-
-    def _fix_common_json_errors(self, response):
-        """
-        Attempt to fix common JSON formatting errors in LLM responses.
-        
-        Args:
-            response (str): LLM response
-            
-        Returns:
-            str: Fixed JSON string or None
+            dict: Parsed educational content or None if it does not match the schema
         """
-        import re
-        
-        # Look for JSON-like structure
-        json_pattern = r'\{[^{}]*(?:\{[^{}]*\}[^{}]*)*\}'
-        matches = re.findall(json_pattern, response, re.DOTALL)
-        
-        for match in matches:
-            try:
-                # Try various fixes
-                fixed = match
-                fixed = re.sub(r',(\s*[}\]])', r'\1', fixed)  # Remove trailing commas
-                fixed = re.sub(r'(\w+):', r'"\1":', fixed)    # Quote unquoted keys
-                
-                # Test if it parses
-                json.loads(fixed)
-                return fixed
-            except:
-                continue
-        
-        return None
+        return parse_plan(EducationalBreakdown, response)
 
     def _validate_educational_content(self, content):
         """
@@ -595,20 +611,7 @@ Begin your comprehensive 6-step analysis now:
 
     def _classify_domain(self, topic):
         """Classify the scientific domain of the topic."""
-        topic_lower = topic.lower()
-        
-        if any(word in topic_lower for word in ['force', 'motion', 'energy', 'wave', 'light', 'sound', 'electricity', 'magnetic', 'doppler', 'relativity']):
-            return "Physics"
-        elif any(word in topic_lower for word in ['reaction', 'molecule', 'atom', 'bond', 'compound', 'element', 'acid', 'base']):
-            return "Chemistry"  
-        elif any(word in topic_lower for word in ['cell', 'DNA', 'evolution', 'organism', 'gene', 'protein', 'enzyme']):
-            return "Biology"
-        elif any(word in topic_lower for word in ['equation', 'theorem', 'function', 'derivative', 'integral', 'geometry', 'algebra', 'calculus']):
-            return "Mathematics"
-        elif any(word in topic_lower for word in ['earth', 'planet', 'climate', 'weather', 'geology', 'atmosphere']):
-            return "Earth Science"
-        else:
-            return "General Science"
+        return classify_domain(topic)
 
     def _generate_applications(self, topic):
         """Generate relevant applications for the topic."""
@@ -857,7 +860,7 @@ Begin your comprehensive 6-step analysis now:
         """
         return self.generate_scene_script(prompt)
 
-    def generate_complete_video_plan(self, topic):
+    def generate_complete_video_plan(self, topic, on_step=None):
         """
         Complete two-stage pipeline: Educational Breakdown + Manim Structure Generation.
         
@@ -867,6 +870,7 @@ Begin your comprehensive 6-step analysis now:
         
         Args:
             topic (str): User's science/math topic request.
+            on_step (callable, optional): lihat generate_educational_breakdown.
             
         Returns:
             dict: Complete video plan with both educational breakdown and Manim structure.
@@ -880,23 +884,50 @@ Begin your comprehensive 6-step analysis now:
         
         # Stage 1: Educational Breakdown
         print("🔄 STAGE 1: Educational Content Analysis")
-        educational_breakdown = self.generate_educational_breakdown(topic)
-        
+        educational_breakdown = self.generate_educational_breakdown(topic, on_step)
         if not educational_breakdown:
-            return {
-                "error": "Stage 1 failed - could not generate educational breakdown",
-                "topic": topic,
-                "educational_breakdown": None,
-                "manim_structure": None
-            }
+            return self._stage1_failed(topic)
         
+        # Stage 2: Manim Structure Generation
+        self._start_stage2()
+        manim_structure = self.generate_manim_structure(educational_breakdown)
+        return self._complete_video_plan(topic, educational_breakdown, manim_structure)
+
+    async def agenerate_complete_video_plan(self, topic, on_step=None):
+        """Async version of generate_complete_video_plan."""
+        if not topic:
+            return {"error": "No topic provided"}
+
+        print("🎬 Starting Complete Video Plan Generation...")
+        print(f"📚 Topic: '{topic}'")
+        print("=" * 60)
+
+        print("🔄 STAGE 1: Educational Content Analysis")
+        educational_breakdown = await self.agenerate_educational_breakdown(topic, on_step)
+        if not educational_breakdown:
+            return self._stage1_failed(topic)
+
+        self._start_stage2()
+        manim_structure = await self.agenerate_manim_structure(educational_breakdown)
+        return self._complete_video_plan(topic, educational_breakdown, manim_structure)
+
+    @staticmethod
+    def _stage1_failed(topic):
+        return {
+            "error": "Stage 1 failed - could not generate educational breakdown",
+            "topic": topic,
+            "educational_breakdown": None,
+            "manim_structure": None
+        }
+
+    @staticmethod
+    def _start_stage2():
         print("✅ Stage 1 Complete - Educational breakdown generated")
         print("=" * 60)
-        
-        # Stage 2: Manim Structure Generation
         print("🔄 STAGE 2: Manim Animation Planning")
-        manim_structure = self.generate_manim_structure(educational_breakdown)
-        
+
+    def _complete_video_plan(self, topic, educational_breakdown, manim_structure):
+        """Gabungkan hasil kedua stage menjadi video plan."""
         if not manim_structure:
             print("⚠️ Stage 2 failed - using educational breakdown only")
             return {
@@ -947,36 +978,54 @@ Begin your comprehensive 6-step analysis now:
             return None
         
         try:
-            # Create Stage 2 conversation chain
-            stage2_conversation = ConversationChain(
-                llm=self.google_chat,
-                prompt=self.stage2_prompt,
-                verbose=True,
-                memory=ConversationBufferWindowMemory(k=3, memory_key="chat_history", return_messages=True),
-                input_key="human_input",
-            )
-            
-            # Build Stage 2 prompt
-            stage2_prompt = self._build_stage2_prompt(educational_breakdown)
-            
             print("🎨 Converting educational content to Manim animations...")
-            response = stage2_conversation.predict(human_input=stage2_prompt)
-            
-            # Parse Stage 2 response
-            manim_structure = self._parse_stage2_response(response, educational_breakdown)
-            
-            if manim_structure:
-                print("✅ Manim structure generation successful!")
-                self._validate_manim_structure(manim_structure)
-                return manim_structure
-            else:
-                print("⚠️ Stage 2 parsing failed, generating fallback structure")
-                return self._create_manim_fallback_structure(educational_breakdown)
+            response = self._stage2_conversation().predict(
+                human_input=self._build_stage2_prompt(educational_breakdown)
+            )
+            return self._finish_stage2(response, educational_breakdown)
                 
         except Exception as e:
             print(f"❌ Error in Stage 2 processing: {e}")
             return self._create_manim_fallback_structure(educational_breakdown)
 
+    async def agenerate_manim_structure(self, educational_breakdown):
+        """Async version of generate_manim_structure."""
+        if not educational_breakdown:
+            return None
+
+        try:
+            print("🎨 Converting educational content to Manim animations...")
+            response = await self._stage2_conversation().apredict(
+                human_input=self._build_stage2_prompt(educational_breakdown)
+            )
+            return self._finish_stage2(response, educational_breakdown)
+
+        except Exception as e:
+            print(f"❌ Error in Stage 2 processing: {e}")
+            return self._create_manim_fallback_structure(educational_breakdown)
+
+    def _stage2_conversation(self):
+        # Stage 2 conversation (own short history, JSON constrained by ManimStructure)
+        return ConversationChainLite(
+            llm=self.google_chat,
+            prompt=self.stage2_prompt,
+            verbose=True,
+            memory=deque(maxlen=3),
+            input_key="human_input",
+            response_schema=response_schema(ManimStructure),
+        )
+
+    def _finish_stage2(self, response, educational_breakdown):
+        manim_structure = self._parse_stage2_response(response, educational_breakdown)
+        
+        if manim_structure:
+            print("✅ Manim structure generation successful!")
+            self._validate_manim_structure(manim_structure)
+            return manim_structure
+        else:
+            print("⚠️ Stage 2 parsing failed, generating fallback structure")
+            return self._create_manim_fallback_structure(educational_breakdown)
+
     def _build_stage2_prompt(self, educational_breakdown):
         """
         Build the prompt for Stage 2 Manim structure generation.
@@ -1067,7 +1116,7 @@ Begin the Manim structure generation now:
 
     def _parse_stage2_response(self, response, educational_breakdown):
         """
-        Parse the Stage 2 response to extract Manim structure.
+        Parse the Stage 2 response (JSON constrained by the ManimStructure schema).
         
         Args:
             response (str): LLM response from Stage 2
@@ -1076,32 +1125,7 @@ Begin the Manim structure generation now:
         Returns:
             dict: Parsed Manim structure or None
         """
-        # Try the same parsing strategies as Stage 1
-        try:
-            return json.loads(response)
-        except json.JSONDecodeError:
-            pass
-        
-        # Extract JSON from code blocks
-        try:
-            import re
-            json_match = re.search(r'```json\s*(.*?)\s*```', response, re.DOTALL)
-            if json_match:
-                return json.loads(json_match.group(1))
-        except Exception:
-            pass
-        
-        # Find JSON object in text
-        try:
-            json_match = re.search(r'\{.*\}', response, re.DOTALL)
-            if json_match:
-                json_str = self._clean_json_string(json_match.group(0))
-                return json.loads(json_str)
-        except Exception:
-            pass
-        
-        print("⚠️ Stage 2 JSON parsing failed")
-        return None
+        return parse_plan(ManimStructure, response)
 
     def _validate_manim_structure(self, manim_structure):
         """
@@ -1194,12 +1218,3 @@ Begin the Manim structure generation now:
                 "complexity_level": "intermediate"
             }
         }
-        
-
-GOOGLE_API_KEY = os.getenv('GOOGLE_API_KEY')
-if GOOGLE_API_KEY:
-    script_generator = ScienceVideoGenerator(GOOGLE_API_KEY)
-    print("✅ Enhanced Stage 1 Science Video Generator initialized successfully!")
-    print("🎯 Ready to generate detailed educational breakdowns with step-by-step analysis using Google Gemini!")
-else:
-    print("❌ GOOGLE_API_KEY not found. Please set your API key in the .env file.")
\ No newline at end of file
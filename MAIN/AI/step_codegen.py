@@ -0,0 +1,241 @@
+"""
+Generate kode Manim per langkah edukatif (MANIM_CODEGEN_MODE=per_step).
+
+Alih-alih meminta satu respons raksasa berisi seluruh scene, setiap
+educational step meminta satu method `step_<n>(self)` secara paralel.
+Kerangka scene (class, construct, clean_transition dan template
+intro/graph/explanation/outro) dibuat deterministik di sini, lalu
+method-method hasil LLM dijahit ke dalamnya.
+
+Method yang gagal diekstrak / tidak bisa di-parse diganti method
+cadangan berbasis explanation_scene, jadi hasil jahitan selalu bisa
+di-compile; ValidateStage tetap melakukan trial render + perbaikan.
+"""
+
+import ast
+import re
+import textwrap
+from typing import List, Optional
+
+from MAIN.AI.manim_prompts import scene_class_name
+
+STEP_SYSTEM_PROMPT = (
+    "You are an expert Manim Community Edition developer writing ONE method of an "
+    "existing Scene subclass. Return only that Python method in a ```python block, "
+    "no explanations."
+)
+
+# API template yang sudah tersedia di kerangka (diberikan ke LLM di setiap prompt langkah)
+TEMPLATE_API = """
+AVAILABLE HELPERS (already defined on the class, do NOT redefine them):
+- self.intro_scene(title_text, desc_text="", branding="LearnVidAI")
+- self.graph_scene(title_text, graph_function, x_range=[-3, 3, 1], y_range=[-2, 8, 2],
+                   footer_text="", graph_color=BLUE)  -> returns the footer Text
+- self.update_graph_footer(new_text)     # transforms the graph footer in place
+- self.explanation_scene(title_text, explanation_lines, key_insight="")  # max 4 lines
+- self.clean_transition()                # fades out everything on screen
+"""
+
+STEP_RULES = """
+RULES:
+1. Write exactly one method: `def {method_name}(self):` (class-level indentation, 4 spaces).
+2. The scene is already empty when the method starts; call self.clean_transition()
+   between sub-parts, NOT at the very end (construct() does that).
+3. Prefer the helpers above; any extra Text must stay within X=±5, Y=±3 and never overlap.
+4. NO ImageMobject, SVGMobject or external files. Do not use the color CYAN.
+5. Do not define other methods, classes or imports; use only names from `from manim import *`.
+6. Aim for about {duration} seconds of animation (self.wait() included).
+"""
+
+
+def step_method_name(index: int) -> str:
+    return f"step_{index}"
+
+
+def build_step_prompt(video_plan: dict, index: int, step: dict) -> str:
+    """
+    Prompt untuk satu langkah: hanya potongan plan milik langkah tsb.
+    Hanya bergantung pada judul + langkah itu sendiri, jadi prompt yang
+    dibuat saat stage 1 masih streaming sama dengan prompt dari plan final.
+    """
+    breakdown = video_plan.get("educational_breakdown", {})
+    method_name = step_method_name(index)
+    duration = step.get("duration_seconds", 30)
+
+    return """MANIM METHOD GENERATION REQUEST
+
+Video: {video_title} (step {index})
+
+STEP TO IMPLEMENT AS `{method_name}`:
+Title: {step_title}
+- Duration: {duration} seconds
+- Key Concepts: {key_concepts}
+- Narration: {narration}
+- Visual Plan: {visual_plan}
+- Visual Elements: {visual_elements}
+- Equations: {equations}
+- Real-world Examples: {examples}
+{template_api}{rules}""".format(
+        video_title=breakdown.get("title", "Educational Animation"),
+        index=index,
+        method_name=method_name,
+        step_title=step.get("step_title", "Step {}".format(index)),
+        duration=duration,
+        key_concepts=", ".join(step.get("key_concepts", [])),
+        narration=step.get("narration_script", ""),
+        visual_plan=step.get("animation_plan", ""),
+        visual_elements=step.get("visual_elements", {}),
+        equations=step.get("equations", []),
+        examples=step.get("real_world_examples", []),
+        template_api=TEMPLATE_API,
+        rules=STEP_RULES.format(method_name=method_name, duration=duration),
+    )
+
+
+def extract_step_method(response: str, index: int) -> Optional[str]:
+    """
+    Ambil `def step_<n>(self): ...` dari respons LLM, di-indent untuk
+    class body. None jika tidak ditemukan atau tidak valid.
+    """
+    method_name = step_method_name(index)
+    blocks = re.findall(r"```(?:python)?\n(.*?)```", response or "", re.DOTALL) or [response or ""]
+
+    for block in blocks:
+        match = re.search(r"^([ \t]*)def\s+\w+\s*\(\s*self\b", block, re.MULTILINE)
+        if not match:
+            continue
+        method = textwrap.dedent(block[match.start():]).rstrip()
+        # Nama method dipaksa sesuai urutan di construct()
+        method = re.sub(r"^def\s+\w+", f"def {method_name}", method, count=1)
+        method = textwrap.indent(method, "    ")
+        if _parses_in_class(method):
+            return method
+    return None
+
+
+def fallback_step_method(index: int, step: dict) -> str:
+    """Method cadangan deterministik bila kode langkah dari LLM tidak bisa dipakai."""
+    concepts = [c for c in step.get("key_concepts", []) if c][:4]
+    lines = ["• {}".format(c) for c in concepts] or ["• {}".format(step.get("step_title", "Konsep"))]
+    return textwrap.indent(
+        "def {name}(self):\n"
+        "    self.explanation_scene(\n"
+        "        {title!r},\n"
+        "        {lines!r},\n"
+        "        key_insight={insight!r},\n"
+        "    )\n".format(
+            name=step_method_name(index),
+            title=step.get("step_title", "Step {}".format(index)),
+            lines=lines,
+            insight=(step.get("description") or "").split(". ")[0][:80],
+        ),
+        "    ",
+    ).rstrip()
+
+
+def stitch_scene(video_plan: dict, step_methods: List[str]) -> str:
+    """Gabungkan kerangka + method per langkah menjadi satu file Manim."""
+    breakdown = video_plan.get("educational_breakdown", {})
+    title = breakdown.get("title", "Educational Animation")
+    description = (breakdown.get("learning_objectives") or [""])[0]
+
+    calls = []
+    for index in range(1, len(step_methods) + 1):
+        calls.append("        self.{}()".format(step_method_name(index)))
+        calls.append("        self.clean_transition()")
+
+    return _SKELETON.format(
+        class_name=scene_class_name(title),
+        title=repr(title),
+        description=repr(str(description)[:90]),
+        step_calls="\n".join(calls),
+        step_methods="\n\n".join(step_methods),
+    )
+
+
+def _parses_in_class(method: str) -> bool:
+    try:
+        ast.parse("class _Check:\n" + method + "\n")
+        return True
+    except SyntaxError:
+        return False
+
+
+_SKELETON = '''from manim import *
+
+
+class {class_name}Scene(Scene):
+    def construct(self):
+        self.graph_footer = None
+        self.intro_scene({title}, {description}, "LearnVidAI")
+        self.clean_transition()
+{step_calls}
+        self.outro_scene("Summary", {title}, "LearnVidAI")
+
+    # === Shared template helpers ===
+    def clean_transition(self):
+        if self.mobjects:
+            self.play(FadeOut(*self.mobjects), run_time=0.5)
+        self.wait(0.3)
+
+    def clear_and_transition(self):
+        self.clean_transition()
+
+    def _fit(self, mobject, max_width=12):
+        if mobject.width > max_width:
+            mobject.scale_to_fit_width(max_width)
+        return mobject
+
+    def intro_scene(self, title_text, desc_text="", branding="LearnVidAI"):
+        title = self._fit(Text(title_text, font_size=44, color=BLUE)).move_to(UP * 2.0)
+        self.play(Write(title))
+        if desc_text:
+            desc = self._fit(Text(desc_text, font_size=26, color=WHITE)).move_to(UP * 0.5)
+            self.play(FadeIn(desc))
+        brand = Text(branding, font_size=24, color=YELLOW).move_to(DOWN * 1.5)
+        self.play(FadeIn(brand))
+        self.wait(2)
+
+    def outro_scene(self, title_text, desc_text="", branding="LearnVidAI"):
+        self.intro_scene(title_text, desc_text, branding)
+
+    def graph_scene(self, title_text, graph_function, x_range=None, y_range=None,
+                    footer_text="", graph_color=BLUE):
+        x_range = x_range or [-3, 3, 1]
+        y_range = y_range or [-2, 8, 2]
+        title = self._fit(Text(title_text, font_size=36, color=BLUE)).move_to(UP * 3.0)
+        axes = Axes(x_range=x_range, y_range=y_range, x_length=8, y_length=4, tips=False)
+        axes.move_to(DOWN * 0.2)
+        graph = axes.plot(graph_function, x_range=x_range[:2], color=graph_color)
+        self.play(Write(title))
+        self.play(Create(axes))
+        self.play(Create(graph))
+        self.graph_footer = self._fit(Text(footer_text or " ", font_size=26, color=YELLOW)).move_to(DOWN * 2.5)
+        self.play(Write(self.graph_footer))
+        self.wait(1.5)
+        return self.graph_footer
+
+    def update_graph_footer(self, new_text):
+        new_footer = self._fit(Text(new_text, font_size=26, color=YELLOW)).move_to(DOWN * 2.5)
+        if self.graph_footer is None or self.graph_footer not in self.mobjects:
+            self.graph_footer = new_footer
+            self.play(Write(new_footer))
+        else:
+            self.play(Transform(self.graph_footer, new_footer))
+        self.wait(1)
+
+    def explanation_scene(self, title_text, explanation_lines, key_insight=""):
+        title = self._fit(Text(title_text, font_size=36, color=BLUE)).move_to(UP * 3.0)
+        self.play(Write(title))
+        for line, y in zip(list(explanation_lines)[:4], [1.5, 0.5, -0.5, -1.5]):
+            text = self._fit(Text(line, font_size=24, color=WHITE), max_width=11).move_to(UP * y)
+            self.play(FadeIn(text), run_time=0.6)
+            self.wait(0.8)
+        if key_insight:
+            insight = self._fit(Text(key_insight, font_size=26, color=ORANGE)).move_to(DOWN * 2.5)
+            self.play(Write(insight))
+        self.wait(2)
+
+    # === Educational steps (generated per step) ===
+{step_methods}
+'''
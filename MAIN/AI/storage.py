@@ -0,0 +1,62 @@
+"""
+Penyimpanan video hasil render (Cloudflare R2).
+"""
+
+import os
+from pathlib import Path
+
+import boto3
+
+
+def get_video_storage_dir() -> Path:
+    """
+    Ambil folder penyimpanan video lokal dari env.
+    Default: MAIN/videos relatif dari root project (FP).
+    """
+    base_dir = Path(__file__).resolve().parent  # .../FP/MAIN/AI
+    project_root = base_dir.parent.parent      # .../FP
+
+    env_value = os.getenv("VIDEO_FOLDER", "MAIN/videos")
+    video_dir = Path(env_value)
+
+    if not video_dir.is_absolute():
+        video_dir = (project_root / video_dir).resolve()
+
+    video_dir.mkdir(parents=True, exist_ok=True)
+    return video_dir
+
+
+def upload_video(temp_video_path: str, final_name: str) -> str:
+    """
+    Upload ke Cloudflare R2 dan return public URL.
+    File lokal dihapus setelah upload berhasil.
+    """
+    temp_video = Path(temp_video_path)
+
+    if not temp_video.exists():
+        raise FileNotFoundError("Video tidak ditemukan")
+
+    r2 = boto3.client(
+        "s3",
+        endpoint_url=os.getenv("R2_ENDPOINT"),
+        aws_access_key_id=os.getenv("R2_ACCESS_KEY_ID"),
+        aws_secret_access_key=os.getenv("R2_SECRET_ACCESS_KEY"),
+        region_name="auto",
+    )
+
+    bucket = os.getenv("R2_BUCKET_NAME")
+    public_base = os.getenv("R2_BUCKET_PUBLIC_URL")
+
+    # Upload file ke R2
+    r2.upload_file(
+        Filename=str(temp_video),
+        Bucket=bucket,
+        Key=final_name,
+        ExtraArgs={"ContentType": "video/mp4"}
+    )
+
+    # Setelah upload, hapus file lokal
+    temp_video.unlink()
+
+    public_url = f"{public_base}/{final_name}"
+    return public_url
@@ -0,0 +1,166 @@
+"""
+Pencatatan pemakaian token LLM per job dan batas token per job.
+
+Setiap respons LLM (invoke_llm / stream_llm, lihat llm_clients) membawa
+usage_metadata. Angkanya dijumlahkan per tahap pipeline dan per model ke
+TokenUsage milik job yang sedang berjalan. TokenUsage menempel di
+CancelToken job, jadi thread pool, task asyncio, dan token turunan
+(kandidat kode) ikut menambah ke akumulator yang sama. Worker menyimpan
+ringkasannya ke video_jobs.token_usage. Attempt berikutnya (retry /
+reschedule) melanjutkan hitungan yang sama.
+
+Batas (0 = tanpa batas):
+    JOB_TOKEN_BUDGET      -> di atas ini tidak ada lagi retry tahap atau
+                             perbaikan kode oleh LLM
+    JOB_PRO_TOKEN_BUDGET  -> di atas ini perbaikan kode tidak lagi naik
+                             ke gemini-2.5-pro (tetap flash)
+"""
+
+import json
+import os
+import threading
+from typing import Dict, Optional
+
+from MAIN.AI import metrics
+from MAIN.AI.cancellation import current_stage, current_token
+
+JOB_TOKEN_BUDGET = int(os.getenv("JOB_TOKEN_BUDGET", "400000"))
+JOB_PRO_TOKEN_BUDGET = int(os.getenv("JOB_PRO_TOKEN_BUDGET", str(JOB_TOKEN_BUDGET * 6 // 10)))
+
+_FIELDS = ("input_tokens", "output_tokens", "cached_tokens", "calls")
+
+
+def _empty() -> Dict[str, int]:
+    return {name: 0 for name in _FIELDS}
+
+
+class TokenUsage:
+    """Akumulator token satu job (aman dipakai dari banyak thread)."""
+
+    def __init__(
+        self,
+        budget: int = JOB_TOKEN_BUDGET,
+        pro_budget: int = JOB_PRO_TOKEN_BUDGET,
+        summary: Optional[dict] = None,
+    ):
+        self.budget = budget
+        self.pro_budget = pro_budget
+        self._lock = threading.Lock()
+        self._total = _empty()
+        self._stages: Dict[str, Dict[str, int]] = {}
+        self._models: Dict[str, Dict[str, int]] = {}
+        if summary:
+            self._merge(summary)
+
+    @classmethod
+    def from_json(cls, value: Optional[str], **kwargs) -> "TokenUsage":
+        """Lanjutkan hitungan yang tersimpan di job (JSON rusak / kosong -> mulai dari nol)."""
+        try:
+            summary = json.loads(value) if value else None
+        except (TypeError, ValueError):
+            summary = None
+        return cls(summary=summary if isinstance(summary, dict) else None, **kwargs)
+
+    def _merge(self, summary: dict) -> None:
+        for name in _FIELDS:
+            self._total[name] += int(summary.get(name) or 0)
+        for key, target in (("stages", self._stages), ("models", self._models)):
+            for label, counts in (summary.get(key) or {}).items():
+                bucket = target.setdefault(label, _empty())
+                for name in _FIELDS:
+                    bucket[name] += int(counts.get(name) or 0)
+
+    def add(self, stage: Optional[str], model: Optional[str], input_tokens: int,
+            output_tokens: int, cached_tokens: int = 0) -> None:
+        values = {
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "cached_tokens": cached_tokens,
+            "calls": 1,
+        }
+        with self._lock:
+            for bucket in (
+                self._total,
+                self._stages.setdefault(stage or "other", _empty()),
+                self._models.setdefault(model or "unknown", _empty()),
+            ):
+                for name, value in values.items():
+                    bucket[name] += value
+
+    @property
+    def total_tokens(self) -> int:
+        with self._lock:
+            return self._total["input_tokens"] + self._total["output_tokens"]
+
+    def exhausted(self) -> bool:
+        """Budget job habis: jangan mulai retry / perbaikan LLM baru."""
+        return bool(self.budget) and self.total_tokens >= self.budget
+
+    def allows_pro(self) -> bool:
+        return not self.pro_budget or self.total_tokens < self.pro_budget
+
+    def summary(self) -> dict:
+        with self._lock:
+            total = dict(self._total)
+            stages = {stage: dict(counts) for stage, counts in self._stages.items()}
+            models = {model: dict(counts) for model, counts in self._models.items()}
+        return {
+            **total,
+            "total_tokens": total["input_tokens"] + total["output_tokens"],
+            "budget": self.budget or None,
+            "stages": stages,
+            "models": models,
+        }
+
+    def to_json(self) -> str:
+        return json.dumps(self.summary())
+
+    def describe(self) -> str:
+        summary = self.summary()
+        per_stage = ", ".join(
+            f"{stage}={counts['input_tokens'] + counts['output_tokens']}"
+            for stage, counts in summary["stages"].items()
+        )
+        return f"{summary['total_tokens']} tokens in {summary['calls']} call(s) ({per_stage or 'none'})"
+
+
+def current_usage() -> Optional[TokenUsage]:
+    """TokenUsage job yang sedang berjalan (None di luar pipeline, mis. chat)."""
+    token = current_token()
+    return getattr(token, "usage", None) if token else None
+
+
+def _usage_counts(usage_metadata) -> Optional[tuple]:
+    if not usage_metadata:
+        return None
+    details = usage_metadata.get("input_token_details") or {}
+    return (
+        int(usage_metadata.get("input_tokens") or 0),
+        int(usage_metadata.get("output_tokens") or 0),
+        int(details.get("cache_read") or 0),
+    )
+
+
+def record(llm, usage_metadata) -> None:
+    """Catat usage_metadata satu respons LLM ke metrics dan ke job aktif."""
+    counts = _usage_counts(usage_metadata)
+    if counts is None:
+        return
+    input_tokens, output_tokens, cached_tokens = counts
+    metrics.incr("llm.tokens.input", input_tokens)
+    metrics.incr("llm.tokens.output", output_tokens)
+    if cached_tokens:
+        metrics.incr("llm.tokens.cached", cached_tokens)
+    usage = current_usage()
+    if usage is not None:
+        usage.add(current_stage(), getattr(llm, "model", None), input_tokens, output_tokens, cached_tokens)
+
+
+def budget_exhausted() -> bool:
+    usage = current_usage()
+    return usage is not None and usage.exhausted()
+
+
+def pro_allowed() -> bool:
+    usage = current_usage()
+    return usage is None or usage.allows_pro()
@@ -0,0 +1,234 @@
+"""
+Cache video yang sudah jadi, dikunci oleh topik yang dinormalisasi
++ parameter generate (complexity, domain).
+
+"Pitagoras", "teorema pythagoras?" dan "  PYTHAGORAS  " menghasilkan key
+yang sama, jadi permintaan berulang langsung mendapat URL R2 yang sudah
+ada tanpa memanggil Gemini atau merender ulang. Urutan kata tetap
+dihitung ("x pangkat y" != "y pangkat x"). Topik yang isinya hanya kata
+pengisi ("apa itu") tidak punya key dan tidak di-cache.
+
+CLI:
+    python -m MAIN.AI.video_cache stats
+    python -m MAIN.AI.video_cache invalidate "hukum newton 2"
+    python -m MAIN.AI.video_cache evict
+"""
+
+import hashlib
+import json
+import os
+import re
+import time
+import unicodedata
+from typing import Optional
+
+from MAIN.AI import metrics
+from MAIN.AI.local_store import connect
+
+# Naikkan jika prompt / pipeline / normalisasi berubah sehingga video lama tidak valid lagi
+VIDEO_CACHE_VERSION = 2
+
+VIDEO_CACHE_TTL_SECONDS = int(os.getenv("VIDEO_CACHE_TTL_DAYS", "30")) * 24 * 3600
+VIDEO_CACHE_MAX_ENTRIES = int(os.getenv("VIDEO_CACHE_MAX_ENTRIES", "5000"))
+
+# Kata pengisi yang tidak mengubah isi topik (ID + EN)
+_STOPWORDS = {
+    "a", "an", "the", "of", "about", "on", "to", "and", "explain", "what", "is", "how",
+    "video", "animasi", "animation", "tentang", "mengenai", "apa", "itu", "jelaskan",
+    "bagaimana", "buatkan", "buat", "tolong", "dan", "yang", "di", "ke", "dari",
+    "teorema", "theorem", "konsep", "concept",
+}
+
+# Varian bahasa / ejaan -> bentuk kanonik
+_TOKEN_ALIASES = {
+    "pythagoras": "pitagoras",
+    "pythagorean": "pitagoras",
+    "phytagoras": "pitagoras",
+    "law": "hukum",
+    "laws": "hukum",
+    "newtons": "newton",
+    "first": "1", "pertama": "1", "i": "1",
+    "second": "2", "kedua": "2", "ii": "2",
+    "third": "3", "ketiga": "3", "iii": "3",
+    "photosynthesis": "fotosintesis",
+    "gravity": "gravitasi",
+    "energy": "energi",
+    "force": "gaya",
+    "velocity": "kecepatan",
+    "acceleration": "percepatan",
+    "derivative": "turunan",
+    "cell": "sel",
+}
+
+
+def normalize_topic(topic: str) -> str:
+    """
+    Normalisasi topik: huruf kecil, tanpa aksen/tanda baca, spasi dirapikan,
+    kata pengisi dibuang, varian bahasa diseragamkan. Urutan dan
+    pengulangan kata dipertahankan.
+    """
+    text = unicodedata.normalize("NFKD", topic or "")
+    text = "".join(c for c in text if not unicodedata.combining(c)).lower()
+    text = text.replace("'s", "")
+    text = re.sub(r"[^\w\s]", " ", text)
+    tokens = []
+    for token in text.split():
+        token = _TOKEN_ALIASES.get(token, token)
+        if token and token not in _STOPWORDS:
+            tokens.append(token)
+    return " ".join(tokens)
+
+
+def video_cache_key(topic: str, complexity: str = "high-school", domain: str = "auto-detect") -> Optional[str]:
+    """Key cache, atau None jika topik kosong setelah normalisasi (tidak di-cache / digabung)."""
+    normalized = normalize_topic(topic)
+    if not normalized:
+        return None
+    payload = {
+        "topic": normalized,
+        "complexity": (complexity or "").strip().lower(),
+        "domain": (domain or "").strip().lower(),
+        "version": VIDEO_CACHE_VERSION,
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+class VideoCache:
+    """Mapping key -> URL video publik, dengan TTL dan eviksi LRU."""
+
+    def __init__(self, ttl_seconds: int = VIDEO_CACHE_TTL_SECONDS, max_entries: int = VIDEO_CACHE_MAX_ENTRIES):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+
+    def _conn(self):
+        conn = connect("video_cache")
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS video_cache (
+                cache_key TEXT PRIMARY KEY,
+                normalized_topic TEXT NOT NULL,
+                topic TEXT NOT NULL,
+                complexity TEXT,
+                domain TEXT,
+                video_url TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_hit_at REAL NOT NULL,
+                hit_count INTEGER NOT NULL DEFAULT 0
+            )
+            """
+        )
+        return conn
+
+    def get(self, topic: str, complexity: str = "high-school", domain: str = "auto-detect") -> Optional[str]:
+        """Kembalikan URL video jika ada di cache (dan belum kedaluwarsa)."""
+        key = video_cache_key(topic, complexity, domain)
+        if key is None:
+            return None
+        now = time.time()
+        try:
+            conn = self._conn()
+            row = conn.execute(
+                "SELECT video_url, created_at FROM video_cache WHERE cache_key = ?", (key,)
+            ).fetchone()
+            if row and now - row["created_at"] <= self.ttl_seconds:
+                conn.execute(
+                    "UPDATE video_cache SET last_hit_at = ?, hit_count = hit_count + 1 WHERE cache_key = ?",
+                    (now, key),
+                )
+                metrics.incr("video_cache.hit")
+                print(f"[VIDEO CACHE] HIT '{topic}' -> {row['video_url']}")
+                return row["video_url"]
+            if row:
+                conn.execute("DELETE FROM video_cache WHERE cache_key = ?", (key,))
+                metrics.incr("video_cache.expired")
+        except Exception as e:
+            print(f"[VIDEO CACHE] lookup failed: {e}")
+        metrics.incr("video_cache.miss")
+        return None
+
+    def put(self, topic: str, video_url: str, complexity: str = "high-school", domain: str = "auto-detect") -> None:
+        key = video_cache_key(topic, complexity, domain)
+        if not video_url or key is None:
+            return
+        now = time.time()
+        try:
+            self._conn().execute(
+                """
+                INSERT OR REPLACE INTO video_cache
+                    (cache_key, normalized_topic, topic, complexity, domain, video_url, created_at, last_hit_at, hit_count)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, 0)
+                """,
+                (key, normalize_topic(topic), topic, complexity, domain, video_url, now, now),
+            )
+            metrics.incr("video_cache.store")
+            self.evict()
+        except Exception as e:
+            print(f"[VIDEO CACHE] store failed: {e}")
+
+    def invalidate(self, topic: str, complexity: Optional[str] = None, domain: Optional[str] = None) -> int:
+        """
+        Hapus entri untuk topik. Jika complexity/domain tidak diberikan,
+        semua varian parameter untuk topik tersebut dihapus.
+        """
+        conn = self._conn()
+        if complexity is None and domain is None:
+            cur = conn.execute("DELETE FROM video_cache WHERE normalized_topic = ?", (normalize_topic(topic),))
+        else:
+            key = video_cache_key(topic, complexity or "high-school", domain or "auto-detect")
+            cur = conn.execute("DELETE FROM video_cache WHERE cache_key = ?", (key,))
+        metrics.incr("video_cache.invalidated", cur.rowcount)
+        return cur.rowcount
+
+    def evict(self) -> int:
+        """Buang entri kedaluwarsa, lalu entri paling jarang dipakai di atas max_entries."""
+        conn = self._conn()
+        removed = conn.execute(
+            "DELETE FROM video_cache WHERE created_at < ?", (time.time() - self.ttl_seconds,)
+        ).rowcount
+        removed += conn.execute(
+            """
+            DELETE FROM video_cache WHERE cache_key IN (
+                SELECT cache_key FROM video_cache ORDER BY last_hit_at DESC LIMIT -1 OFFSET ?
+            )
+            """,
+            (self.max_entries,),
+        ).rowcount
+        if removed:
+            metrics.incr("video_cache.evicted", removed)
+        return removed
+
+    def stats(self) -> dict:
+        conn = self._conn()
+        entries = conn.execute("SELECT COUNT(*) FROM video_cache").fetchone()[0]
+        counters = metrics.snapshot()["counters"]
+        hits = counters.get("video_cache.hit", 0)
+        misses = counters.get("video_cache.miss", 0)
+        return {
+            "entries": entries,
+            "hits": hits,
+            "misses": misses,
+            "hit_ratio": (hits / (hits + misses)) if (hits + misses) else 0.0,
+        }
+
+
+_video_cache: Optional[VideoCache] = None
+
+
+def get_video_cache() -> VideoCache:
+    global _video_cache
+    if _video_cache is None:
+        _video_cache = VideoCache()
+    return _video_cache
+
+
+if __name__ == "__main__":
+    import sys
+
+    cache = get_video_cache()
+    command = sys.argv[1] if len(sys.argv) > 1 else "stats"
+    if command == "invalidate" and len(sys.argv) > 2:
+        print(f"Removed {cache.invalidate(sys.argv[2])} entr(y/ies) for '{sys.argv[2]}'")
+    elif command == "evict":
+        print(f"Evicted {cache.evict()} entr(y/ies)")
+    else:
+        print(json.dumps(cache.stats(), indent=2))
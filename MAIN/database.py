@@ -0,0 +1,110 @@
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+from dotenv import load_dotenv
+from sqlmodel import SQLModel, Field, create_engine
+
+# === Load .env dari lokasi AI, MAIN, atau root ===
+BASE_DIR = Path(__file__).resolve().parent       # .../FP/MAIN
+project_root = BASE_DIR.parent                   # .../FP
+env_paths = [
+    BASE_DIR / ".env",           # MAIN/.env
+    project_root / ".env",       # FP/.env
+    project_root / "AI" / ".env" # FP/AI/.env
+]
+for env in env_paths:
+    if env.exists():
+        load_dotenv(dotenv_path=env)
+        print(f"✅ Loaded .env from: {env}")
+        break
+else:
+    print("⚠️ No .env file found in MAIN, FP, or AI.")
+
+# === Database URL ===
+uri_db = os.getenv("DATABASE_URL")
+if not uri_db:
+    raise RuntimeError("❌ DATABASE_URL not found in environment variables")
+
+engine = create_engine(uri_db, echo=False, pool_pre_ping=True)
+
+# ---------------- Models DB----------------
+class User(SQLModel, table=True):
+    __tablename__ = "users"
+    id: Optional[int] = Field(default=None, primary_key=True)
+    username: str
+    email: str
+    password_hash: str
+
+class ChatFolder(SQLModel, table=True):
+    __tablename__ = "chatfolders"
+    id: Optional[int] = Field(default=None, primary_key=True)
+    user_id: int = Field(foreign_key="users.id")
+    title: str
+
+class Message(SQLModel, table=True):
+    __tablename__ = "messages"
+    id: Optional[int] = Field(default=None, primary_key=True)
+    chat_folder_id: int = Field(foreign_key="chatfolders.id")
+    role: bool  # True=user, False=ai
+    content: str
+    video_url: Optional[str] = None  # ✅ kolom baru
+    timestamp: datetime = Field(default_factory=datetime.utcnow)
+
+class Review(SQLModel, table=True):
+    __tablename__ = "reviews"
+    id: Optional[int] = Field(default=None, primary_key=True)
+    nama: str
+    nrp: str
+    kelompok: str
+    rating: int
+    review: str
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+
+class VideoJob(SQLModel, table=True):
+    """
+    Satu baris per permintaan video. Diambil oleh proses worker
+    (MAIN/worker.py), bukan dijalankan di dalam request HTTP.
+
+    status: queued -> running -> completed | failed | cancelled
+            attached -> completed | failed | cancelled  (ikut job lain dengan cache_key sama)
+    """
+    __tablename__ = "video_jobs"
+    id: Optional[int] = Field(default=None, primary_key=True)
+    user_id: int = Field(foreign_key="users.id", index=True)
+    chat_folder_id: int = Field(foreign_key="chatfolders.id")
+    user_message_id: Optional[int] = None      # pesan topik dari user
+    progress_message_id: Optional[int] = None  # pesan AI yang diupdate selama proses
+    result_message_id: Optional[int] = None    # pesan AI final (sukses / error)
+    topic: str
+    complexity: str = "high-school"  # parameter generate, ikut menentukan cache_key
+    domain: str = "auto-detect"
+    cache_key: Optional[str] = Field(default=None, index=True)  # lihat video_cache_key()
+    leader_job_id: Optional[int] = None  # diisi jika job ini menumpang job lain (single-flight)
+    estimated_cost: Optional[float] = None  # detik render perkiraan (MAIN/AI/scheduler.py), diisi setelah plan
+    tokens_used: Optional[int] = None  # total token LLM semua attempt (MAIN/AI/token_budget.py)
+    token_usage: Optional[str] = None  # JSON: token per tahap / model
+    status: str = Field(default="queued", index=True)
+    cancel_requested: bool = False  # client SSE terputus; worker menghentikan pipeline
+    client_gone: bool = False  # client leader terputus tapi masih ada penumpang; batal saat penumpang terakhir pergi
+    worker_id: Optional[str] = None
+    attempts: int = 0
+    video_url: Optional[str] = None
+    error: Optional[str] = None
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    lease_expires_at: Optional[datetime] = None  # worker mati -> job diambil ulang
+
+class VideoJobEvent(SQLModel, table=True):
+    """Progress event yang dikirim worker; endpoint SSE hanya membaca tabel ini."""
+    __tablename__ = "video_job_events"
+    id: Optional[int] = Field(default=None, primary_key=True)
+    job_id: int = Field(foreign_key="video_jobs.id", index=True)
+    payload: str  # JSON
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+
+
+def create_db_and_tables():
+    SQLModel.metadata.create_all(engine)
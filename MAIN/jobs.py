@@ -0,0 +1,607 @@
+"""
+Antrian job video yang persisten (tabel video_jobs + video_job_events).
+
+Web tier hanya memanggil enqueue_video_job() lalu membaca event;
+proses worker (MAIN/worker.py) yang memanggil claim_next_job() dan
+menjalankan pipeline generate.
+"""
+
+import json
+import os
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from sqlalchemy import func, text, update
+from sqlmodel import Session, select
+
+from MAIN.AI import metrics
+from MAIN.AI.scheduler import priority_score
+from MAIN.AI.video_cache import video_cache_key
+from MAIN.database import Message, User, VideoJob, VideoJobEvent, engine
+
+JOB_LEASE_SECONDS = int(os.getenv("JOB_LEASE_SECONDS", "120"))
+MAX_JOB_ATTEMPTS = int(os.getenv("MAX_JOB_ATTEMPTS", "3"))
+# Berapa kali job yang gagal (bukan worker mati) otomatis diulang dari checkpoint
+MAX_JOB_RETRIES = int(os.getenv("MAX_JOB_RETRIES", "1"))
+
+# Admission control: total render bersamaan (semua worker) dan batas per user
+RENDER_SLOTS = int(os.getenv("RENDER_SLOTS", os.getenv("RENDER_WORKERS", str(os.cpu_count() or 1))))
+MAX_RUNNING_JOBS_PER_USER = int(os.getenv("MAX_RUNNING_JOBS_PER_USER", "1"))
+MAX_ACTIVE_JOBS_PER_USER = int(os.getenv("MAX_ACTIVE_JOBS_PER_USER", "3"))
+# Perkiraan durasi satu job sebelum ada data dari metrics (detik)
+DEFAULT_JOB_SECONDS = float(os.getenv("DEFAULT_JOB_SECONDS", "240"))
+
+FINAL_JOB_STATUSES = {"completed", "failed", "cancelled"}
+ACTIVE_JOB_STATUSES = {"queued", "running"}
+
+CANCELLED_JOB_MESSAGE = "⛔ Pembuatan video dibatalkan."
+
+_CLAIM_LOCK_ID = 724_301  # pg_advisory_xact_lock untuk claim_next_job
+# Berapa job antrian terlama yang dinilai scheduler per claim
+SCHEDULER_WINDOW = int(os.getenv("SCHEDULER_WINDOW", "50"))
+
+
+class JobLimitExceeded(Exception):
+    """User sudah punya terlalu banyak job aktif."""
+
+
+def _find_active_leader(session: Session, cache_key: str, before_id: Optional[int] = None) -> Optional[VideoJob]:
+    """Cari job aktif (bukan penumpang) dengan cache_key yang sama."""
+    stmt = (
+        select(VideoJob)
+        .where(VideoJob.cache_key == cache_key)
+        .where(VideoJob.status.in_(ACTIVE_JOB_STATUSES))
+        .where(VideoJob.leader_job_id.is_(None))
+        .where(VideoJob.cancel_requested == False)  # noqa: E712
+        .order_by(VideoJob.id.asc())
+        .limit(1)
+        # Serialisasi dengan request_job_cancel: penumpang tidak menempel ke leader yang sedang dibatalkan
+        .with_for_update()
+    )
+    if before_id is not None:
+        stmt = stmt.where(VideoJob.id < before_id)
+    return session.exec(stmt).first()
+
+
+def enqueue_video_job(
+    user_id: int,
+    chat_id: int,
+    topic: str,
+    user_message_id: Optional[int] = None,
+    progress_message_id: Optional[int] = None,
+    complexity: str = "high-school",
+    domain: str = "auto-detect",
+) -> VideoJob:
+    """
+    Simpan job baru dan kembalikan barisnya.
+
+    Jika topik + complexity/domain yang sama (cache_key sama) sedang diproses, job baru tidak
+    masuk antrian tetapi berstatus 'attached' ke job tersebut: semua
+    request menerima event progress dan video_url yang sama.
+
+    Batas MAX_ACTIVE_JOBS_PER_USER dicek di transaksi yang sama dengan
+    insert. Baris user dikunci (FOR UPDATE) supaya beberapa tab yang
+    mengirim bersamaan tidak lolos hitungan yang sama.
+
+    Raises:
+        JobLimitExceeded: jika user sudah mencapai MAX_ACTIVE_JOBS_PER_USER
+    """
+    cache_key = video_cache_key(topic, complexity, domain)
+    with Session(engine, expire_on_commit=False) as session:
+        session.exec(select(User.id).where(User.id == user_id).with_for_update()).first()
+        _ensure_can_enqueue(session, user_id)
+        job = VideoJob(
+            user_id=user_id,
+            chat_folder_id=chat_id,
+            topic=topic,
+            complexity=complexity,
+            domain=domain,
+            cache_key=cache_key,
+            user_message_id=user_message_id,
+            progress_message_id=progress_message_id,
+        )
+        # Topik tanpa key (hanya kata pengisi) tidak digabung dengan job lain
+        leader = _find_active_leader(session, cache_key) if cache_key else None
+        if leader:
+            job.status = "attached"
+            job.leader_job_id = leader.id
+            metrics.incr("jobs.coalesced")
+            print(f"[JOBS] '{topic}' attached to running job #{leader.id}")
+        session.add(job)
+        session.commit()
+        session.refresh(job)
+        return job
+
+
+def _active_job_count(session: Session, user_id: int) -> int:
+    return session.exec(
+        select(func.count())
+        .select_from(VideoJob)
+        .where(VideoJob.user_id == user_id)
+        .where(VideoJob.status.in_(ACTIVE_JOB_STATUSES))
+    ).one()
+
+
+def count_active_jobs(user_id: int) -> int:
+    """Jumlah job milik user yang sedang antri / dirender (tidak termasuk penumpang)."""
+    with Session(engine) as session:
+        return _active_job_count(session, user_id)
+
+
+def _ensure_can_enqueue(session: Session, user_id: int) -> None:
+    """
+    Raises:
+        JobLimitExceeded: jika user sudah mencapai MAX_ACTIVE_JOBS_PER_USER
+    """
+    if _active_job_count(session, user_id) >= MAX_ACTIVE_JOBS_PER_USER:
+        metrics.incr("jobs.rejected")
+        raise JobLimitExceeded(
+            f"Maksimal {MAX_ACTIVE_JOBS_PER_USER} video diproses bersamaan. Tunggu video sebelumnya selesai."
+        )
+
+
+def _lock_claims(session: Session) -> None:
+    """Serialisasi claim antar worker supaya batas slot tidak terlewati (Postgres)."""
+    if engine.dialect.name == "postgresql":
+        session.exec(text("SELECT pg_advisory_xact_lock(:lock_id)").bindparams(lock_id=_CLAIM_LOCK_ID))
+
+
+def _running_count(session: Session) -> int:
+    return session.exec(
+        select(func.count()).select_from(VideoJob).where(VideoJob.status == "running")
+    ).one()
+
+
+def _queued_window(claimable: bool = True):
+    """
+    Query SCHEDULER_WINDOW job antri terlama, yaitu kandidat yang dinilai
+    scheduler. claimable=True melewati job milik user yang sudah punya
+    MAX_RUNNING_JOBS_PER_USER render berjalan (belum bisa diambil).
+    """
+    stmt = select(VideoJob).where(VideoJob.status == "queued")
+    if claimable:
+        busy_users = (
+            select(VideoJob.user_id)
+            .where(VideoJob.status == "running")
+            .group_by(VideoJob.user_id)
+            .having(func.count() >= MAX_RUNNING_JOBS_PER_USER)
+        )
+        stmt = stmt.where(VideoJob.user_id.not_in(busy_users))
+    return stmt.order_by(VideoJob.created_at.asc(), VideoJob.id.asc()).limit(SCHEDULER_WINDOW)
+
+
+def claim_next_job(worker_id: str) -> Optional[VideoJob]:
+    """
+    Ambil satu job 'queued' paling lama dan tandai sebagai 'running'.
+
+    Admission control: tidak ada job yang diambil jika RENDER_SLOTS sudah
+    penuh, dan job milik user yang sudah punya MAX_RUNNING_JOBS_PER_USER
+    render berjalan dilewati (tetap antri).
+
+    Urutan: shortest-expected-first dengan aging (lihat
+    MAIN/AI/scheduler.py) di antara SCHEDULER_WINDOW job terlama.
+
+    Memakai SELECT ... FOR UPDATE SKIP LOCKED (diabaikan di SQLite)
+    supaya beberapa worker tidak mengambil job yang sama.
+    """
+    while True:
+        with Session(engine, expire_on_commit=False) as session:
+            _lock_claims(session)
+            running = _running_count(session)
+            metrics.set_gauge("jobs.running", running)
+            if running >= RENDER_SLOTS:
+                return None
+
+            candidates = session.exec(_queued_window().with_for_update(skip_locked=True)).all()
+            if not candidates:
+                return None
+            now = datetime.utcnow()
+            job = min(candidates, key=lambda j: _job_priority(j, now))
+            metrics.set_gauge("scheduler.queue_depth", len(candidates))
+            metrics.observe("scheduler.wait_seconds", (now - job.created_at).total_seconds())
+            if job is not candidates[0]:
+                metrics.incr("scheduler.reordered")
+
+            # Dua request identik bisa lolos enqueue bersamaan; yang lebih baru
+            # menumpang job yang lebih lama alih-alih render dua kali. Kandidat
+            # berikutnya dipilih di transaksi baru (putaran loop berikutnya).
+            if job.cache_key:
+                leader = _find_active_leader(session, job.cache_key, before_id=job.id)
+                if leader:
+                    job.status = "attached"
+                    job.leader_job_id = leader.id
+                    session.add(job)
+                    session.commit()
+                    metrics.incr("jobs.coalesced")
+                    print(f"[JOBS] Job #{job.id} attached to job #{leader.id} at claim time")
+                    continue
+
+            now = datetime.utcnow()
+            job.status = "running"
+            job.worker_id = worker_id
+            job.attempts += 1
+            job.started_at = now
+            job.lease_expires_at = now + timedelta(seconds=JOB_LEASE_SECONDS)
+            session.add(job)
+            session.commit()
+            session.refresh(job)
+            return job
+
+
+def _job_priority(job: VideoJob, now: datetime) -> float:
+    return priority_score(job.estimated_cost, (now - job.created_at).total_seconds())
+
+
+def set_job_estimated_cost(job_id: int, estimated_cost: float) -> None:
+    with Session(engine) as session:
+        job = session.get(VideoJob, job_id)
+        if job:
+            job.estimated_cost = estimated_cost
+            session.add(job)
+            session.commit()
+    metrics.observe("scheduler.estimated_cost", estimated_cost)
+
+
+def set_job_token_usage(job_id: int, token_usage) -> None:
+    """Simpan hitungan token job (TokenUsage) setelah setiap attempt."""
+    summary = token_usage.summary()
+    with Session(engine) as session:
+        job = session.get(VideoJob, job_id)
+        if job:
+            job.tokens_used = summary["total_tokens"]
+            job.token_usage = token_usage.to_json()
+            session.add(job)
+            session.commit()
+
+
+def has_higher_priority_job(job_id: int) -> bool:
+    """
+    Apakah ada job antri yang menurut scheduler seharusnya dirender lebih
+    dulu dan benar-benar menunggu slot. Selama RENDER_SLOTS belum penuh,
+    job yang lebih murah bisa langsung diambil worker lain, jadi job ini
+    tidak perlu mengalah. Job milik user yang sedang penuh tidak dihitung
+    (sama dengan filter claim_next_job).
+    """
+    now = datetime.utcnow()
+    with Session(engine) as session:
+        job = session.get(VideoJob, job_id)
+        if not job or _running_count(session) < RENDER_SLOTS:
+            return False
+        waiting = session.exec(_queued_window()).all()
+        own_priority = _job_priority(job, now)
+        return any(_job_priority(other, now) < own_priority for other in waiting)
+
+
+def reschedule_job(job_id: int) -> None:
+    """
+    Kembalikan job ke antrian setelah biayanya diketahui. Bukan kegagalan,
+    jadi attempt tidak dihitung; checkpoint membuat tahap LLM tidak diulang.
+    """
+    with Session(engine) as session:
+        job = session.get(VideoJob, job_id)
+        if not job:
+            return
+        job.status = "queued"
+        job.worker_id = None
+        job.lease_expires_at = None
+        job.attempts = max(0, job.attempts - 1)
+        session.add(job)
+        session.commit()
+    metrics.incr("scheduler.rescheduled")
+
+
+def renew_job_lease(job_id: int) -> None:
+    """Perpanjang lease job yang sedang dikerjakan (dipanggil berkala oleh worker)."""
+    with Session(engine) as session:
+        job = session.get(VideoJob, job_id)
+        if job and job.status == "running":
+            job.lease_expires_at = datetime.utcnow() + timedelta(seconds=JOB_LEASE_SECONDS)
+            session.add(job)
+            session.commit()
+
+
+def requeue_expired_jobs() -> int:
+    """
+    Kembalikan job 'running' yang lease-nya habis (worker mati / restart)
+    ke antrian. Job yang sudah mencapai MAX_JOB_ATTEMPTS ditandai gagal.
+
+    Returns:
+        int: jumlah job yang diproses
+    """
+    now = datetime.utcnow()
+    with Session(engine) as session:
+        stale = session.exec(
+            select(VideoJob)
+            .where(VideoJob.status == "running")
+            .where(VideoJob.lease_expires_at < now)
+            .with_for_update(skip_locked=True)
+        ).all()
+        for job in stale:
+            if job.cancel_requested:
+                job.status = "cancelled"
+                job.finished_at = now
+            elif job.attempts >= MAX_JOB_ATTEMPTS:
+                job.status = "failed"
+                job.error = "❌ Worker berhenti di tengah proses terlalu sering."
+                job.finished_at = now
+            else:
+                job.status = "queued"
+                job.worker_id = None
+            job.lease_expires_at = None
+            session.add(job)
+        session.commit()
+        return len(stale)
+
+
+def retry_job(job_id: int) -> bool:
+    """
+    Kembalikan job yang gagal ke antrian supaya diulang dari checkpoint.
+
+    Returns:
+        bool: False jika jatah retry sudah habis (job harus difinalisasi)
+    """
+    with Session(engine) as session:
+        job = session.get(VideoJob, job_id)
+        if not job or job.cancel_requested or job.attempts > MAX_JOB_RETRIES or job.attempts >= MAX_JOB_ATTEMPTS:
+            return False
+        job.status = "queued"
+        job.worker_id = None
+        job.lease_expires_at = None
+        session.add(job)
+        session.commit()
+    metrics.incr("jobs.retried")
+    return True
+
+
+def _attached_count(session: Session, leader_job_id: int) -> int:
+    return session.exec(
+        select(func.count())
+        .select_from(VideoJob)
+        .where(VideoJob.leader_job_id == leader_job_id)
+        .where(VideoJob.status == "attached")
+    ).one()
+
+
+def _mark_cancelled(session: Session, job: VideoJob) -> None:
+    previous_status = job.status
+    job.cancel_requested = True
+    if job.status != "running":
+        job.status = "cancelled"
+        job.finished_at = datetime.utcnow()
+        _set_message_content(session, job.progress_message_id, CANCELLED_JOB_MESSAGE)
+    session.add(job)
+    metrics.incr("jobs.cancelled")
+    print(f"[JOBS] Job #{job.id} cancelled (client disconnected, was {previous_status})")
+
+
+def request_job_cancel(job_id: int) -> bool:
+    """
+    Client SSE job ini terputus: batalkan job jika tidak ada yang lain
+    menunggu hasilnya.
+
+    - 'attached'  -> penumpang saja yang dibatalkan; jika itu penumpang
+                     terakhir dan client leader juga sudah pergi
+                     (client_gone), leader ikut dibatalkan
+    - 'queued'    -> langsung 'cancelled' (belum ada worker yang memegang)
+    - 'running'   -> cancel_requested=True; worker menghentikan pipeline,
+                     membunuh manim dan membersihkan folder kerja
+
+    Job yang masih punya penumpang tidak dibatalkan, hanya ditandai
+    client_gone. Baris leader dikunci (FOR UPDATE) selama penumpang
+    dihitung, sama seperti saat request baru menempel
+    (_find_active_leader), jadi request yang menempel bersamaan tidak
+    mendapat hasil "dibatalkan".
+
+    Returns:
+        bool: True jika job dibatalkan / pembatalan diminta
+    """
+    with Session(engine) as session:
+        job = session.get(VideoJob, job_id, with_for_update=True)
+        if not job or job.status in FINAL_JOB_STATUSES or job.cancel_requested:
+            return False
+
+        if job.status == "attached":
+            leader = session.get(VideoJob, job.leader_job_id, with_for_update=True) if job.leader_job_id else None
+            _mark_cancelled(session, job)
+            session.flush()
+            if (
+                leader
+                and leader.client_gone
+                and not leader.cancel_requested
+                and leader.status not in FINAL_JOB_STATUSES
+                and not _attached_count(session, leader.id)
+            ):
+                print(f"[JOBS] Last attached request of job #{leader.id} gone, cancelling it")
+                _mark_cancelled(session, leader)
+            session.commit()
+            return True
+
+        followers = _attached_count(session, job.id)
+        if followers:
+            job.client_gone = True
+            session.add(job)
+            session.commit()
+            print(f"[JOBS] Job #{job.id} client gone, kept for {followers} attached request(s)")
+            return False
+
+        _mark_cancelled(session, job)
+        session.commit()
+    return True
+
+
+def is_cancel_requested(job_id: int) -> bool:
+    with Session(engine) as session:
+        job = session.get(VideoJob, job_id)
+        return bool(job and job.cancel_requested)
+
+
+def cancel_job(job_id: int) -> None:
+    """Finalisasi job 'running' yang pipeline-nya sudah dihentikan worker."""
+    with Session(engine) as session:
+        job = session.get(VideoJob, job_id)
+        if not job:
+            return
+        job.status = "cancelled"
+        job.error = CANCELLED_JOB_MESSAGE
+        job.finished_at = datetime.utcnow()
+        job.lease_expires_at = None
+        _set_message_content(session, job.progress_message_id, CANCELLED_JOB_MESSAGE)
+        session.add(job)
+        session.commit()
+
+
+def _set_message_content(session: Session, message_id: Optional[int], content: str) -> None:
+    msg = session.get(Message, message_id) if message_id else None
+    if msg:
+        msg.content = content
+        session.add(msg)
+
+
+def claim_follower(job_id: int, video_url: Optional[str] = None, error: Optional[str] = None) -> bool:
+    """
+    Ambil hak memfinalisasi penumpang secara atomik (UPDATE ... WHERE
+    status='attached'). Worker leader dan finalize_orphaned_followers di
+    worker lain bisa melihat penumpang yang sama; hanya satu yang menang,
+    jadi pesan hasil tidak terkirim dua kali.
+
+    Returns:
+        bool: True jika penumpang ini diklaim oleh pemanggil
+    """
+    with Session(engine) as session:
+        result = session.execute(
+            update(VideoJob)
+            .where(VideoJob.id == job_id)
+            .where(VideoJob.status == "attached")
+            .values(
+                status="completed" if video_url and not error else "failed",
+                video_url=video_url,
+                error=error,
+                finished_at=datetime.utcnow(),
+            )
+        )
+        session.commit()
+        return result.rowcount == 1
+
+
+def get_followers(leader_job_id: int) -> List[VideoJob]:
+    """Job 'attached' yang menunggu hasil dari leader_job_id."""
+    with Session(engine, expire_on_commit=False) as session:
+        return list(session.exec(
+            select(VideoJob)
+            .where(VideoJob.leader_job_id == leader_job_id)
+            .where(VideoJob.status == "attached")
+        ).all())
+
+
+def get_orphaned_followers() -> List[tuple]:
+    """
+    Penumpang yang leader-nya sudah selesai tetapi belum ikut difinalisasi
+    (mis. menempel tepat saat leader selesai).
+
+    Returns:
+        list: pasangan (follower, leader)
+    """
+    with Session(engine, expire_on_commit=False) as session:
+        followers = session.exec(select(VideoJob).where(VideoJob.status == "attached")).all()
+        orphans = []
+        for follower in followers:
+            leader = session.get(VideoJob, follower.leader_job_id) if follower.leader_job_id else None
+            if leader is None or leader.status in FINAL_JOB_STATUSES:
+                orphans.append((follower, leader))
+        return orphans
+
+
+def record_job_event(job_id: int, payload: dict) -> None:
+    with Session(engine) as session:
+        session.add(VideoJobEvent(job_id=job_id, payload=json.dumps(payload)))
+        session.commit()
+
+
+def estimated_job_seconds() -> float:
+    """Rata-rata durasi job yang sudah selesai (metrics), atau DEFAULT_JOB_SECONDS."""
+    timer = metrics.snapshot()["timers"].get("jobs.duration.seconds")
+    return timer["avg"] if timer and timer["count"] else DEFAULT_JOB_SECONDS
+
+
+def get_queue_position(job_id: int) -> Optional[dict]:
+    """
+    Posisi job 'queued' di antrian dan perkiraan kapan mulai dirender.
+
+    Returns:
+        dict: {"position": 1-based, "eta_seconds": float} atau None jika
+        job tidak sedang antri
+    """
+    now = datetime.utcnow()
+    with Session(engine) as session:
+        job = session.get(VideoJob, job_id)
+        if not job or job.status != "queued":
+            return None
+        # Urutan claim = prioritas scheduler di antara kandidat window
+        window = session.exec(_queued_window(claimable=False)).all()
+        ranked = sorted(window, key=lambda j: _job_priority(j, now))
+        ahead = next((index for index, other in enumerate(ranked) if other.id == job.id), None)
+        if ahead is None:
+            # Belum masuk window: semua job yang lebih lama tetap di depannya
+            ahead = session.exec(
+                select(func.count())
+                .select_from(VideoJob)
+                .where(VideoJob.status == "queued")
+                .where(
+                    (VideoJob.created_at < job.created_at)
+                    | ((VideoJob.created_at == job.created_at) & (VideoJob.id < job.id))
+                )
+            ).one()
+        running = _running_count(session)
+
+    # Slot kosong dipakai job terdepan; sisanya menunggu "gelombang" render berikutnya
+    free_slots = max(0, RENDER_SLOTS - running)
+    if ahead < free_slots:
+        eta_seconds = 0.0
+    else:
+        waves = (ahead - free_slots) // max(1, RENDER_SLOTS) + 1
+        eta_seconds = waves * estimated_job_seconds()
+    return {"position": ahead + 1, "eta_seconds": round(eta_seconds)}
+
+
+def get_job(job_id: int) -> Optional[VideoJob]:
+    with Session(engine, expire_on_commit=False) as session:
+        return session.get(VideoJob, job_id)
+
+
+def get_job_events(job_id: int, after_id: int = 0) -> List[VideoJobEvent]:
+    with Session(engine, expire_on_commit=False) as session:
+        return list(session.exec(
+            select(VideoJobEvent)
+            .where(VideoJobEvent.job_id == job_id)
+            .where(VideoJobEvent.id > after_id)
+            .order_by(VideoJobEvent.id.asc())
+        ).all())
+
+
+def finish_job(
+    job_id: int,
+    video_url: Optional[str] = None,
+    error: Optional[str] = None,
+    result_message_id: Optional[int] = None,
+) -> None:
+    """Tandai job selesai: 'completed' jika ada video_url, selain itu 'failed'."""
+    with Session(engine) as session:
+        job = session.get(VideoJob, job_id)
+        if not job:
+            return
+        job.status = "completed" if video_url and not error else "failed"
+        job.video_url = video_url
+        job.error = error
+        job.result_message_id = result_message_id
+        job.finished_at = datetime.utcnow()
+        job.lease_expires_at = None
+        session.add(job)
+        session.commit()
+
+        # Durasi render nyata dipakai untuk estimasi waktu tunggu antrian
+        if job.status == "completed" and job.started_at and not job.leader_job_id:
+            duration = (job.finished_at - job.started_at).total_seconds()
+            metrics.observe("jobs.duration.seconds", duration)
+            if job.estimated_cost:
+                # Akurasi estimator: 1.0 = tepat
+                metrics.observe("scheduler.actual_to_estimate", duration / job.estimated_cost)
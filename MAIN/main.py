@@ -1,3 +1,4 @@
+import asyncio
 import json
 import os
 from contextlib import asynccontextmanager
@@ -5,82 +6,45 @@ from datetime import datetime
 from pathlib import Path
 from typing import Optional
 
-from dotenv import load_dotenv
 from fastapi import Body, Depends, FastAPI, Form, HTTPException, Request
 from fastapi.responses import HTMLResponse, RedirectResponse, Response, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.exception_handlers import http_exception_handler
 from fastapi.templating import Jinja2Templates
 from itsdangerous import BadSignature, URLSafeSerializer
-from langchain_google_genai import ChatGoogleGenerativeAI
 from passlib.context import CryptContext
 from pydantic import BaseModel
-from sqlmodel import SQLModel, Field, Session, create_engine, select
-
-from MAIN.AI.app import generate_educational_video, generate_video_for_topic_with_progress
-
-# === Load .env dari lokasi AI, MAIN, atau root ===
-BASE_DIR = Path(__file__).resolve().parent       # .../FP/MAIN
-project_root = BASE_DIR.parent                   # .../FP
-env_paths = [
-    BASE_DIR / ".env",           # MAIN/.env
-    project_root / ".env",       # FP/.env
-    project_root / "AI" / ".env" # FP/AI/.env
-]
-for env in env_paths:
-    if env.exists():
-        load_dotenv(dotenv_path=env)
-        print(f"✅ Loaded .env from: {env}")
-        break
-else:
-    print("⚠️ No .env file found in MAIN, FP, or AI.")
-
-# === Database URL ===
-uri_db = os.getenv("DATABASE_URL")
-if not uri_db:
-    raise RuntimeError("❌ DATABASE_URL not found in environment variables")
-
-from sqlmodel import SQLModel, Field, Session, create_engine, select
-engine = create_engine(uri_db, echo=False)
-
-# ---------------- Models DB----------------
-class User(SQLModel, table=True):
-    __tablename__ = "users"
-    id: Optional[int] = Field(default=None, primary_key=True)
-    username: str
-    email: str
-    password_hash: str
-
-class ChatFolder(SQLModel, table=True):
-    __tablename__ = "chatfolders"
-    id: Optional[int] = Field(default=None, primary_key=True)
-    user_id: int = Field(foreign_key="users.id")
-    title: str
-
-class Message(SQLModel, table=True):
-    __tablename__ = "messages"
-    id: Optional[int] = Field(default=None, primary_key=True)
-    chat_folder_id: int = Field(foreign_key="chatfolders.id")
-    role: bool  # True=user, False=ai
-    content: str
-    video_url: Optional[str] = None  # ✅ kolom baru
-    timestamp: datetime = Field(default_factory=datetime.utcnow)
-    
-class Review(SQLModel, table=True):
-    __tablename__ = "reviews"
-    id: Optional[int] = Field(default=None, primary_key=True)
-    nama: str
-    nrp: str
-    kelompok: str
-    rating: int
-    review: str
-    created_at: datetime = Field(default_factory=datetime.utcnow)
+from sqlmodel import Session, select
+from starlette.concurrency import run_in_threadpool
+
+from MAIN.database import (
+    BASE_DIR,
+    ChatFolder,
+    Message,
+    Review,
+    User,
+    create_db_and_tables,
+    engine,
+)
+from MAIN.jobs import (
+    FINAL_JOB_STATUSES,
+    JobLimitExceeded,
+    enqueue_video_job,
+    get_job,
+    get_job_events,
+    get_queue_position,
+    request_job_cancel,
+)
+from MAIN.AI.app import generate_educational_video
+from MAIN.AI import metrics
+from MAIN.AI.video_cache import get_video_cache
+from MAIN.AI.llm_cache import LLM_CACHE_BYPASS, get_llm_cache
+from MAIN.AI.llm_clients import astream_llm, get_chat_model, invoke_llm
+from MAIN.AI.model_router import routing_table
+from MAIN.AI.progress import PROGRESS_HEARTBEAT_SECONDS, heartbeat_comment
 
 pwd_ctx = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
-def create_db_and_tables():
-    SQLModel.metadata.create_all(engine)
-
 
 def _title_from_video_url(video_url: str | None) -> str:
     """
@@ -522,17 +486,41 @@ def generate_video_for_topic(topic: str) -> Optional[str]:
     except Exception as e:
         print(f"[learnvidai ERROR] {e}")
         return None
+CHAT_MODEL = os.getenv("CHAT_MODEL", "gemini-2.0-flash")
+
+
 def chat_with_gemini(user_message: str) -> str:
     """
     Mode chat biasa menggunakan Gemini.
     """
-    model = ChatGoogleGenerativeAI(model="gemini-2.0-flash", temperature=0.7)
+    model = get_chat_model(CHAT_MODEL, temperature=0.7)
+    # Chat tidak di-cache: pertanyaan yang sama boleh mendapat jawaban berbeda
+    response = invoke_llm(model, _chat_prompt(user_message), cache=LLM_CACHE_BYPASS)
+    return response.content
 
-    prompt = f"""
+
+def _chat_prompt(user_message: str) -> str:
+    return f"""
     Kamu adalah asisten pembelajaran sains yang ramah. Jawab dengan jelas dan singkat.\n\n{user_message}
     """
-    response = model.invoke(prompt)
-    return response.content
+
+
+def _message_json(msg: Message) -> dict:
+    return {
+        "id": msg.id,
+        "role": "user" if msg.role else "ai",
+        "content": msg.content,
+        "timestamp": msg.timestamp.isoformat(),
+    }
+
+
+def _save_message(chat_id: int, role: bool, content: str) -> Message:
+    with Session(engine) as session:
+        msg = Message(chat_folder_id=chat_id, role=role, content=content)
+        session.add(msg)
+        session.commit()
+        session.refresh(msg)
+        return msg
 
 
 @app.post("/api/chats/{chat_id}/messages")
@@ -577,17 +565,95 @@ def api_post_message(chat_id: int, payload: PostMessageIn, user: User = Depends(
         
 from fastapi import APIRouter
 
+JOB_EVENT_POLL_INTERVAL = float(os.getenv("JOB_EVENT_POLL_INTERVAL", "0.5"))
+QUEUE_POSITION_INTERVAL = float(os.getenv("QUEUE_POSITION_INTERVAL", "5.0"))
+
+
+@app.post("/api/chats/{chat_id}/messages/stream")
+def api_post_message_stream(
+    chat_id: int,
+    payload: PostMessageIn,
+    request: Request,
+    user: User = Depends(current_user_required),
+):
+    """
+    Versi streaming dari api_post_message: token jawaban Gemini diteruskan
+    lewat SSE begitu tiba. Pesan AI disimpan ke DB setelah stream selesai.
+
+    Event: user_message -> token (berulang, field "delta") -> done (ai_message) / error
+    """
+    with Session(engine) as session:
+        chat = session.get(ChatFolder, chat_id)
+        if not chat or chat.user_id != user.id:
+            raise HTTPException(status_code=404, detail="Not found")
+
+    user_msg = _save_message(chat_id, True, payload.content)
+    return StreamingResponse(
+        stream_chat_reply(chat_id, user_msg, request),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+async def stream_chat_reply(chat_id: int, user_msg: Message, request: Request):
+    import time
+
+    yield f"data: {json.dumps({'status': 'user_message', 'user_message': _message_json(user_msg)})}\n\n"
+
+    started = time.monotonic()
+    parts = []
+    disconnected = False
+    try:
+        model = get_chat_model(CHAT_MODEL, temperature=0.7)
+        async for delta in astream_llm(model, _chat_prompt(user_msg.content), cache=LLM_CACHE_BYPASS):
+            if not parts:
+                metrics.observe("chat.first_token_seconds", time.monotonic() - started)
+            parts.append(delta)
+            if disconnected:
+                continue
+            yield f"data: {json.dumps({'status': 'token', 'delta': delta})}\n\n"
+            if await request.is_disconnected():
+                # Pesan user sudah tersimpan: jawaban tetap dibaca sampai habis lalu disimpan
+                print(f"[CHAT STREAM] Client disconnected from chat #{chat_id}, finishing reply in background")
+                disconnected = True
+    except (asyncio.CancelledError, GeneratorExit):
+        # Stream dibatalkan Starlette: simpan jawaban sebagian (sinkron, await di sini tidak aman)
+        if parts:
+            _save_message(chat_id, False, "".join(parts))
+        raise
+    except Exception as e:
+        print(f"[CHAT STREAM ERROR] {e}")
+        if not disconnected:
+            yield f"data: {json.dumps({'status': 'error', 'message': '❌ Maaf, terjadi kesalahan. Coba lagi nanti.'})}\n\n"
+            return
+        # Client sudah pergi: simpan jawaban sebagian di bawah
+
+    metrics.observe("chat.reply_seconds", time.monotonic() - started)
+    ai_msg = await run_in_threadpool(_save_message, chat_id, False, "".join(parts))
+    if not disconnected:
+        yield f"data: {json.dumps({'status': 'done', 'ai_message': _message_json(ai_msg)})}\n\n"
+
+
 @app.post("/api/chats/{chat_id}/generate_video")
-def api_generate_video(chat_id: int, payload: dict, user: User = Depends(current_user_required)):
+def api_generate_video(chat_id: int, payload: dict, request: Request, user: User = Depends(current_user_required)):
     """
-    Endpoint with SSE streaming + Heartbeat support
+    Endpoint with SSE streaming + Heartbeat support.
+
+    Video tidak lagi dirender di sini: request hanya memasukkan job ke
+    antrian (tabel video_jobs) lalu men-stream event progress yang ditulis
+    oleh proses worker (python -m MAIN.worker).
     """
     topic = (payload.get("topic") or "").strip()
-    print(f"[API DEBUG] Received topic: '{topic}'")
+    # Opsional; nilai yang sama dengan batch (MAIN/AI/batch.py) memakai entri video cache yang sama
+    complexity = (payload.get("complexity") or "").strip() or "high-school"
+    domain = (payload.get("domain") or "").strip() or "auto-detect"
+    print(f"[API DEBUG] Received topic: '{topic}' ({complexity}, {domain})")
     
     if not topic:
         raise HTTPException(status_code=400, detail="Topic required")
 
+    initial_msg = {'status': 'started', 'message': f'🎬 Memulai pembuatan video tentang {topic}...'}
+
     with Session(engine) as session:
         chat = session.get(ChatFolder, chat_id)
         if not chat or chat.user_id != user.id:
@@ -598,136 +664,56 @@ def api_generate_video(chat_id: int, payload: dict, user: User = Depends(current
         session.commit()
         session.refresh(user_msg)
 
-    def generate_with_progress():
-        """Synchronous generator function"""
-        import random
-        import string
+        # ⚡ Cache hit: video topik ini sudah ada, tidak perlu antri / render
+        cached_url = get_video_cache().get(topic, complexity, domain)
+        if cached_url:
+            ai_msg = Message(
+                chat_folder_id=chat.id,
+                role=False,
+                content=f"✅ Video tentang '{topic}' berhasil dibuat!",
+                video_url=cached_url,
+            )
+            session.add(ai_msg)
+            session.commit()
+            session.refresh(ai_msg)
+            final_msg = {
+                'status': 'done',
+                'message': ai_msg.content,
+                'video_url': cached_url,
+                'message_id': ai_msg.id,
+                'cached': True,
+            }
+            return StreamingResponse(
+                iter([f"data: {json.dumps(final_msg)}\n\n"]),
+                media_type="text/event-stream",
+                headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+            )
 
-        progress_msg_id: Optional[int] = None
+        progress_msg = Message(chat_folder_id=chat.id, role=False, content=initial_msg["message"])
+        session.add(progress_msg)
+        session.commit()
+        session.refresh(progress_msg)
 
+        # 🚦 Admission control: batas job aktif per user dicek atomik saat insert
         try:
-            # === 1. BIGGER JUNK PADDING ===
-            # 🟢 INCREASE from 2048 to 8192 bytes (8KB)
-            # Nginx typically buffers 4KB-8KB, so this forces it to flush
-            padding = ''.join(random.choices(string.ascii_letters + string.digits, k=8192))
-            yield f": {padding}\n\n"
-            
-            # 🟢 Send MULTIPLE padding chunks to guarantee flush
-            for i in range(3):
-                padding_extra = ''.join(random.choices(string.ascii_letters, k=2048))
-                yield f": padding-{i}-{padding_extra}\n\n"
-            
-            print("[STREAM] Flushed padding...")
-            
-            initial_msg = {'status': 'started', 'message': f'🎬 Memulai pembuatan video tentang {topic}...'}
-            yield f"data: {json.dumps(initial_msg)}\n\n"
-
-            # 💾 Save Initial DB Status
-            try:
-                with Session(engine) as session:
-                    if progress_msg_id is None:
-                        progress_msg = Message(
-                            chat_folder_id=chat_id,
-                            role=False,
-                            content=initial_msg["message"],
-                        )
-                        session.add(progress_msg)
-                        session.commit()
-                        session.refresh(progress_msg)
-                        progress_msg_id = progress_msg.id
-            except Exception as db_err:
-                print(f"[PROGRESS DB ERROR] {db_err}")
-            
-            video_url = None
-            has_error = False
-            error_text = None
-            
-            # === LOOP WITH AGGRESSIVE HEARTBEAT ===
-            for progress in generate_video_for_topic_with_progress(topic, message_id=user_msg.id):
-                
-                # 🟢 Check if this is a Keep-Alive String
-                if isinstance(progress, str):
-                    # 🟢 Make heartbeats BIGGER (Nginx might ignore small ones)
-                    if progress.strip().startswith(":"):
-                        # Pad the heartbeat to ~500 bytes
-                        padding = ''.join(random.choices(string.ascii_letters, k=400))
-                        yield f"{progress.strip()}-{padding}\n\n"
-                    else:
-                        yield progress
-                    continue
-                
-                # Normal Dictionary progress
-                print(f"[STREAM] Progress: {progress}")
-
-                # Tangani status final di server agar frontend
-                # hanya menerima satu event final (tidak dobel).
-                status = progress.get("status")
-                if status == "completed":
-                    video_url = progress.get("video_url")
-                    continue
-                if status == "error":
-                    has_error = True
-                    error_text = progress.get("message")
-                    continue
-                
-                # 🟢 Pad each data message to force flush
-                progress_json = json.dumps(progress)
-                padding = ''.join(random.choices(string.ascii_letters, k=300))
-                yield f"data: {progress_json}\n: pad-{padding}\n\n"
-
-                # 💾 DB Save Logic
-                try:
-                    message_text = progress.get("message") or ""
-
-                    if status in {"generating_content", "generating_code", "rendering", "saving"} and message_text:
-                        with Session(engine) as session:
-                            if progress_msg_id:
-                                progress_msg = session.get(Message, progress_msg_id)
-                                if progress_msg:
-                                    progress_msg.content = message_text
-                                    session.add(progress_msg)
-                                    session.commit()
-                except Exception as db_err:
-                    print(f"[PROGRESS DB ERROR] {db_err}")
-            
-            # === FINAL STATUS ===
-            if not has_error and video_url:
-                with Session(engine) as session:
-                    ai_msg = Message(
-                        chat_folder_id=chat_id,
-                        role=False,
-                        content=f"✅ Video tentang '{topic}' berhasil dibuat!",
-                        video_url=video_url
-                    )
-                    session.add(ai_msg)
-                    session.commit()
-                    session.refresh(ai_msg)
-                    
-                    final_json = json.dumps({'status': 'done', 'message': ai_msg.content, 'video_url': video_url, 'message_id': ai_msg.id})
-                    yield f"data: {final_json}\n\n"
-            
-            elif has_error:
-                with Session(engine) as session:
-                    ai_msg = Message(
-                        chat_folder_id=chat_id,
-                        role=False,
-                        content=error_text or "❌ Maaf, terjadi kesalahan. Coba lagi nanti.",
-                        video_url=None
-                    )
-                    session.add(ai_msg)
-                    session.commit()
-                    session.refresh(ai_msg)
-
-                    error_json = json.dumps({'status': 'final_error', 'message': ai_msg.content, 'message_id': ai_msg.id})
-                    yield f"data: {error_json}\n\n"
-        
-        except Exception as e:
-            import traceback
-            print(f"[STREAM ERROR] {traceback.format_exc()}")
-            yield f"data: {json.dumps({'status': 'error', 'message': f'❌ Error: {str(e)}'})}\n\n"
+            job = enqueue_video_job(
+                user_id=user.id,
+                chat_id=chat_id,
+                topic=topic,
+                user_message_id=user_msg.id,
+                progress_message_id=progress_msg.id,
+                complexity=complexity,
+                domain=domain,
+            )
+        except JobLimitExceeded as e:
+            session.delete(progress_msg)
+            session.commit()
+            raise HTTPException(status_code=429, detail=str(e))
+
+    print(f"[API DEBUG] Enqueued video job #{job.id}")
 
     return StreamingResponse(
-        generate_with_progress(),
+        stream_job_progress(job.id, initial_msg, request),
         media_type="text/event-stream",
         headers={
             "Cache-Control": "no-cache",
@@ -736,7 +722,151 @@ def api_generate_video(chat_id: int, payload: dict, user: User = Depends(current
             "Content-Encoding": "none"
         },
     )
+
+
+async def stream_job_progress(job_id: int, initial_msg: dict, request: Request):
+    """
+    Subscribe ke event job dari DB dan teruskan sebagai SSE.
+
+    Jika client terputus sebelum job selesai, job dibatalkan lewat
+    request_job_cancel() (kecuali masih ada request lain yang menumpang).
+    """
+    import random
+    import string
+    import time
+
+    disconnected = False
+    try:
+        # === 1. BIGGER JUNK PADDING ===
+        # Nginx typically buffers 4KB-8KB, so this forces it to flush
+        padding = ''.join(random.choices(string.ascii_letters + string.digits, k=8192))
+        yield f": {padding}\n\n"
+        
+        # 🟢 Send MULTIPLE padding chunks to guarantee flush
+        for i in range(3):
+            padding_extra = ''.join(random.choices(string.ascii_letters, k=2048))
+            yield f": padding-{i}-{padding_extra}\n\n"
+        
+        print("[STREAM] Flushed padding...")
+        yield f"data: {json.dumps(initial_msg)}\n\n"
+
+        # 🟢 Padding per event cukup dibuat sekali per stream
+        event_padding = ''.join(random.choices(string.ascii_letters, k=300))
+
+        last_event_id = 0
+        last_sent = time.monotonic()
+        heartbeat_count = 0
+        event_source_id = job_id  # berganti ke leader jika job ini menumpang
+        last_queue_info = None
+        last_queue_sent = 0.0
+
+        while True:
+            if await request.is_disconnected():
+                disconnected = True
+                print(f"[STREAM] Client disconnected from job #{job_id}")
+                return
+
+            events = await run_in_threadpool(get_job_events, event_source_id, last_event_id)
+            for event in events:
+                last_event_id = event.id
+                # 🟢 Pad each data message to force flush
+                yield f"data: {event.payload}\n: pad-{event_padding}\n\n"
+                last_sent = time.monotonic()
+
+            job = await run_in_threadpool(get_job, job_id)
+            if job is None:
+                yield f"data: {json.dumps({'status': 'error', 'message': '❌ Job tidak ditemukan'})}\n\n"
+                return
+
+            # Single-flight: topik sama sedang diproses -> ikuti event job tsb
+            if job.leader_job_id and event_source_id != job.leader_job_id:
+                event_source_id = job.leader_job_id
+                last_event_id = 0
+                continue
+
+            # 🚦 Masih antri: kirim posisi + perkiraan mulai (saat berubah / berkala)
+            if job.status in ("queued", "attached"):
+                queue_info = await run_in_threadpool(get_queue_position, event_source_id)
+                if queue_info and (
+                    queue_info != last_queue_info
+                    or time.monotonic() - last_queue_sent >= QUEUE_POSITION_INTERVAL
+                ):
+                    eta_minutes = max(1, round(queue_info["eta_seconds"] / 60))
+                    queued_msg = {
+                        'status': 'queued',
+                        'message': f"⏳ Menunggu giliran render (antrian #{queue_info['position']}, "
+                                   f"perkiraan mulai ~{eta_minutes} menit lagi)...",
+                        **queue_info,
+                    }
+                    yield f"data: {json.dumps(queued_msg)}\n: pad-{event_padding}\n\n"
+                    last_queue_info = queue_info
+                    last_queue_sent = last_sent = time.monotonic()
+
+            # === FINAL STATUS ===
+            if job.status in FINAL_JOB_STATUSES:
+                # Event yang ditulis di antara pembacaan event dan status di atas
+                # sudah pasti tersimpan sekarang -> kirim dulu sebelum done/error
+                events = await run_in_threadpool(get_job_events, event_source_id, last_event_id)
+                for event in events:
+                    last_event_id = event.id
+                    yield f"data: {event.payload}\n: pad-{event_padding}\n\n"
+
+                if job.status == "completed":
+                    final_json = json.dumps({
+                        'status': 'done',
+                        'message': f"✅ Video tentang '{job.topic}' berhasil dibuat!",
+                        'video_url': job.video_url,
+                        'message_id': job.result_message_id,
+                    })
+                else:
+                    final_json = json.dumps({
+                        'status': 'final_error',
+                        'message': job.error or "❌ Maaf, terjadi kesalahan. Coba lagi nanti.",
+                        'message_id': job.result_message_id,
+                    })
+                yield f"data: {final_json}\n\n"
+                return
+
+            # 🟢 Heartbeat supaya proxy tidak menutup koneksi
+            if time.monotonic() - last_sent >= PROGRESS_HEARTBEAT_SECONDS:
+                heartbeat_count += 1
+                yield heartbeat_comment("job", heartbeat_count)
+                last_sent = time.monotonic()
+
+            await asyncio.sleep(JOB_EVENT_POLL_INTERVAL)
+
+    except (asyncio.CancelledError, GeneratorExit):
+        # Starlette membatalkan / menutup stream saat koneksi putus
+        disconnected = True
+        raise
+    except Exception as e:
+        import traceback
+        print(f"[STREAM ERROR] {traceback.format_exc()}")
+        yield f"data: {json.dumps({'status': 'error', 'message': f'❌ Error: {str(e)}'})}\n\n"
+    finally:
+        if disconnected:
+            # Sinkron (query singkat): setelah dibatalkan, await di sini tidak aman
+            try:
+                request_job_cancel(job_id)
+            except Exception as cancel_err:
+                print(f"[STREAM] Failed to cancel job #{job_id}: {cancel_err}")
     
+@app.get("/api/metrics")
+def api_metrics(user: User = Depends(current_user_required)):
+    """Snapshot metrik pipeline (cache hit/miss, antrian, dll)."""
+    return {
+        "metrics": metrics.snapshot(),
+        "video_cache": get_video_cache().stats(),
+        "llm_cache": get_llm_cache().stats(),
+    }
+
+
+@app.get("/api/model-routing")
+def api_model_routing(user: User = Depends(current_user_required)):
+    """Tabel routing model (flash-lite / flash / pro) per task, domain dan jenis error."""
+    return routing_table()
+
+
 class RenameChatIn(BaseModel):
     title: str
 
@@ -0,0 +1,430 @@
+"""
+Worker render LEARNVIDAI - jalankan terpisah dari gunicorn:
+
+    python -m MAIN.worker --workers 4
+    python -m MAIN.worker --workers 2 --async-jobs 8   # pipeline asyncio
+
+Setiap proses mengambil job dari tabel video_jobs, menjalankan pipeline
+generate_video_for_topic_with_progress(), dan menulis progress ke
+video_job_events. Endpoint SSE di MAIN/main.py hanya membaca event tsb,
+jadi restart web worker tidak membunuh render yang sedang berjalan.
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+import signal
+import socket
+import time
+from typing import Optional
+
+from sqlmodel import Session
+
+from MAIN.database import Message, engine
+from MAIN.jobs import (
+    CANCELLED_JOB_MESSAGE,
+    JOB_LEASE_SECONDS,
+    cancel_job,
+    claim_follower,
+    claim_next_job,
+    finish_job,
+    get_followers,
+    get_orphaned_followers,
+    has_higher_priority_job,
+    is_cancel_requested,
+    record_job_event,
+    renew_job_lease,
+    requeue_expired_jobs,
+    reschedule_job,
+    retry_job,
+    set_job_estimated_cost,
+    set_job_token_usage,
+)
+
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "1.0"))
+# Seberapa sering worker mengecek flag cancel_requested job yang sedang jalan
+CANCEL_POLL_SECONDS = float(os.getenv("CANCEL_POLL_SECONDS", "2.0"))
+PROGRESS_STATUSES = {"generating_content", "generating_code", "validating", "rendering", "saving"}
+
+_stop_requested = False
+
+
+def _request_stop(signum, frame):
+    global _stop_requested
+    _stop_requested = True
+    print(f"[WORKER {os.getpid()}] Stop requested, finishing current job...")
+
+
+def _update_progress_message(message_id: Optional[int], text: str) -> None:
+    if not message_id or not text:
+        return
+    try:
+        with Session(engine) as session:
+            msg = session.get(Message, message_id)
+            if msg:
+                msg.content = text
+                session.add(msg)
+                session.commit()
+    except Exception as db_err:
+        print(f"[PROGRESS DB ERROR] {db_err}")
+
+
+def _create_result_message(chat_id: int, content: str, video_url: Optional[str]) -> Optional[int]:
+    with Session(engine) as session:
+        ai_msg = Message(
+            chat_folder_id=chat_id,
+            role=False,
+            content=content,
+            video_url=video_url,
+        )
+        session.add(ai_msg)
+        session.commit()
+        session.refresh(ai_msg)
+        return ai_msg.id
+
+
+def _finalize_job(job, video_url: Optional[str], error_text: Optional[str], follower: bool = False) -> None:
+    """
+    Tulis pesan hasil ke chat milik job lalu tandai job selesai.
+
+    follower=True: penumpang diklaim dulu (claim_follower); jika worker
+    lain sudah memfinalisasinya, tidak ada pesan kedua.
+    """
+    if not (video_url and not error_text):
+        error_text = error_text or "❌ Maaf, terjadi kesalahan. Coba lagi nanti."
+    if follower and not claim_follower(job.id, video_url, error_text):
+        print(f"[WORKER] Job #{job.id} already finalized by another worker")
+        return
+
+    if video_url and not error_text:
+        result_id = _create_result_message(
+            job.chat_folder_id,
+            f"✅ Video tentang '{job.topic}' berhasil dibuat!",
+            video_url,
+        )
+        finish_job(job.id, video_url=video_url, result_message_id=result_id)
+    else:
+        result_id = _create_result_message(job.chat_folder_id, error_text, None)
+        finish_job(job.id, error=error_text, result_message_id=result_id)
+
+
+def finalize_orphaned_followers() -> None:
+    """Selesaikan penumpang yang leader-nya sudah selesai lebih dulu."""
+    for follower, leader in get_orphaned_followers():
+        if leader is None:
+            _finalize_job(follower, None, "❌ Job utama tidak ditemukan. Coba lagi.", follower=True)
+        else:
+            _finalize_job(follower, leader.video_url, leader.error, follower=True)
+
+
+def _handle_progress(job, progress, outcome: dict) -> None:
+    """Proses satu event dari pipeline: simpan event + update pesan progress."""
+    if isinstance(progress, str):
+        return  # heartbeat
+
+    status = progress.get("status")
+    if status == "completed":
+        outcome["video_url"] = progress.get("video_url")
+        return
+    if status == "error":
+        outcome["error_text"] = progress.get("message")
+        return
+    if status == "cancelled":
+        outcome["cancelled"] = True
+        return
+    if status == "rescheduled":
+        outcome["rescheduled"] = True
+
+    record_job_event(job.id, progress)
+    if status in PROGRESS_STATUSES:
+        message_text = progress.get("message") or ""
+        _update_progress_message(job.progress_message_id, message_text)
+        for follower in get_followers(job.id):
+            _update_progress_message(follower.progress_message_id, message_text)
+
+
+def _schedule_after_stage(job):
+    """
+    Callback after_stage untuk pipeline: setelah kode dibuat (tahap LLM
+    yang murah), hitung biaya render dan kembalikan job ke antrian jika
+    scheduler punya job lain yang lebih pantas dirender dulu.
+    """
+    from MAIN.AI.pipeline import PipelineInterrupted
+    from MAIN.AI.scheduler import estimate_job_cost
+
+    def _after_stage(stage_name, ctx):
+        if stage_name != "code" or job.estimated_cost is not None:
+            return
+        job.estimated_cost = estimate_job_cost(ctx.video_plan, ctx.manim_code)
+        set_job_estimated_cost(job.id, job.estimated_cost)
+        print(f"[SCHEDULER] Job #{job.id} estimated render cost: {job.estimated_cost}s")
+        if has_higher_priority_job(job.id):
+            raise PipelineInterrupted({
+                "status": "rescheduled",
+                "message": "⏳ Konten siap, menunggu giliran render...",
+                "estimated_cost": job.estimated_cost,
+            })
+
+    return _after_stage
+
+
+def _complete_job(job, outcome: dict) -> None:
+    """Retry dari checkpoint, atau finalisasi job + semua penumpangnya."""
+    from MAIN.AI.checkpoints import StageCheckpoint
+
+    video_url = outcome.get("video_url")
+    error_text = outcome.get("error_text")
+
+    if outcome.get("cancelled"):
+        _cancel_job(job)
+        return
+
+    if outcome.get("rescheduled") and not error_text:
+        print(f"[WORKER] Job #{job.id} rescheduled by cost ({job.estimated_cost}s)")
+        reschedule_job(job.id)
+        return
+
+    if error_text and retry_job(job.id):
+        # Checkpoint tetap ada: attempt berikutnya mulai dari tahap terakhir yang berhasil
+        print(f"[WORKER] Job #{job.id} failed, requeued for retry: {error_text}")
+        record_job_event(job.id, {"status": "retrying", "message": "🔁 Terjadi kesalahan, mencoba lagi..."})
+        return
+
+    if error_text:
+        StageCheckpoint(f"job-{job.id}").clear()
+
+    _finalize_job(job, video_url, error_text)
+
+    # Semua request identik yang menumpang job ini mendapat hasil yang sama
+    followers = get_followers(job.id)
+    for follower in followers:
+        _finalize_job(follower, video_url, error_text, follower=True)
+    if followers:
+        print(f"[WORKER] Job #{job.id} result shared with {len(followers)} attached request(s)")
+
+    print(f"[WORKER] Job #{job.id} finished ({'ok' if video_url and not error_text else 'failed'})")
+
+
+def _cancel_job(job) -> None:
+    """Client pergi: buang checkpoint, tandai job 'cancelled'."""
+    from MAIN.AI.checkpoints import StageCheckpoint
+
+    StageCheckpoint(f"job-{job.id}").clear()
+    record_job_event(job.id, {"status": "cancelled", "message": CANCELLED_JOB_MESSAGE})
+    cancel_job(job.id)
+    # Penumpang yang menempel tepat saat pembatalan diminta tidak ikut hilang
+    for follower in get_followers(job.id):
+        _finalize_job(follower, None, "❌ Pembuatan video dibatalkan. Silakan coba lagi.", follower=True)
+    print(f"[WORKER] Job #{job.id} cancelled")
+
+
+def _poll_cancel(job, token, outcome: dict, last_check: float) -> float:
+    """Cek flag cancel_requested setiap CANCEL_POLL_SECONDS; batalkan token jika diset."""
+    if time.monotonic() - last_check < CANCEL_POLL_SECONDS:
+        return last_check
+    if is_cancel_requested(job.id):
+        print(f"[WORKER] Job #{job.id} cancel requested, stopping pipeline...")
+        token.cancel()
+        outcome["cancelled"] = True
+    return time.monotonic()
+
+
+def process_job(job) -> None:
+    """Jalankan pipeline untuk satu job dan simpan hasilnya ke DB."""
+    from MAIN.AI.app import generate_video_for_topic_with_progress
+    from MAIN.AI.cancellation import CancelToken
+    from MAIN.AI.token_budget import TokenUsage
+
+    print(f"[WORKER] Job #{job.id} (attempt {job.attempts}): '{job.topic}'")
+
+    outcome = {"video_url": None, "error_text": None}
+    token = CancelToken()
+    # Hitungan token berlanjut dari attempt sebelumnya (retry / reschedule)
+    usage = TokenUsage.from_json(job.token_usage)
+    last_renew = last_cancel_check = time.monotonic()
+
+    try:
+        for progress in generate_video_for_topic_with_progress(
+            job.topic,
+            message_id=job.user_message_id,
+            complexity=job.complexity,
+            domain=job.domain,
+            checkpoint_key=f"job-{job.id}",
+            after_stage=_schedule_after_stage(job),
+            cancel_token=token,
+            token_usage=usage,
+            job_attempt=job.attempts,
+        ):
+            # Perpanjang lease secara berkala (heartbeat dari pipeline tiap ~1 detik)
+            if time.monotonic() - last_renew > JOB_LEASE_SECONDS / 4:
+                renew_job_lease(job.id)
+                last_renew = time.monotonic()
+
+            # Manim sudah dibunuh oleh token; thread pipeline berhenti di titik
+            # cek berikutnya dan membersihkan folder kerjanya sendiri.
+            last_cancel_check = _poll_cancel(job, token, outcome, last_cancel_check)
+            if outcome.get("cancelled"):
+                break
+
+            _handle_progress(job, progress, outcome)
+    except Exception as e:
+        import traceback
+        print(f"[WORKER ERROR] {traceback.format_exc()}")
+        outcome["error_text"] = f"❌ Error: {str(e)}"
+
+    set_job_token_usage(job.id, usage)
+    _complete_job(job, outcome)
+
+
+async def aprocess_job(job) -> None:
+    """Versi async dari process_job: pipeline berjalan di event loop worker."""
+    from MAIN.AI.app import agenerate_video_for_topic_with_progress
+    from MAIN.AI.cancellation import CancelToken
+    from MAIN.AI.token_budget import TokenUsage
+
+    print(f"[WORKER] Job #{job.id} (attempt {job.attempts}, async): '{job.topic}'")
+
+    outcome = {"video_url": None, "error_text": None}
+    token = CancelToken()
+    # Hitungan token berlanjut dari attempt sebelumnya (retry / reschedule)
+    usage = TokenUsage.from_json(job.token_usage)
+    last_renew = last_cancel_check = time.monotonic()
+
+    stream = agenerate_video_for_topic_with_progress(
+        job.topic,
+        message_id=job.user_message_id,
+        complexity=job.complexity,
+        domain=job.domain,
+        checkpoint_key=f"job-{job.id}",
+        after_stage=_schedule_after_stage(job),
+        cancel_token=token,
+        token_usage=usage,
+        job_attempt=job.attempts,
+    )
+    try:
+        async for progress in stream:
+            if time.monotonic() - last_renew > JOB_LEASE_SECONDS / 4:
+                await asyncio.to_thread(renew_job_lease, job.id)
+                last_renew = time.monotonic()
+
+            last_cancel_check = await asyncio.to_thread(_poll_cancel, job, token, outcome, last_cancel_check)
+            if outcome.get("cancelled"):
+                break
+
+            if not isinstance(progress, str):
+                await asyncio.to_thread(_handle_progress, job, progress, outcome)
+    except Exception as e:
+        import traceback
+        print(f"[WORKER ERROR] {traceback.format_exc()}")
+        outcome["error_text"] = f"❌ Error: {str(e)}"
+    finally:
+        # Menutup stream membatalkan task pipeline: ainvoke yang tertunda ikut
+        # batal dan manim dibunuh (lihat _arun_manim)
+        await stream.aclose()
+
+    await asyncio.to_thread(set_job_token_usage, job.id, usage)
+    await asyncio.to_thread(_complete_job, job, outcome)
+
+
+async def _async_slot(worker_id: str) -> None:
+    """Satu slot job di event loop; beberapa slot berbagi satu proses."""
+    while not _stop_requested:
+        try:
+            await asyncio.to_thread(requeue_expired_jobs)
+            await asyncio.to_thread(finalize_orphaned_followers)
+            job = await asyncio.to_thread(claim_next_job, worker_id)
+        except Exception as e:
+            print(f"[WORKER {worker_id}] Queue error: {e}")
+            job = None
+
+        if job is None:
+            await asyncio.sleep(JOB_POLL_INTERVAL)
+            continue
+
+        await aprocess_job(job)
+
+
+async def _run_async_slots(worker_id: str, concurrency: int) -> None:
+    await asyncio.gather(*(_async_slot(f"{worker_id}-a{i}") for i in range(concurrency)))
+
+
+def run_worker(worker_id: str, async_jobs: int = 0) -> None:
+    """
+    Loop satu proses worker: ambil job, kerjakan, ulangi.
+
+    Jika async_jobs > 0, proses ini menjalankan pipeline asyncio dengan
+    async_jobs job bersamaan di satu event loop.
+    """
+    signal.signal(signal.SIGTERM, _request_stop)
+    signal.signal(signal.SIGINT, _request_stop)
+    engine.dispose()  # jangan pakai koneksi warisan proses induk
+
+    from MAIN.AI.checkpoints import purge_expired_checkpoints
+    purge_expired_checkpoints()
+
+    if async_jobs > 0:
+        print(f"[WORKER {worker_id}] Ready (async, {async_jobs} concurrent job(s))")
+        asyncio.run(_run_async_slots(worker_id, async_jobs))
+        print(f"[WORKER {worker_id}] Stopped")
+        return
+
+    print(f"[WORKER {worker_id}] Ready")
+    while not _stop_requested:
+        try:
+            requeue_expired_jobs()
+            finalize_orphaned_followers()
+            job = claim_next_job(worker_id)
+        except Exception as e:
+            print(f"[WORKER {worker_id}] Queue error: {e}")
+            job = None
+
+        if job is None:
+            time.sleep(JOB_POLL_INTERVAL)
+            continue
+
+        process_job(job)
+
+    print(f"[WORKER {worker_id}] Stopped")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="LEARNVIDAI render worker pool")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=int(os.getenv("RENDER_WORKERS", str(os.cpu_count() or 1))),
+        help="Jumlah proses worker (default: RENDER_WORKERS atau jumlah core)",
+    )
+    parser.add_argument(
+        "--async-jobs",
+        type=int,
+        default=int(os.getenv("ASYNC_JOBS_PER_WORKER", "0")),
+        help="Jalankan pipeline asyncio dengan N job bersamaan per proses (0 = mode sinkron)",
+    )
+    args = parser.parse_args()
+
+    ctx = multiprocessing.get_context("spawn")
+    host = socket.gethostname()
+    processes = [
+        ctx.Process(target=run_worker, args=(f"{host}-{os.getpid()}-{i}", args.async_jobs), daemon=False)
+        for i in range(max(1, args.workers))
+    ]
+    for proc in processes:
+        proc.start()
+
+    def _forward_stop(signum, frame):
+        for proc in processes:
+            if proc.is_alive():
+                os.kill(proc.pid, signal.SIGTERM)
+
+    signal.signal(signal.SIGTERM, _forward_stop)
+    signal.signal(signal.SIGINT, _forward_stop)
+
+    print(f"🚀 LEARNVIDAI worker pool started with {len(processes)} process(es)")
+    for proc in processes:
+        proc.join()
+
+
+if __name__ == "__main__":
+    main()
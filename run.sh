@@ -5,6 +5,9 @@
 # minimum python 3.10
 
 source venv/bin/activate
+# worker render berjalan terpisah dari web (jumlah proses: RENDER_WORKERS)
+python -m MAIN.worker &
+
 #uvicorn MAIN.main:app --reload
 #uvicorn MAIN.main:app --reload --host 0.0.0.0 --port 8000
 gunicorn -k uvicorn.workers.UvicornWorker MAIN.main:app --bind 0.0.0.0:8000 --workers 4
\ No newline at end of file